@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# bench/bench_md_html.py
+"""
+周报 Markdown -> HTML：旧的六遍 re.sub 链 vs 单遍逐行 MdRenderer（流式写文件），合成 ~10 MB 文档
+（标题 / 段落 / 链接 / 嵌套列表 / 表格 / 代码块混排）。
+  python3 bench/bench_md_html.py --mb 10 --repeat 3
+两边都按 main() 的口径计时（读 .md 文件 -> 转换 -> 写 .html 文件），交替各跑 repeat 次取最快（机器负载的起伏两边均摊）；
+峰值内存用 tracemalloc 单独再跑一遍测（会拖慢，不计入耗时）。
+"""
+import re, sys, time, argparse, tempfile, tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "report")]
+from generate_weekly_md_html import convert
+from bench.synth import markdown as synth_md
+
+def legacy_md_to_html(md):  # 与原 generate_weekly_md_html.md_to_html 一致
+    t = md
+    t = re.sub(r'!\[(.*?)\]\((.*?)\)', r'<img alt="\1" src="\2"/>', t)
+    t = re.sub(r'\[(.*?)\]\((.*?)\)', r'<a href="\2">\1</a>', t)
+    t = re.sub(r'^# (.*)$', r'<h1>\1</h1>', t, flags=re.MULTILINE)
+    t = re.sub(r'^## (.*)$', r'<h2>\1</h2>', t, flags=re.MULTILINE)
+    t = re.sub(r'^- (.*)$', r'<ul><li>\1</li></ul>', t, flags=re.MULTILINE)
+    t = '<p>' + t.replace('\n\n','</p><p>') + '</p>'; t = t.replace('</ul>\n<ul>','')
+    return t
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=float, default=10)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    md = synth_md(args.mb)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src, dst = Path(tmp) / "weekly.md", Path(tmp) / "weekly.html"
+        src.write_text(md, encoding="utf-8")
+
+        def stream():
+            with open(src, encoding="utf-8") as fin, open(dst, "w", encoding="utf-8") as fout:
+                convert(fin, fout.write)
+        def chain():
+            Path(dst).write_text(legacy_md_to_html(src.read_text(encoding="utf-8")), encoding="utf-8")
+        def best(*fns):
+            ts, size = [[] for _ in fns], [0.0] * len(fns)
+            for _ in range(max(1, args.repeat)):
+                for i, fn in enumerate(fns):
+                    t0 = time.perf_counter(); fn(); ts[i].append(time.perf_counter() - t0)
+                    size[i] = dst.stat().st_size / 2**20
+            return [(min(t), mb) for t, mb in zip(ts, size)]
+        def peak(fn):
+            tracemalloc.start(); fn(); p = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+            return p / 2**20
+
+        (t_old, old_mb), (t_new, out_mb) = best(chain, stream)
+        m_old, m_new = peak(chain), peak(stream)
+
+    mb = len(md.encode("utf-8")) / 2**20
+    print(f"{mb:.1f} MB markdown, {md.count(chr(10))} lines -> {out_mb:.1f} MB html")
+    print(f"re.sub chain (file->file): {t_old:6.2f} s  ({mb / t_old:.1f} MB/s), {old_mb:.1f} MB html, peak {m_old:.0f} MB")
+    print(f"MdRenderer (file->file)  : {t_new:6.2f} s  ({mb / t_new:.1f} MB/s), peak {m_new:.1f} MB")
+
+if __name__ == "__main__":
+    main()
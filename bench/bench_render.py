@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# bench/bench_render.py
+"""
+报告渲染：逐份调用 render_summary_v3.main（每次解析/拷贝架构图、读热度序列）vs Renderer.render_many。
+在临时目录里合成 N 份不同日期/板块/标题的快照、一张架构图和一年的热度序列。
+  python3 bench/bench_render.py --reports 1000 --asset-kb 512
+"""
+import os, sys, json, time, argparse, tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from macro.columnar import write_frame
+from scripts import render_summary_v3 as rs
+from bench.synth import snapshots as synth_snapshots, heat_frame
+
+def setup(root, asset_kb):
+    (root / "report_assets").mkdir(parents=True)
+    (root / "report_assets/architecture.png").write_bytes(os.urandom(asset_kb * 1024))
+    heat = heat_frame()
+    write_frame(heat, root / "data/macro/trade_heat.npz")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reports", type=int, default=1000)
+    ap.add_argument("--asset-kb", type=int, default=512)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--old-sample", type=int, default=100, help="per-report main() calls to time (extrapolated)")
+    args = ap.parse_args()
+    snaps = synth_snapshots(args.reports)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp); setup(root, args.asset_kb)
+        cwd = os.getcwd(); os.chdir(root)
+        try:
+            # 旧：每份报告一次 main()，快照先落成 JSON 文件
+            k = min(args.old_sample, len(snaps))
+            for i, s in enumerate(snaps[:k]):
+                Path(f"snap/{i}").mkdir(parents=True, exist_ok=True)
+                Path(f"snap/{i}/metrics.json").write_text(json.dumps(s["metrics"]), encoding="utf-8")
+                Path(f"snap/{i}/events.json").write_text(json.dumps(s["events"]), encoding="utf-8")
+            devnull = open(os.devnull, "w"); stdout, sys.stdout = sys.stdout, devnull
+            try:
+                t0 = time.perf_counter()
+                for i, s in enumerate(snaps[:k]):
+                    rs.main(["--metrics", f"snap/{i}/metrics.json", "--events", f"snap/{i}/events.json",
+                             "--outdir", "old_out", "--as-of", s["as_of"], "--title", s["title"]])
+                t_old = (time.perf_counter() - t0) / k * len(snaps)
+            finally:
+                sys.stdout = stdout; devnull.close()
+
+            t0 = time.perf_counter()
+            outs = rs.Renderer(root, "new_out").render_many(snaps, args.workers)
+            t_new = time.perf_counter() - t0
+            size = sum(p.stat().st_size for p in outs)
+        finally:
+            os.chdir(cwd)
+
+    print(f"{len(outs)} reports, {size / 2**20:.1f} MB html, asset {args.asset_kb} KB")
+    print(f"main() per report : {t_old:6.2f} s  (extrapolated from {k})")
+    print(f"Renderer batch    : {t_new:6.2f} s  ({len(outs) / t_new:,.0f} reports/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# bench/bench_startup.py
+"""
+CLI 启动开销：对每个命令跑 python -X importtime，汇总导入耗时（各模块 self 之和）和墙钟时间，
+并检查 --help / --list 这类不碰数据的命令没有导入重依赖（pandas / numpy / requests / yaml）。
+有命令导入了重依赖或超过 --budget-ms 时退出码为 1，可放进 CI 当守卫。
+  python3 bench/bench_startup.py [--repeat 5] [--budget-ms 150]
+"""
+import re, sys, time, argparse, subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("pandas", "numpy", "requests", "yaml")
+COMMANDS = [
+    ["scripts/emit_metrics_adapter.py", "--help"],
+    ["scripts/render_summary_v3.py", "--help"],
+    ["scripts/backfill_metrics.py", "--help"],
+    ["scripts/pipeline.py", "--list"],
+    ["macro/compute_conflict_score.py", "--help"],
+    ["macro/price_store.py", "--help"],
+    ["macro/fetch_all.py", "--help"],
+    ["scripts/scheduler.py", "--help"],
+    ["scripts/watchlists.py", "--help"],
+]
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def measure(cmd):
+    """返回 (墙钟 ms, 导入 ms, {顶层重依赖: 累计 ms})。"""
+    t0 = time.perf_counter()
+    p = subprocess.run([sys.executable, "-X", "importtime", *cmd], cwd=ROOT,
+                       capture_output=True, text=True)
+    wall = (time.perf_counter() - t0) * 1000
+    if p.returncode != 0:
+        raise SystemExit(f"{' '.join(cmd)} failed:\n{p.stderr[-2000:]}")
+    total, heavy = 0, {}
+    for m in _LINE.finditer(p.stderr):
+        total += int(m.group(1))
+        name = m.group(4)
+        if name in HEAVY:
+            heavy[name] = int(m.group(2)) / 1000
+    return wall, total / 1000, heavy
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5, help="runs per command (median reported)")
+    ap.add_argument("--budget-ms", type=float, default=150, help="max median import time per command")
+    args = ap.parse_args()
+
+    # 基线：空解释器（site / .pth 的固定成本）
+    base = sorted(measure(["-c", "pass"])[1] for _ in range(args.repeat))[args.repeat // 2]
+    print(f"{'command':<44} {'wall ms':>8} {'import ms':>10}  heavy deps  (bare interpreter imports {base:.0f} ms)")
+    bad = []
+    for cmd in COMMANDS:
+        runs = sorted((measure(cmd) for _ in range(args.repeat)), key=lambda r: r[1])
+        wall, imp, heavy = runs[len(runs) // 2]
+        flag = ""
+        if heavy or imp - base > args.budget_ms:
+            bad.append(cmd); flag = "  <-- REGRESSION"
+        deps = ", ".join(f"{k} {v:.0f}ms" for k, v in heavy.items()) or "-"
+        print(f"{' '.join(cmd):<44} {wall:8.0f} {imp:10.0f}  {deps}{flag}")
+    if bad:
+        print(f"{len(bad)} command(s) over budget or importing {'/'.join(HEAVY)} at startup")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# bench/bench_watchlists.py
+"""
+多板块：N 个板块各跑一遍 compute_conflict_score + render_summary_v3（每次都重新解析 events.csv）
+vs scripts/watchlists.py（共享扫描一次，进程池并行打分渲染）。两边都以子进程运行，含解释器启动成本。
+在临时目录里合成 events.csv、价格库和 N 个板块的配置；旧方式按 --old-sample 个板块计时后外推。
+  python3 bench/bench_watchlists.py --watchlists 50 --events 200000 --workers 8
+"""
+import os, sys, json, time, argparse, tempfile, subprocess
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+WORDS = ["chip", "export", "tariff", "memory", "foundry", "sanction", "cloud", "battery", "solar", "steel",
+         "pharma", "bank", "oil", "gas", "rail", "retail", "gaming", "robot", "drone", "satellite"]
+SOURCES = ["wire", "rss", "edgar", "blog"]
+
+def synth(root, n_wl, n_events, seed=0):
+    rng = np.random.default_rng(seed)
+    vocab = [f"{a} {b}" for a in WORDS for b in ("ban", "probe", "deal", "surge", "cut", "rule", "list")]
+    d = pd.date_range("2024-01-01", "2025-10-10", freq="h")
+    t = rng.choice(d, n_events)
+    kw = rng.choice(vocab, n_events)
+    (root / "data/warehouse").mkdir(parents=True)
+    pd.DataFrame({"publish_time": pd.DatetimeIndex(t).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                  "title": [f"Report {i}: {k} headline" for i, k in enumerate(kw)],
+                  "summary": rng.choice(["markets react", "officials comment", "analysts expect"], n_events),
+                  "source": rng.choice(SOURCES, n_events)}).to_csv(root / "data/warehouse/events.csv", index=False)
+
+    from macro.price_store import PriceStore
+    store = PriceStore(root / "data/store")
+    days = pd.bdate_range("2023-01-02", "2025-10-10")
+    tickers = ["^GSPC"] + [f"T{i:03d}" for i in range(n_wl * 2)]
+    for tk in tickers:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(days))))
+        store.append(tk, pd.DataFrame({"date": days, "close": close}))
+
+    wls = [{"slug": f"sector_{i:02d}", "title": f"Sector {i} Weekly",
+            "tickers": [tickers[1 + (2 * i + j) % (len(tickers) - 1)] for j in range(5)],
+            "keywords": list(rng.choice(vocab, 6, replace=False))} for i in range(n_wl)]
+    base = {"tickers": {"SPX": "^GSPC"}, "trade_heat_windows": [7, 14, 30]}
+    (root / "config").mkdir()
+    (root / "config/macro.yaml").write_text(json.dumps(dict(base, watchlists=wls)), encoding="utf-8")  # JSON ⊂ YAML
+    for w in wls:
+        (root / f"config/{w['slug']}.yaml").write_text(json.dumps(dict(base, trade_keywords=w["keywords"])), encoding="utf-8")
+    (root / "out").mkdir()
+    (root / "out/metrics.json").write_text(json.dumps({"rate_cut_odds": 0.4, "vix_pctile": 0.3, "corr_spx_dxy": -0.2,
+                                                       "corr_spx_10y": -0.1, "stance": "Neutral"}), encoding="utf-8")
+    return wls
+
+def sh(root, *cmd):
+    p = subprocess.run([sys.executable, *cmd], cwd=root, capture_output=True, text=True,
+                       env=dict(os.environ, PRICE_STORE=str(root / "data/store")))
+    if p.returncode != 0: raise SystemExit(f"{' '.join(cmd)} failed:\n{p.stderr[-2000:]}")
+    return p.stdout
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--watchlists", type=int, default=50)
+    ap.add_argument("--events", type=int, default=200_000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--old-sample", type=int, default=5, help="watchlists to time the per-watchlist way (extrapolated)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        t0 = time.perf_counter(); wls = synth(root, args.watchlists, args.events)
+        print(f"synth: {args.watchlists} watchlists, {args.events:,} events "
+              f"({(root / 'data/warehouse/events.csv').stat().st_size / 2**20:.1f} MB) in {time.perf_counter() - t0:.1f}s")
+
+        # 旧：每个板块一条完整链路（打分全量重扫 + 渲染）
+        k = min(args.old_sample, len(wls))
+        t0 = time.perf_counter()
+        for w in wls[:k]:
+            sh(root, str(ROOT / "macro/compute_conflict_score.py"), "--config", f"config/{w['slug']}.yaml", "--rebuild")
+            sh(root, str(ROOT / "scripts/render_summary_v3.py"), "--metrics", "out/metrics.json",
+               "--events", "data/macro/trade_conflict.json", "--outdir", f"old_out/{w['slug']}",
+               "--title", w["title"], "--allow-na")
+        per = (time.perf_counter() - t0) / k
+        old = per * len(wls)
+
+        t0 = time.perf_counter()
+        sh(root, str(ROOT / "scripts/watchlists.py"), "--no-fetch", "--workers", str(args.workers))
+        new = time.perf_counter() - t0
+        n_out = len(list((root / "report_out/watchlists").glob("*/*_final.html")))
+
+        # 抽查：共享扫描与单独跑的结果一致
+        same = True
+        for w in wls[:2]:
+            sh(root, str(ROOT / "macro/compute_conflict_score.py"), "--config", f"config/{w['slug']}.yaml", "--rebuild")
+            one = json.loads((root / "data/macro/trade_conflict.json").read_text(encoding="utf-8"))
+            same &= one == json.loads((root / f"out/watchlists/{w['slug']}/trade_conflict.json").read_text(encoding="utf-8"))
+
+    print(f"per-watchlist runs : {old:7.2f} s  ({per:.2f} s each, extrapolated from {k})")
+    print(f"watchlists.py      : {new:7.2f} s  ({n_out} reports, {args.workers} workers)  speedup {old / new:.1f}x")
+    print(f"spot check vs single-watchlist scoring: {'ok' if same else 'MISMATCH'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# bench/suite.py
+"""
+各阶段热点的基准套件：合成数据（bench/synth.py，确定性、全部离线）上测耗时和峰值内存，
+结果追加到 out/bench/results.jsonl（commit / 机器 / 规模 / 用例 / 中位数 / 最小值 / 峰值内存），
+并与同一机器、同一规模下最近一次「其它 commit」的结果比较，变慢或变胖超过 --threshold 的标 REGRESSION。
+  python3 bench/suite.py --list
+  python3 bench/suite.py --size small                    # 全部用例
+  python3 bench/suite.py --size large -k trade,emit      # 名字含 trade 或 emit 的用例；large 的 events.csv 约 2 GB
+  python3 bench/suite.py --size medium --events-mb 500 --fail-on-regression
+每个用例在独立子进程里跑（临时工作目录，导入状态、页缓存之外互不影响）：
+setup 不计时；计时跑 --repeat 次取中位数 / 最小值；再用 tracemalloc 单跑一次测峰值（--no-mem 跳过，会拖慢但不计入耗时）。
+大文件按参数缓存在 out/bench/data，重复跑不重复生成。Polymarket 翻页走本地桩服务（scripts/stub_sources）。
+"""
+import io, os, sys, json, time, socket, platform, argparse, tempfile, subprocess, contextlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+RESULTS = ROOT / "out/bench/results.jsonl"
+DATA_DIR = ROOT / "out/bench/data"
+CFG = str(ROOT / "config/macro.yaml")
+
+SIZES = {
+    "small":  dict(tickers=20, days=252 * 3, events_mb=5, metric_rows=200_000, md_mb=1, markets=1_000,
+                   titles=100_000, reports=50),
+    "medium": dict(tickers=100, days=252 * 10, events_mb=100, metric_rows=2_000_000, md_mb=10, markets=10_000,
+                   titles=1_000_000, reports=500),
+    "large":  dict(tickers=150, days=252 * 20, events_mb=2048, metric_rows=20_000_000, md_mb=100, markets=50_000,
+                   titles=5_000_000, reports=5_000),
+}
+
+# ---- 用例：setup(p) 在子进程的临时目录里准备数据，返回 fn 或 (fn, prep)；prep 每次计时前执行、不计时
+CASES = {}
+
+def case(name):
+    def reg(setup):
+        CASES[name] = setup
+        return setup
+    return reg
+
+def _events(p):
+    from bench import synth
+    from macro.compute_conflict_score import load_keywords
+    kws = load_keywords(CFG)
+    return synth.cached_file(DATA_DIR, "events.csv", {"mb": p["events_mb"], "kws": kws},
+                             lambda path: synth.events_csv(path, p["events_mb"], kws))
+
+@case("corr.latest_corr")
+def _(p):
+    from bench import synth
+    from macro.calc_corr_from_prices import latest_corr
+    px = synth.prices(p["tickers"], p["days"])
+    base, cols = px.iloc[:, 0], [px[c] for c in px.columns[1:]]
+    return lambda: [latest_corr(base, c, w) for c in cols for w in (20, 90)]
+
+@case("corr.aligned_returns")
+def _(p):
+    """每个 ticker 随机缺 5% 的交易日（不同交易日历），对齐 + 对数收益。"""
+    import numpy as np
+    from bench import synth
+    from macro.returns import aligned_returns
+    px = synth.prices(p["tickers"], p["days"])
+    rng = np.random.default_rng(2)
+    series = {c: px[c][rng.random(len(px)) > 0.05] for c in px.columns}
+    return lambda: aligned_returns(series)
+
+@case("corr.write_history")
+def _(p):
+    from bench import synth
+    from macro.rolling_corr import write_history
+    from macro.returns import log_returns
+    ret = log_returns(synth.prices(p["tickers"], p["days"]))
+    return lambda: write_history(ret, [20, 90], Path("corr_history"))
+
+@case("vix.pctile")
+def _(p):
+    from bench import synth
+    from macro.fetch_vix_pctile import pctile
+    s = synth.prices(1, p["days"]).iloc[:, 0] / 5
+    ends = range(max(252, len(s) - 250), len(s))
+    return lambda: [pctile(s.iloc[i - 252:i], s.iloc[i]) for i in ends]
+
+@case("vix.percentile_history")
+def _(p):
+    from bench import synth
+    from macro.rolling_rank import percentile_history
+    close = (synth.prices(1, p["days"]).iloc[:, 0] / 5).tolist()
+    return lambda: percentile_history(close, [252, 126, 1260])
+
+@case("keyword.scan")
+def _(p):
+    from bench import synth
+    from macro.keyword_match import KeywordMatcher
+    from macro.compute_conflict_score import load_keywords
+    kws = load_keywords(CFG)
+    titles = synth.titles(p["titles"], kws)
+    return lambda: KeywordMatcher(kws).match(titles)
+
+@case("trade.score_from_events")
+def _(p):
+    from macro.compute_conflict_score import score_from_events
+    ev = _events(p)
+    return lambda: score_from_events(str(ev), CFG, rebuild=True)
+
+@case("trade.incremental")
+def _(p):
+    """水位停在 95% 处，计时的是解析追加的最后 5% 并重新打分。"""
+    from macro import compute_conflict_score as ccs
+    src = _events(p)
+    ev = Path("events.csv")
+    with open(src, "rb") as fin, open(ev, "wb") as fout:
+        cut = int(src.stat().st_size * 0.95)
+        fout.write(fin.read(cut)); fout.write(fin.readline())  # 截在行尾
+        rest = fin.read()
+    ccs.score_from_events(str(ev), CFG, rebuild=True)
+    saved = {f: Path(f).read_bytes() for f in (ccs.STATE_JSON, ccs.DAILY_CSV)}
+    with ev.open("ab") as f: f.write(rest)
+    def prep():
+        for f, b in saved.items(): Path(f).write_bytes(b)
+    return (lambda: ccs.score_from_events(str(ev), CFG)), prep
+
+@case("emit.load_from_csv[last]")
+def _(p):
+    from bench import synth
+    from scripts.emit_metrics_adapter import load_from_csv
+    path = synth.cached_file(DATA_DIR, "metric.csv", {"rows": p["metric_rows"]},
+                             lambda f: synth.metric_csv(f, p["metric_rows"]))
+    return lambda: load_from_csv(path, "prob", "last")
+
+@case("emit.load_from_csv[mean]")
+def _(p):
+    from bench import synth
+    from scripts.emit_metrics_adapter import load_from_csv
+    path = synth.cached_file(DATA_DIR, "metric.csv", {"rows": p["metric_rows"]},
+                             lambda f: synth.metric_csv(f, p["metric_rows"]))
+    return lambda: load_from_csv(path, "prob", "mean")
+
+@case("report.md_to_html")
+def _(p):
+    from bench import synth
+    sys.path.insert(0, str(ROOT / "report"))
+    from generate_weekly_md_html import convert
+    src = synth.cached_file(DATA_DIR, "weekly.md", {"mb": p["md_mb"]},
+                            lambda f: Path(f).write_text(synth.markdown(p["md_mb"]), encoding="utf-8"))
+    def run():
+        with open(src, encoding="utf-8") as fin, open("weekly.html", "w", encoding="utf-8") as fout:
+            convert(fin, fout.write)
+    return run
+
+@case("polymarket.ingest")
+def _(p):
+    from datetime import datetime, timezone
+    from scripts import stub_sources
+    srv, base = stub_sources.start(n_markets=p["markets"])
+    os.environ.update(stub_sources.env_for(base))
+    from macro import fetch_polymarket_to_csv as pm
+    url, flt = os.environ["POLYMARKET_PRIMARY"], pm.load_filter(CFG)
+    def run():
+        _, snap = pm.ingest(url, pm.fetch_page(url, 0), flt, datetime.now(timezone.utc))
+        if snap.markets != p["markets"]:  # 少收了就不是同一份工作量，计时没有意义
+            raise RuntimeError(f"polymarket.ingest: {snap.markets} of {p['markets']} markets ingested")
+    return run
+
+@case("render.render_many")
+def _(p):
+    from bench import synth
+    from macro.columnar import write_frame
+    from scripts.render_summary_v3 import Renderer
+    Path("report_assets").mkdir()
+    Path("report_assets/architecture.png").write_bytes(os.urandom(256 * 1024))
+    write_frame(synth.heat_frame(), Path("data/macro/trade_heat.npz"))
+    snaps = synth.snapshots(p["reports"])
+    return lambda: Renderer(os.getcwd(), "report_out").render_many(snaps, workers=4)
+
+# ---- 子进程：跑一个用例，最后一行打印 JSON
+def child(name, params, repeat, mem):
+    import tracemalloc
+    from macro.instrument import peak_rss_mb
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        r = CASES[name](params)
+    fn, prep = r if isinstance(r, tuple) else (r, None)
+    setup_s = time.perf_counter() - t0
+    times = []
+    for _ in range(repeat):
+        if prep: prep()
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter(); fn(); times.append(time.perf_counter() - t0)
+    peak = None
+    if mem:
+        if prep: prep()
+        tracemalloc.start()
+        with contextlib.redirect_stdout(io.StringIO()): fn()
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    times.sort()
+    print(json.dumps({"median": times[len(times) // 2], "min": times[0], "setup": round(setup_s, 3),
+                      "peak_mb": None if peak is None else round(peak, 2), "rss_mb": peak_rss_mb()}))
+
+# ---- 主进程：调度子进程、存结果、比较
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+
+def machine():
+    return f"{socket.gethostname()}/{platform.machine()}/{os.cpu_count()}cpu"
+
+def load_results(path=None):
+    path = path or RESULTS
+    if not path.exists(): return []
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def baseline(history, rec, commit=None):
+    """同机器、同规模、同用例、同参数下最近一次其它 commit 的结果（commit 给定时只看以它开头的）。"""
+    for h in reversed(history):
+        if (h["case"], h["size"], h["machine"], h.get("params")) != (rec["case"], rec["size"], rec["machine"], rec["params"]):
+            continue
+        if commit and h["commit"].startswith(commit): return h
+        if not commit and h["commit"] != rec["commit"]: return h
+    return None
+
+def compare(rec, base, threshold):
+    """(说明, 是否回归)：中位耗时或峰值内存比 base 多出 threshold 以上算回归；没有 base 不比。"""
+    if not base or "median" not in base: return "-", False
+    dt = rec["median"] / base["median"] - 1 if base["median"] else 0.0
+    note = f"{dt:+.0%} time vs {base['commit'][:8]}"
+    bad = dt > threshold
+    if rec.get("peak_mb") and base.get("peak_mb"):
+        dm = rec["peak_mb"] / base["peak_mb"] - 1
+        note += f", {dm:+.0%} mem"
+        bad |= dm > threshold
+    if bad: note += "  <-- REGRESSION"
+    return note, bad
+
+def run_case(name, size, params, repeat, mem):
+    with tempfile.TemporaryDirectory(prefix="macro-bench-") as work:
+        env = dict(os.environ, HTTP_CACHE="off", PYTHONHASHSEED="0")
+        p = subprocess.run([sys.executable, str(Path(__file__).resolve()), "--_child", name, "--size", size,
+                            "--params", json.dumps(params), "--repeat", str(repeat)] + ([] if mem else ["--no-mem"]),
+                           cwd=work, env=env, capture_output=True, text=True)
+    if p.returncode != 0:
+        return {"error": (p.stderr.strip().splitlines() or ["exit %d" % p.returncode])[-1]}
+    return json.loads(p.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="offline benchmark suite (time + peak memory per stage)")
+    ap.add_argument("--size", choices=SIZES, default="small")
+    ap.add_argument("-k", help="comma separated substrings of case names")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per case (median reported)")
+    ap.add_argument("--no-mem", action="store_true", help="skip the tracemalloc run")
+    ap.add_argument("--threshold", type=float, default=0.2, help="relative slowdown / memory growth flagged")
+    ap.add_argument("--baseline", help="compare against this commit (default: latest other commit)")
+    ap.add_argument("--fail-on-regression", action="store_true", help="exit 1 if anything regressed")
+    ap.add_argument("--no-save", action="store_true", help="do not append to results.jsonl")
+    ap.add_argument("--list", action="store_true")
+    for k, v in SIZES["small"].items():
+        ap.add_argument(f"--{k.replace('_', '-')}", type=type(v), help=f"override size parameter {k}")
+    ap.add_argument("--params", help=argparse.SUPPRESS)
+    ap.add_argument("--_child", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.list:
+        for n in CASES: print(n)
+        return 0
+    if args._child:
+        child(args._child, json.loads(args.params), args.repeat, not args.no_mem)
+        return 0
+
+    params = dict(SIZES[args.size], **{k: getattr(args, k) for k in SIZES[args.size] if getattr(args, k) is not None})
+    names = list(CASES)
+    if args.k:
+        keys = [s.strip() for s in args.k.split(",") if s.strip()]
+        names = [n for n in names if any(s in n for s in keys)]
+    commit = _git("rev-parse", "--short=12", "HEAD") or "unknown"
+    dirty = bool(_git("status", "--porcelain", "--untracked-files=no"))
+    history = load_results()
+    meta = {"commit": commit, "dirty": dirty, "machine": machine(), "python": platform.python_version(),
+            "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"), "size": args.size}
+    print(f"commit {commit}{' (dirty)' if dirty else ''}  {meta['machine']}  python {meta['python']}  size={args.size}")
+    print(f"{'case':<28} {'median s':>9} {'min s':>9} {'peak MB':>8} {'rss MB':>7}  vs baseline")
+    regressed = []
+    for name in names:
+        # 用例只看它用到的规模参数就够了，但整组参数一起记录，换了规模参数的结果不拿来比
+        r = run_case(name, args.size, params, args.repeat, not args.no_mem)
+        rec = dict(meta, case=name, params=params, **r)
+        if "error" in r:
+            print(f"{name:<28} FAILED: {r['error']}"); regressed.append(name); continue
+        note, bad = compare(rec, baseline(history, rec, args.baseline), args.threshold)
+        if bad: regressed.append(name)
+        peak = "-" if rec.get("peak_mb") is None else f"{rec['peak_mb']:.1f}"
+        rss = "-" if rec.get("rss_mb") is None else f"{rec['rss_mb']:.0f}"
+        print(f"{name:<28} {rec['median']:9.3f} {rec['min']:9.3f} {peak:>8} {rss:>7}  {note}", flush=True)
+        if not args.no_save:
+            RESULTS.parent.mkdir(parents=True, exist_ok=True)
+            with RESULTS.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    if regressed:
+        print(f"{len(regressed)} case(s) regressed or failed: {', '.join(regressed)}")
+        if args.fail_on_regression: return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# bench/synth.py
+"""
+基准测试用的确定性合成数据（同样的参数 + seed 总得到同样的数据，全部离线）：
+  prices(n_tickers, n_days)          几何随机游走收盘价宽表
+  titles(n, keywords, hit_rate)      中英混排事件标题（按 hit_rate 混入关键词，部分大写）
+  events_csv(path, mb, keywords)     流式写 events.csv（publish_time, title, summary, source），可到数 GB
+  metric_csv(path, rows)             ts, prob 追加式指标文件（emit_metrics_adapter 的 CSV 来源）
+  markdown(mb)                       周报 Markdown（标题 / 段落 / 链接 / 嵌套列表 / 表格 / 代码块）
+  snapshots(n)                       渲染用的 metrics / events 快照
+  markets(n)                         Polymarket 市场（与 scripts/stub_sources 同一套，分页由桩服务提供）
+  cached_file(dir, name, params, gen) 大文件按参数缓存，重复跑基准不重复生成
+"""
+import os, sys, json, hashlib
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+VERSION = 1  # 生成逻辑变了就加一，缓存的数据自动失效
+
+WORDS = ("The chip market rallied as Nvidia reported record revenue amid supply chain news "
+         "TSMC capex guidance 公司 发布 财报 市场 芯片 供应链 增长 半导体 订单").split()
+SOURCES = ["wire", "rss", "edgar", "weibo", "blog", ""]
+SUMMARIES = ["markets react to the headline", "officials declined to comment", "分析师预计影响有限",
+             "供应链人士称订单稳定", "analysts expect further measures"]
+TICKERS = ["NVDA", "AMD", "TSM", "ASML", "AVGO", "MU", "INTC", "QCOM"]
+
+def prices(n_tickers, n_days, seed=0, start="2015-01-01"):
+    rng = np.random.default_rng(seed)
+    ret = rng.normal(0, 0.01, size=(n_days, n_tickers))
+    return pd.DataFrame(100 * np.exp(np.cumsum(ret, axis=0)),
+                        index=pd.bdate_range(start, periods=n_days), columns=[f"T{i:04d}" for i in range(n_tickers)])
+
+def titles(n, keywords, hit_rate=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS, dtype=object)
+    base = words[rng.integers(0, len(words), (n, 8))]
+    out = [" ".join(r) for r in base]
+    if keywords:
+        for i in np.flatnonzero(rng.random(n) < hit_rate):
+            k = keywords[rng.integers(len(keywords))]
+            out[i] += " " + (k.upper() if rng.random() < 0.3 else k)
+    return pd.Series(out)
+
+def events_csv(path, mb, keywords, hit_rate=0.05, seed=0, block=100_000, start="2023-01-01"):
+    """按时间升序写约 mb MB 的 events.csv（每块 block 行，内存与总大小无关），返回行数。"""
+    rng = np.random.default_rng(seed)
+    path = Path(path); path.parent.mkdir(parents=True, exist_ok=True)
+    t0 = pd.Timestamp(start, tz="UTC"); rows = 0
+    with path.open("w", encoding="utf-8", newline="") as f:
+        f.write("publish_time,title,summary,source\n")
+        while f.tell() < mb * 2**20:
+            tt = titles(block, keywords, hit_rate, seed=int(rng.integers(2**31)))
+            ts = (t0 + pd.to_timedelta(rows + np.arange(block) * 1, unit="min") * 7).strftime("%Y-%m-%dT%H:%M:%SZ")
+            sm = np.array(SUMMARIES, dtype=object)[rng.integers(0, len(SUMMARIES), block)]
+            sr = np.array(SOURCES, dtype=object)[rng.integers(0, len(SOURCES), block)]
+            f.write("".join(f'{a},"{b}",{c},{d}\n' for a, b, c, d in zip(ts, tt, sm, sr)))
+            rows += block
+    return rows
+
+def metric_csv(path, rows, seed=0, block=1_000_000):
+    """ts, prob：每分钟一行，约 2% 的空值，按时间升序。"""
+    rng = np.random.default_rng(seed)
+    path = Path(path); path.parent.mkdir(parents=True, exist_ok=True)
+    t0 = pd.Timestamp("2020-01-01")
+    with path.open("w", encoding="utf-8", newline="") as f:
+        f.write("ts,prob\n")
+        for a in range(0, rows, block):
+            n = min(block, rows - a)
+            ts = (t0 + pd.to_timedelta(a + np.arange(n), unit="min")).strftime("%Y-%m-%dT%H:%M:%SZ")
+            p = np.round(rng.random(n), 4).astype(str).astype(object)
+            p[rng.random(n) < 0.02] = ""
+            f.write("".join(f"{x},{y}\n" for x, y in zip(ts, p)))
+    return path
+
+def markdown(mb, seed=0):
+    rng = np.random.default_rng(seed)
+    parts, size, week = [], 0, 0
+    while size < mb * 2**20:
+        week += 1
+        t = [TICKERS[i] for i in rng.permutation(len(TICKERS))[:5]]
+        block = [f"# AI Chips Weekly #{week}", "",
+                 f"## Executive Summary", "",
+                 f"Demand for **{t[0]}** accelerators stayed strong; see [filing](https://example.com/{t[0]}/{week}) "
+                 f"and ![chart](charts/{week}.png). Supply commentary from *{t[1]}* and `capex` guidance.",
+                 "Second line of the paragraph with another [source](https://news.example.com/a?id=%d)." % week, "",
+                 "## Watchlist", "",
+                 "| Ticker | Close | Δ% | Note |", "|:--|--:|--:|:-:|"]
+        block += [f"| {x} | {rng.uniform(50, 900):.2f} | {rng.normal(0, 3):+.1f} | [link](https://q.example.com/{x}) |"
+                  for x in t]
+        block += ["", "## Drivers", ""]
+        for x in t[:3]:
+            block += [f"- {x} supply chain", f"  - lead times [{x}](https://example.com/{x}/lt)",
+                      f"    1. foundry capacity", f"    2. packaging **CoWoS**", f"- {x} pricing"]
+        block += ["", "```python", "ret = px.pct_change()", "corr = ret.rolling(90).corr()", "```", ""]
+        s = "\n".join(block) + "\n"
+        parts.append(s); size += len(s.encode("utf-8"))
+    return "".join(parts)
+
+def snapshots(n, seed=0, sectors=("ai_chips", "memory", "foundry", "equipment", "networking")):
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range("2024-01-01", periods=n // len(sectors) + 1).strftime("%Y-%m-%d")
+    out = []
+    for i in range(n):
+        sector = sectors[i % len(sectors)]
+        m = {"rate_cut_odds": float(rng.random()), "vix_pctile": float(rng.random()),
+             "corr_spx_dxy": float(rng.uniform(-1, 1)), "corr_spx_10y": float(rng.uniform(-1, 1)),
+             "stance": ["Risk-On", "Neutral", "Risk-Off"][i % 3]}
+        ev = {"last7": int(rng.integers(0, 50)), "prev7": int(rng.integers(1, 50)), "delta_pct": 12.5}
+        out.append({"metrics": m, "events": ev, "as_of": days[i // len(sectors)],
+                    "title": f"LumiereX Weekly — {sector} / Macro Snapshot", "slug": f"{sector}_weekly"})
+    return out
+
+def heat_frame(start="2023-06-01", end="2025-12-31", seed=1):
+    d = pd.date_range(start, end, name="date")
+    hits = np.random.default_rng(seed).integers(0, 5, len(d))
+    heat = pd.DataFrame({"n": hits + 3, "hits": hits}, index=d)
+    for w in (7, 14, 30):
+        heat[f"heat_{w}"] = heat["hits"].rolling(w, min_periods=w).sum()
+    return heat
+
+def markets(n, offset=0):
+    from scripts.stub_sources import markets as stub_markets
+    return stub_markets(n, offset)
+
+def cached_file(cache_dir, name, params, gen):
+    """gen(path) 生成文件；同名同参数（含 VERSION）已生成过就直接复用。返回路径。"""
+    key = hashlib.sha1(json.dumps([VERSION, params], sort_keys=True).encode()).hexdigest()[:10]
+    p = Path(cache_dir) / f"{Path(name).stem}-{key}{Path(name).suffix}"
+    if not p.exists():
+        tmp = p.with_name(p.name + ".part"); p.parent.mkdir(parents=True, exist_ok=True)
+        gen(tmp); os.replace(tmp, p)
+    return p
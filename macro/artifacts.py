@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# macro/artifacts.py
+"""
+输出落盘的统一入口（只用标准库）：
+  atomic_write(path, data) / atomic_open(path, mode)   同目录临时文件 -> fsync -> os.replace，读者只会看到旧的或新的完整文件
+  ArtifactStore                                        按内容寻址的版本库：out/artifacts/<name>/<digest>.<ext> + LATEST 指针 + versions.jsonl
+内容没变不产生新版本，相邻两次运行的差异先比 digest 即可；大序列用 columnar 的 npz（put_frame）。
+流水线每次运行后按 ARTIFACT_KEEP（默认 50）裁剪旧版本。ARTIFACT_FSYNC=0 关闭 fsync（批量回填时省时间，代价是掉电可能丢最后几次写入）。
+"""
+import os, json, hashlib, threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+FSYNC = os.getenv("ARTIFACT_FSYNC", "1").lower() not in ("0", "off", "false", "no")
+ARTIFACT_DIR = Path(os.getenv("ARTIFACT_DIR", "out/artifacts"))
+KEEP = int(os.getenv("ARTIFACT_KEEP", "50"))  # 每个 name 保留的版本数
+
+def _tmp_path(path: Path):
+    # 点号开头：不会被 *.csv 之类的 glob 扫到；带 pid / 线程号：并发写同一目标互不覆盖
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def _fsync_dir(d: Path):
+    try:
+        fd = os.open(d, os.O_RDONLY)
+    except OSError:
+        return  # Windows 等不支持打开目录
+    try: os.fsync(fd)
+    except OSError: pass
+    finally: os.close(fd)
+
+@contextmanager
+def atomic_open(path, mode="w", fsync=None, **kw):
+    """with atomic_open(p, "w", newline="") as f: ...；块内出错时目标文件保持原样。"""
+    path = Path(path); path.parent.mkdir(parents=True, exist_ok=True)
+    fsync = FSYNC if fsync is None else fsync
+    if "b" not in mode: kw.setdefault("encoding", "utf-8")
+    tmp = _tmp_path(path)
+    f = open(tmp, mode, **kw)
+    try:
+        yield f
+        f.flush()
+        if fsync: os.fsync(f.fileno())
+        f.close()
+        os.replace(tmp, path)
+        if fsync: _fsync_dir(path.parent)
+    except BaseException:
+        f.close()
+        try: tmp.unlink()
+        except FileNotFoundError: pass
+        raise
+
+def atomic_write(path, data, fsync=None):
+    """str 按 utf-8 写，bytes 原样写。返回 Path。"""
+    with atomic_open(path, "wb", fsync) as f:
+        f.write(data.encode("utf-8") if isinstance(data, str) else data)
+    return Path(path)
+
+def write_json(path, obj, indent=2, fsync=None):
+    return atomic_write(path, json.dumps(obj, ensure_ascii=False, indent=indent), fsync)
+
+class ArtifactStore:
+    """
+    每个 name 一个目录：
+      <digest>.<ext>    内容寻址的版本（digest = sha256 前 16 位）
+      LATEST            当前版本文件名
+      versions.jsonl    {ts, version, size} 追加记录，按时间顺序
+    """
+    def __init__(self, root=ARTIFACT_DIR):
+        self.root = Path(root)
+        self._lock = threading.RLock()  # prune_all 持锁调用 prune
+
+    def _dir(self, name):
+        return self.root / name
+
+    def put(self, name, data, ext="bin", digest=None):
+        """写入一个版本并把 LATEST 指过去；内容与当前版本相同时什么都不做。返回版本号。"""
+        data = data.encode("utf-8") if isinstance(data, str) else data
+        version = (digest or hashlib.sha256(data).hexdigest())[:16]
+        d = self._dir(name); fname = f"{version}.{ext}"
+        with self._lock:
+            if self.latest_version(name) == fname: return version
+            if not (d / fname).exists(): atomic_write(d / fname, data)
+            with (d / "versions.jsonl").open("a", encoding="utf-8") as f:
+                f.write(json.dumps({"ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                                    "version": fname, "size": len(data)}) + "\n")
+            atomic_write(d / "LATEST", fname)
+        return version
+
+    def put_json(self, name, obj):
+        # 键排序后再哈希：字段顺序不同不算新版本
+        body = json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=True)
+        return self.put(name, body, "json")
+
+    def put_frame(self, name, df):
+        """数值型 DataFrame 存成 npz；digest 按列数据计算（npz 内含时间戳，字节不稳定）。"""
+        from macro.columnar import encode_frame, frame_digest
+        return self.put(name, encode_frame(df), "npz", digest=frame_digest(df))
+
+    def latest_version(self, name):
+        try: return (self._dir(name) / "LATEST").read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError: return None
+
+    def latest(self, name):
+        """当前版本的路径（没有返回 None）；npz 可直接交给 columnar.read_frame。"""
+        v = self.latest_version(name)
+        return self._dir(name) / v if v else None
+
+    def versions(self, name):
+        """[{ts, version, size}]，旧到新。"""
+        p = self._dir(name) / "versions.jsonl"
+        if not p.exists(): return []
+        with p.open(encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def path(self, name, version):
+        return self._dir(name) / version
+
+    def read_json(self, name, version=None):
+        p = self.path(name, version) if version else self.latest(name)
+        return None if p is None else json.loads(p.read_text(encoding="utf-8"))
+
+    def names(self):
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir()) if self.root.is_dir() else []
+
+    def prune(self, name, keep=None):
+        """
+        只保留最近 keep（默认 ARTIFACT_KEEP）个不同版本（LATEST 永远保留），返回删除的文件数。
+        versions.jsonl 同时压缩成每个留下的版本一条（它最后一次成为当前版本的记录）。
+        """
+        keep = KEEP if keep is None else keep
+        with self._lock:
+            recs = self.versions(name)
+            last = {r["version"]: i for i, r in enumerate(recs)}  # 同一版本多次出现（A -> B -> A）只算一个
+            live = set(sorted(last, key=last.get)[-keep:] if keep > 0 else ()) | {self.latest_version(name)}
+            n = 0
+            for p in self._dir(name).glob("*.*"):
+                # 点号开头的是正在写的临时文件
+                if p.name in ("versions.jsonl",) or p.name in live or p.name.startswith("."): continue
+                p.unlink(); n += 1
+            kept = [r for i, r in enumerate(recs) if r["version"] in live and last[r["version"]] == i]
+            if len(kept) < len(recs):
+                atomic_write(self._dir(name) / "versions.jsonl", "".join(json.dumps(r) + "\n" for r in kept))
+        return n
+
+    def prune_all(self, keep=None):
+        """对所有 name 执行 prune，返回删除的文件总数。"""
+        with self._lock:
+            return sum(self.prune(name, keep) for name in self.names())
+
+STORE = ArtifactStore()
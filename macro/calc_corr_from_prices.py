@@ -1,67 +1,100 @@
 #!/usr/bin/env python3
 # macro/calc_corr_from_prices.py
-import os, json, sys
+from __future__ import annotations
+import os, sys
 from pathlib import Path
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from macro.core import lazy, config
+from macro.price_store import PriceStore, CSV_TICKERS
+from macro.net import POOL_SIZE
+from macro.instrument import span
+from macro.artifacts import write_json, STORE as ARTIFACTS
+from macro.http_cache import cached_frame
+from macro.rolling_corr import append_history, corr_at, HIST_DIR
+from macro.returns import align_prices, aligned_returns, log_returns, ALIGN
+
+pd = lazy("pandas")
 
 OUT_DIR = Path("data/macro"); OUT_DIR.mkdir(parents=True, exist_ok=True)
 JSON_OUT = OUT_DIR / "corr.json"
 
-WIN = int(os.getenv("CORR_WINDOW", "90"))  # 90日相关性窗口
+# 相关性窗口，可逗号分隔多个（如 30,90,180）；第一个用于 corr.json
+WINDOWS = [int(w) for w in os.getenv("CORR_WINDOW", "90").split(",") if w.strip()]
+WIN = WINDOWS[0]
 
-def load_local_csv(path: Path):
-    if not path.exists(): return None
-    try:
-        df = pd.read_csv(path, parse_dates=["date"])
-        if "close" not in df.columns:
-            # 最后一列当 close 兜底
-            df.rename(columns={df.columns[-1]:"close"}, inplace=True)
-        return df.sort_values("date")
-    except Exception:
-        return None
+FALLBACKS = {"DX-Y.NYB": "DX=F"}
+LOCAL_CSV = {t: f for f, t in CSV_TICKERS.items()}
+# corr.json 键 -> config tickers 里的两个名字
+PAIRS = {"spx_dxy": ("SPX", "DXY"), "spx_10y": ("SPX", "UST10Y")}
 
-def fetch_yf(ticker):
+STORE = PriceStore()
+
+def fetch_yf(ticker, start=None):
     try:
         import yfinance as yf
     except ImportError:
         return None
-    df = yf.Ticker(ticker).history(period="2y")[["Close"]]
-    if df.empty: return None
-    df = df.reset_index().rename(columns={"Date":"date","Close":"close"})
-    return df
+    def pull():
+        t = yf.Ticker(ticker)
+        hist = t.history(start=start) if start is not None else t.history(period="2y")
+        return hist[["Close"]].reset_index().rename(columns={"Date":"date","Close":"close"})
+    with span("fetch.yfinance", ticker=ticker):
+        return cached_frame(f"yf:{ticker}:{start or '2y'}", "yfinance", pull)
+
+def sync_ticker(ticker, local=None):
+    """把 ticker 同步进本地价格库：local csv 有更新就导入，再从 yfinance 补增量。返回新增行数。"""
+    n = 0
+    p = STORE.path(ticker)
+    if local and local.exists() and (not p.exists() or local.stat().st_mtime > p.stat().st_mtime):
+        try:
+            n += STORE.import_csv(local, ticker)
+            if p.exists(): p.touch()  # 记下已导入的时间点
+        except Exception as e: print(f"[corr] import {local} failed: {e}", file=sys.stderr)
+    last = STORE.last_date(ticker)
+    # 从最后一个 bar 当天开始拉，顺便刷新最后一条
+    try: n += STORE.append(ticker, fetch_yf(ticker, start=last.date() if last is not None else None))
+    except Exception as e: print(f"[corr] yfinance {ticker} failed: {e}", file=sys.stderr)
+    return n
 
 def get_series(name, primary, fallback=None, local=None):
-    # 1) local csv 优先（如果你提供了）
-    if local and local.exists():
-        df = load_local_csv(local)
-        if df is not None: 
-            print(f"[corr] using local {name} -> {local}")
+    for ticker in (primary, fallback):
+        if not ticker: continue
+        n = sync_ticker(ticker, local if ticker == primary else None)
+        df = STORE.read(ticker)
+        if df is not None:
+            print(f"[corr] using store {name} -> {ticker} ({len(df)} rows, +{n})")
             return df
-    # 2) yfinance
-    df = fetch_yf(primary)
-    if df is None and fallback:
-        df = fetch_yf(fallback)
-    if df is not None:
-        print(f"[corr] using yfinance {name} -> {primary if df is not None else fallback}")
-    return df
-
-def latest_corr(a: pd.Series, b: pd.Series, win: int):
-    df = pd.concat([a, b], axis=1).dropna()
-    if df.shape[0] < win: return None
-    ret = df.pct_change().dropna()
-    return round(ret.iloc[-win:].corr().iloc[0,1], 4)
+    return None
+
+def load_tickers(cfg_path='./config/macro.yaml'):
+    return config(cfg_path).get('tickers') or {"SPX": "^GSPC", "DXY": "DX-Y.NYB", "UST10Y": "^TNX"}
+
+def latest_corr(a: pd.Series, b: pd.Series, win: int, how=None):
+    """a / b：以日期为索引的收盘价（或 DataFrame[date, close]），按 how 对齐后取最近 win 个对数收益的相关。"""
+    ret = aligned_returns({"a": a, "b": b}, how, base="a").dropna()
+    if len(ret) < win: return None
+    return round(float(ret.iloc[-win:].corr().iloc[0, 1]), 4)
 
 def main():
     base = Path("data/prices")
-    spx  = get_series("SPX", "^GSPC", None, base/"spx.csv")
-    dxy  = get_series("DXY", "DX-Y.NYB", "DX=F", base/"dxy.csv")
-    tnx  = get_series("TNX", "^TNX", None, base/"tnx.csv")
+    tickers = load_tickers()
+    # 各 ticker 的同步互不依赖，并发拉取
+    with ThreadPoolExecutor(max_workers=min(POOL_SIZE, max(len(tickers), 1))) as ex:
+        futs = {name: ex.submit(get_series, name, t, FALLBACKS.get(t), base/LOCAL_CSV[t] if t in LOCAL_CSV else None)
+                for name, t in tickers.items()}
+        series = {name: f.result() for name, f in futs.items()}
+    px = align_prices(series, base="SPX")
 
     corr_dxy = corr_10y = None
-    if spx is not None and dxy is not None:
-        corr_dxy = latest_corr(spx["close"], dxy["close"], WIN)
-    if spx is not None and tnx is not None:
-        corr_10y = latest_corr(spx["close"], tnx["close"], WIN)
+    if px.shape[1] >= 2:
+        with span("compute.corr_history", cols=px.shape[1], align=ALIGN) as sp:
+            sp["rows"] = k = append_history(log_returns(px), WINDOWS)
+        print(f"[corr] rolling history {px.shape[0]}x{px.shape[1]} ({k} computed) windows={WINDOWS} "
+              f"align={ALIGN} -> {HIST_DIR}")
+        corr_dxy = corr_at(WIN, *PAIRS["spx_dxy"])
+        corr_10y = corr_at(WIN, *PAIRS["spx_10y"])
 
     # 兜底：环境或固定数
     if corr_dxy is None:
@@ -72,7 +105,8 @@ def main():
         except: corr_10y = -0.3
 
     out = {"spx_dxy": float(corr_dxy), "spx_10y": float(corr_10y)}
-    JSON_OUT.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_json(JSON_OUT, out)
+    ARTIFACTS.put_json("corr", out)
     print(f"[corr] wrote {JSON_OUT} -> {out}")
 
 if __name__ == "__main__":
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# macro/columnar.py
+"""
+紧凑列式存储：DataFrame 的每一列存成 .npz 里的一个数组（压缩），索引单独一列。
+只支持数值/布尔/日期列；读取时可只取部分列（npz 按列惰性解压）。
+"""
+from __future__ import annotations
+import io, json, hashlib
+
+from macro.core import lazy
+from macro.artifacts import atomic_write
+
+np, pd = lazy("numpy"), lazy("pandas")
+
+def _np(x):
+    """带时区的日期转成 UTC 无时区的 datetime64[ns]（否则 to_numpy 得到 object 数组，npz 读不回来）。"""
+    if getattr(x.dtype, "tz", None) is not None:
+        x = x.tz_convert(None) if isinstance(x, pd.Index) else x.dt.tz_convert(None)
+    a = x.to_numpy()
+    return a.astype("M8[ns]") if a.dtype.kind == "M" else a
+
+def _arrays(df: pd.DataFrame):
+    arrays = {f"c{i}": _np(df[c]) for i, c in enumerate(df.columns)}
+    arrays["__index__"] = _np(df.index)
+    meta = {"columns": [str(c) for c in df.columns], "index_name": df.index.name}
+    arrays["__meta__"] = np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+    return arrays
+
+def encode_frame(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **_arrays(df))
+    return buf.getvalue()
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """按列名、dtype 和数据计算的 sha256；同样的表总得到同样的值（npz 字节里有时间戳，不能直接哈希）。"""
+    h = hashlib.sha256()
+    for k, a in _arrays(df).items():
+        a = np.ascontiguousarray(a)
+        h.update(f"{k}:{a.dtype.str}:{a.shape}".encode()); h.update(a.tobytes())
+    return h.hexdigest()
+
+def write_frame(df: pd.DataFrame, path):
+    """原子写入（临时文件 + 改名），读者不会读到半个 npz。"""
+    return atomic_write(path, encode_frame(df))
+
+def read_frame(path, columns=None) -> pd.DataFrame:
+    with np.load(path, allow_pickle=False) as z:
+        meta = json.loads(z["__meta__"].tobytes().decode("utf-8"))
+        names = meta["columns"]
+        want = names if columns is None else [c for c in columns if c in names]
+        data = {c: z[f"c{names.index(c)}"] for c in want}
+        index = pd.Index(z["__index__"], name=meta.get("index_name"))
+    return pd.DataFrame(data, index=index, columns=want)
@@ -1,43 +1,131 @@
-import os, re, json, pandas as pd
+import os, io, re, sys, csv, json, time, hashlib, argparse
+from pathlib import Path
 from datetime import datetime, timedelta
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from macro.core import lazy, config
+from macro.keyword_match import KeywordMatcher
+from macro.columnar import write_frame
+from macro.artifacts import atomic_open, write_json, STORE as ARTIFACTS
+from macro.instrument import span, count, peak_rss_mb
+
+np, pd = lazy("numpy"), lazy("pandas")
+
 OUT_JSON = './data/macro/trade_conflict.json'
+# 增量状态：STATE_JSON 记录已消费到 events.csv 的字节偏移/行数，DAILY_CSV 是按日聚合的命中数
+STATE_JSON = './data/macro/trade_state.json'
+DAILY_CSV = './data/macro/trade_daily.csv'
+STATE_VERSION = 2  # 日聚合表的列定义变了就加一，旧状态自动全量重建
+# 日度热度序列（列式 npz）：n / hits / heat_<w> / kw:<关键词> / src:<来源>
+HEAT_OUT = './data/macro/trade_heat.npz'
+HEAD_SIG_BYTES = 65536
+# 流式读取：只取需要的列、全部按字符串读，每块 CHUNK_ROWS 行，峰值内存与文件大小无关
+CHUNK_ROWS = int(os.getenv("EVENTS_CHUNK_ROWS", "100000"))
+USECOLS = ('publish_time', 'title', 'summary', 'source')
 
 def load_keywords(cfg_path='./config/macro.yaml'):
-    import yaml
-    with open(cfg_path,'r',encoding='utf-8') as f:
-        cfg = yaml.safe_load(f) or {}
-    kws = cfg.get('trade_keywords',[]) or []
+    kws = config(cfg_path).get('trade_keywords',[]) or []
     return [k.lower() for k in kws]
 
-def score_from_events(events_csv='./data/warehouse/events.csv', cfg_path='./config/macro.yaml'):
-    if not os.path.exists(events_csv):
-        res = {"last7":0, "prev7":0, "delta_pct": None, "note":"events.csv not found"}
-        os.makedirs(os.path.dirname(OUT_JSON), exist_ok=True)
-        json.dump(res, open(OUT_JSON,'w'), ensure_ascii=False, indent=2)
-        print("Trade heat ->", OUT_JSON); return OUT_JSON
+def load_heat_windows(cfg_path='./config/macro.yaml'):
+    return [int(w) for w in (config(cfg_path).get('trade_heat_windows') or [7, 14, 30])]
 
-    df = pd.read_csv(events_csv)
-    if df.empty:
-        res = {"last7":0, "prev7":0, "delta_pct": None, "note":"empty events.csv"}
-        os.makedirs(os.path.dirname(OUT_JSON), exist_ok=True)
-        json.dump(res, open(OUT_JSON,'w'), ensure_ascii=False, indent=2)
-        print("Trade heat ->", OUT_JSON); return OUT_JSON
+def _dump(res):
+    write_json(OUT_JSON, res)
+    ARTIFACTS.put_json("trade_conflict", res)
+
+class _Window(io.RawIOBase):
+    """只读文件的 [start, end) 字节区间，当作文件交给 read_csv。"""
+    def __init__(self, path, start, end):
+        self._f = open(path, 'rb'); self._f.seek(start); self._left = end - start
+    def readable(self): return True
+    def readinto(self, b):
+        n = min(len(b), self._left)
+        if n <= 0: return 0
+        got = self._f.readinto(memoryview(b)[:n]) or 0
+        self._left -= got
+        return got
+    def close(self):
+        self._f.close(); super().close()
+
+def _read_header(path):
+    """返回 (列名, 表头字节长度)。"""
+    with open(path, 'rb') as f:
+        line = f.readline()
+    return next(csv.reader([line.decode('utf-8-sig')]), []), len(line)
+
+def _complete_end(path, size):
+    """最后一个换行符之后的字节位置：只消费写完整的行。"""
+    with open(path, 'rb') as f:
+        pos = size
+        while pos > 0:
+            step = min(HEAD_SIG_BYTES, pos); f.seek(pos - step)
+            i = f.read(step).rfind(b'\n')
+            if i != -1: return pos - step + i + 1
+            pos -= step
+    return 0
+
+def _head_sha(path, n):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read(n)).hexdigest()
+
+def iter_event_chunks(path, start, end, header, chunksize=CHUNK_ROWS):
+    """按块产出 events.csv 在 [start, end) 字节区间内的行（只含 USECOLS 中存在的列）。"""
+    cols = [c for c in header if c in USECOLS]
+    with io.BufferedReader(_Window(path, start, end), buffer_size=1 << 20) as f:
+        yield from pd.read_csv(f, header=None, names=header, usecols=cols,
+                               dtype={c: str for c in cols}, chunksize=chunksize)
+
+def tail_frame(path, start, end, header):
+    """[start, end) 是文件末尾一行没有换行结尾的记录（可能没写完）：缺的列补空，返回与 iter_event_chunks 同列的块。"""
+    with open(path, 'rb') as f:
+        f.seek(start); raw = f.read(end - start)
+    row = next(csv.reader([raw.decode('utf-8', errors='replace')]), [])
+    row = (row + [None] * len(header))[:len(header)]
+    return pd.DataFrame([row], columns=header)[[c for c in header if c in USECOLS]]
+
+def scan_chunk(df, matcher):
+    """事件块 -> (日期 datetime64 数组, hit, kw_rows, 来源数组或 None)；只保留时间有效的行，行号相对这些行。"""
+    # 统一成 UTC 无时区：带 Z / 偏移的时间戳与日表（CSV 读回为无时区）才能合并
+    t = pd.to_datetime(df['publish_time'], errors='coerce', utc=True).dt.tz_localize(None)
+    ok = t.notna().to_numpy()
+    def col(name):
+        return df[name][ok].fillna('').astype(str) if name in df.columns else pd.Series('', index=df.index[ok])
+    hit, kw_rows = matcher.scan((col('title') + " " + col('summary')).tolist())
+    src = col('source').str.strip().replace('', 'unknown').to_numpy() if 'source' in df.columns else None
+    return t[ok].dt.normalize().to_numpy(), hit, kw_rows, src
+
+def daily_counts(codes, days, hit, kw_rows, src=None):
+    """逐行的日期编号 / 命中 -> 按日聚合（index=日期，列 n / hits / kw:<关键词> / src:<来源>）。"""
+    m = len(days)
+    out = {'n': np.bincount(codes, minlength=m), 'hits': np.bincount(codes[hit], minlength=m)}
+    for k, r in kw_rows.items():
+        out[f'kw:{k}'] = np.bincount(codes[r], minlength=m)
+    daily = pd.DataFrame(out, index=pd.DatetimeIndex(days, name='date'))
+    if src is not None:
+        # 各来源每日命中数
+        by_src = pd.crosstab(days[codes[hit]], src[hit]).reindex(days, fill_value=0)
+        by_src.columns = [f'src:{c}' for c in by_src.columns]
+        daily = daily.join(by_src.set_axis(daily.index))
+    return daily.fillna(0).astype('int64')
+
+def aggregate(df, matcher):
+    """事件表 -> 按日聚合（index=日期，列 n / hits / kw:<关键词> / src:<来源>）；无效时间的行丢弃。"""
+    day, hit, kw_rows, src = scan_chunk(df, matcher)
+    codes, days = pd.factorize(day, sort=True)
+    return daily_counts(codes, pd.DatetimeIndex(days, name='date'), hit, kw_rows, src)
+
+def merge_daily(a, b):
+    if a is None or a.empty: return b
+    if b is None or b.empty: return a
+    return a.add(b, fill_value=0).astype('int64').sort_index()
 
-    df['publish_time'] = pd.to_datetime(df['publish_time'], errors='coerce')
-    df = df.dropna(subset=['publish_time'])
-    df['title'] = df.get('title','').astype(str).fillna('') + " " + df.get('summary','').astype(str).fillna('')
-    kws = load_keywords(cfg_path)
-    def hit(s):
-        sl = str(s).lower()
-        return any(k in sl for k in kws)
-    df['hit'] = df['title'].apply(hit)
-
-    end = df['publish_time'].max().normalize()
-    start_last = end - pd.Timedelta(days=6)
-    start_prev = start_last - pd.Timedelta(days=7)
-    last7 = df[(df['publish_time']>=start_last) & (df['publish_time']<=end) & (df['hit'])].shape[0]
-    prev7 = df[(df['publish_time']>=start_prev) & (df['publish_time']<start_last) & (df['hit'])].shape[0]
+def score_daily(daily):
+    """按日聚合 -> last7 / prev7 / delta_pct / by_keyword；以最后一个有事件的日期为锚点（含当日）。"""
+    end = daily.index[daily['n'] > 0].max()
+    last = daily.loc[end - pd.Timedelta(days=6):end]
+    prev = daily.loc[end - pd.Timedelta(days=13):end - pd.Timedelta(days=7)]
+    last7, prev7 = int(last['hits'].sum()), int(prev['hits'].sum())
 
     delta_pct = None
     if prev7 == 0 and last7>0:
@@ -45,11 +133,124 @@ def score_from_events(events_csv='./data/warehouse/events.csv', cfg_path='./conf
     elif prev7>0:
         delta_pct = (last7 - prev7) / prev7 * 100.0
 
-    res = {"last7": int(last7), "prev7": int(prev7), "delta_pct": (None if delta_pct is None else round(delta_pct,1))}
-    os.makedirs(os.path.dirname(OUT_JSON), exist_ok=True)
-    json.dump(res, open(OUT_JSON,'w'), ensure_ascii=False, indent=2)
+    # 近 7 日各关键词命中的事件数（一条事件可命中多个关键词）
+    by_kw = {c[3:]: int(v) for c, v in last.filter(like='kw:').sum().items() if v}
+    return {"last7": last7, "prev7": prev7, "delta_pct": (None if delta_pct is None else round(delta_pct,1)),
+            "by_keyword": by_kw}
+
+def heat_series(daily, windows):
+    """按日聚合补齐到连续日历（缺的日子记 0），加上各窗口的滚动命中数 heat_<w>（窗口未满为 NaN）。"""
+    full = pd.date_range(daily.index.min(), daily.index.max(), freq='D', name='date')
+    d = daily.reindex(full, fill_value=0)
+    heat = {f'heat_{w}': d['hits'].rolling(w, min_periods=w).sum() for w in windows}
+    return pd.concat([d[['n', 'hits']], pd.DataFrame(heat), d.drop(columns=['n', 'hits'])], axis=1)
+
+def heat_summary(heat, windows):
+    """最后一天各窗口的热度（窗口未满为 None）。"""
+    last = heat.iloc[-1]
+    return {str(w): (None if last[f'heat_{w}'] != last[f'heat_{w}'] else int(last[f'heat_{w}'])) for w in windows}
+
+def _load_state(events_csv, kw_sig):
+    try:
+        with open(STATE_JSON, 'r', encoding='utf-8') as f: st = json.load(f)
+        daily = pd.read_csv(DAILY_CSV, index_col='date', parse_dates=['date'])
+    except Exception:
+        return None
+    if st.get('events') != os.path.abspath(events_csv) or st.get('keywords') != kw_sig:
+        return None
+    # 文件被截断或整体替换：回到全量
+    if os.path.getsize(events_csv) < st['offset'] or _head_sha(events_csv, st['head_len']) != st['head_sha']:
+        return None
+    return st, daily
+
+def _save_state(events_csv, kw_sig, offset, rows, daily):
+    head_len = min(offset, HEAD_SIG_BYTES)
+    st = {"events": os.path.abspath(events_csv), "keywords": kw_sig, "offset": offset, "rows": rows,
+          "head_len": head_len, "head_sha": _head_sha(events_csv, head_len),
+          "updated": datetime.now().isoformat(timespec='seconds')}
+    # 先落日表再落水位：中途失败时水位仍指向旧日表，下次从旧水位重放
+    with atomic_open(DAILY_CSV, 'w', newline='') as f:
+        daily.to_csv(f, index_label='date', date_format='%Y-%m-%d')
+    write_json(STATE_JSON, st)
+
+def score_from_events(events_csv='./data/warehouse/events.csv', cfg_path='./config/macro.yaml', rebuild=False,
+                      stats=False, windows=None):
+    """
+    默认增量：只解析 events.csv 上次水位之后新追加的完整行，合并进按日聚合表再打分。
+    rebuild=True（或状态缺失/关键词变化/文件被替换）时从头扫描；两种模式输出一致。
+    末尾没有换行的最后一行两种模式都计入结果，但不推进水位。
+    两种模式都分块流式读取，边读边聚合到日桶；stats=True 打印峰值 RSS 和 rows/s。
+    同时把完整日度序列与 windows（默认取配置 trade_heat_windows）滚动热度写入 HEAT_OUT。
+    """
+    if not os.path.exists(events_csv):
+        res = {"last7":0, "prev7":0, "delta_pct": None, "note":"events.csv not found"}
+        _dump(res)
+        print("Trade heat ->", OUT_JSON); return OUT_JSON
+
+    matcher = KeywordMatcher(load_keywords(cfg_path))
+    kw_sig = hashlib.sha1("\n".join([f"v{STATE_VERSION}"] + matcher.keywords).encode('utf-8')).hexdigest()
+    header, head_len = _read_header(events_csv)
+    size = os.path.getsize(events_csv)
+    end = _complete_end(events_csv, size)
+
+    state = None if rebuild else _load_state(events_csv, kw_sig)
+    if state:
+        st, daily = state
+        start, rows, mode = st['offset'], st['rows'], "incremental"
+    else:
+        daily, start, rows, mode = None, head_len, 0, "rebuild"
+
+    new, t0 = 0, time.perf_counter()
+    if end > start:
+        with span("parse.events", mode=mode, bytes=end - start) as sp:
+            for chunk in iter_event_chunks(events_csv, start, end, header):
+                new += len(chunk)
+                daily = merge_daily(daily, aggregate(chunk, matcher))
+            sp["rows"] = new
+    count("rows_processed", new, stage="trade")
+    rows += new
+    if stats:
+        sec = time.perf_counter() - t0
+        print(f"[trade] scanned {new} rows / {(end - start) / 2**20:.1f} MB in {sec:.2f}s "
+              f"({new / sec if sec > 0 else 0:,.0f} rows/s), peak RSS {peak_rss_mb() or float('nan'):.0f} MB")
+    if daily is None:
+        daily = pd.DataFrame(columns=['n', 'hits'], index=pd.DatetimeIndex([], name='date'), dtype='int64')
+    _save_state(events_csv, kw_sig, max(end, start), rows, daily)
+    # 文件末尾没有换行的最后一行：本次照常计入结果，但不推进水位、不进日表（写入方可能还没写完，
+    # 补完后按完整行重新解析），增量与 --rebuild 的输出因此一致
+    tail = 0
+    if size > max(end, start):
+        chunk = tail_frame(events_csv, max(end, start), size, header)
+        tail = len(chunk)
+        daily = merge_daily(daily, aggregate(chunk, matcher))
+    print(f"[trade] {mode}: +{new} rows (total {rows})" + (f", +{tail} unterminated" if tail else ""))
+
+    if daily.empty or not (daily['n'] > 0).any():
+        res = {"last7":0, "prev7":0, "delta_pct": None, "note":"empty events.csv"}
+        _dump(res)
+        print("Trade heat ->", OUT_JSON); return OUT_JSON
+
+    with span("compute.trade_heat", days=len(daily)):
+        res = score_daily(daily)
+        windows = windows or load_heat_windows(cfg_path)
+        heat = heat_series(daily, windows)
+        write_frame(heat, HEAT_OUT)
+        ARTIFACTS.put_frame("trade_heat", heat)
+    res["heat"] = heat_summary(heat, windows)
+    _dump(res)
     print("Trade heat ->", OUT_JSON, res)
     return OUT_JSON
 
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="trade-conflict heat from events.csv")
+    ap.add_argument("--events", default='./data/warehouse/events.csv')
+    ap.add_argument("--config", default='./config/macro.yaml')
+    ap.add_argument("--rebuild", action="store_true", help="ignore saved state and rescan events.csv from scratch")
+    ap.add_argument("--stats", action="store_true", help="report peak RSS and rows/sec of the scan")
+    ap.add_argument("--windows", help="rolling heat windows in days, e.g. 7,14,30 (default: config trade_heat_windows)")
+    args = ap.parse_args(argv)
+    windows = [int(w) for w in args.windows.split(",")] if args.windows else None
+    score_from_events(args.events, args.config, rebuild=args.rebuild, stats=args.stats, windows=windows)
+
 if __name__=='__main__':
-    score_from_events()
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# macro/core.py
+"""
+进程内共享的基础设施：
+  - lazy(name)：重依赖（pandas / numpy / requests / yaml）延迟到第一次取属性时才导入，
+    只看 --help 或走不到数据处理的命令不付导入成本
+  - config(path)：config/macro.yaml 解析一次，按 mtime 失效；返回的 dict 视为只读
+  - cached(path, parse)：按 (路径, mtime, 大小) 缓存解析结果，同一进程里多个阶段读同一文件只解析一次
+"""
+import os, sys, threading, importlib
+from types import ModuleType
+
+CONFIG_PATH = './config/macro.yaml'
+
+class _LazyModule(ModuleType):
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_lock"] = threading.Lock()
+
+    def _load(self):
+        with self._lazy_lock:
+            mod = importlib.import_module(self.__name__)
+            self.__dict__.update(mod.__dict__)  # 之后的属性访问直接命中，不再走 __getattr__
+        return mod
+
+    def __getattr__(self, attr):
+        if attr.startswith("__") and attr.endswith("__"):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+def lazy(name):
+    """已导入完成就直接返回模块，否则返回一个首次取属性时才 import 的代理。"""
+    mod = sys.modules.get(name)
+    if mod is not None and not getattr(getattr(mod, "__spec__", None), "_initializing", False):
+        return mod
+    return _LazyModule(name)  # 另一个线程可能正导入到一半：交给 import_module 去等
+
+_cache, _cache_lock = {}, threading.Lock()
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def cached(path, parse):
+    """parse(path) 的结果按文件 (mtime, size) 缓存；文件不存在抛 FileNotFoundError。"""
+    key = (os.path.abspath(path), parse)
+    stamp = _stamp(path)
+    with _cache_lock:
+        hit = _cache.get(key)
+    if hit and hit[0] == stamp:
+        return hit[1]
+    value = parse(path)
+    with _cache_lock:
+        _cache[key] = (stamp, value)
+    return value
+
+yaml = lazy("yaml")
+
+def _parse_yaml(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+def config(path=CONFIG_PATH):
+    """解析后的配置（文件缺失返回空 dict）。"""
+    try:
+        return cached(path, _parse_yaml)
+    except FileNotFoundError:
+        return {}
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# macro/fetch_all.py
+"""
+并发抓取阶段：VIX / 相关性 / Polymarket 在同一进程里同时跑，共用 macro.net 的 keep-alive 连接池，
+各源内部主备入口走对冲请求。总耗时受 --deadline 约束，超时的源保留上次的输出文件。
+
+  python3 macro/fetch_all.py [--only vix,polymarket] [--deadline 60]
+"""
+import os, sys, time, argparse, threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from macro import fetch_vix_pctile, calc_corr_from_prices, fetch_polymarket_to_csv
+from macro.http_cache import CACHE
+from macro import instrument
+
+DEADLINE = float(os.getenv("FETCH_DEADLINE", "60"))
+SOURCES = {
+    "vix": fetch_vix_pctile.main,
+    "corr": calc_corr_from_prices.main,
+    "polymarket": fetch_polymarket_to_csv.main,
+}
+
+def run(names=None, deadline=DEADLINE):
+    """并发跑各源，返回 {name: (status, seconds)}；status 为 ok / error: ... / timeout。"""
+    names = names or list(SOURCES)
+    results = {}
+    def work(name):
+        t0 = time.perf_counter()
+        try:
+            with instrument.span(f"stage.{name}"), instrument.profiled(name):
+                SOURCES[name]()
+            results[name] = ("ok", time.perf_counter() - t0)
+        except Exception as e:
+            results[name] = (f"error: {e}", time.perf_counter() - t0)
+    # daemon 线程：到 deadline 直接返回，不等卡住的源
+    threads = [threading.Thread(target=work, args=(n,), name=f"fetch-{n}", daemon=True) for n in names]
+    t_end = time.monotonic() + deadline
+    for t in threads: t.start()
+    for t in threads: t.join(max(0.0, t_end - time.monotonic()))
+    for n in names:
+        results.setdefault(n, ("timeout", deadline))
+    return results
+
+def main():
+    ap = argparse.ArgumentParser(description="concurrent fetch stage")
+    ap.add_argument("--only", help=f"comma separated subset of {','.join(SOURCES)}")
+    ap.add_argument("--deadline", type=float, default=DEADLINE, help="total wall-clock budget (s)")
+    ap.add_argument("--report", help="write spans / HTTP counters / memory as a JSON run report")
+    ap.add_argument("--prom", help="also write the run report as a Prometheus textfile")
+    args = ap.parse_args()
+    names = [n.strip() for n in args.only.split(",")] if args.only else None
+    unknown = [n for n in names or [] if n not in SOURCES]
+    if unknown:
+        raise SystemExit(f"[fetch] unknown sources: {unknown}")
+
+    t0 = time.perf_counter()
+    res = run(names, args.deadline)
+    for n, (status, sec) in res.items():
+        print(f"[fetch] {n:<11} {status:<8} {sec:6.2f}s")
+    print(f"[fetch] total {time.perf_counter() - t0:.2f}s")
+    for line in CACHE.summary():
+        print(f"[cache] {line}")
+    if args.report or args.prom:
+        instrument.write_report(args.report or "out/run_report.json", args.prom,
+                                extra={"sources": {n: s for n, (s, _) in res.items()}, "http_cache": CACHE.stats})
+
+if __name__ == "__main__":
+    main()
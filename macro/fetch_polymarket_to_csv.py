@@ -1,83 +1,250 @@
 #!/usr/bin/env python3
 # macro/fetch_polymarket_to_csv.py  (resilient)
-import os, csv, time, json
+"""
+Polymarket 全量快照：按 limit/offset 并发翻页拉取全部 market（在途请求数有上限），直到返回空页为止；
+服务端把每页截得比 limit 短时按实际条数续翻，不会漏页。
+每次运行写一个快照分区文件（追加，不改历史）：
+  data/macro/polymarket/snapshots/dt=YYYY-MM-DD/part-HHMMSSffffff.csv   ts, market_id, question, outcome, price, matched
+matched 表示问题命中 config/macro.yaml 的 polymarket_filters.phrases；降息概率取命中市场的均值，
+追加到 polymarket_live.csv（ts, prob, source）：source=live 是本次观测；拉取失败时写的兜底值
+（上次观测 / POLYMARKET_PROB / 0.33）记为 fallback:last / fallback:env / fallback:default，
+下游（回填、emit 的历史聚合）按 source 过滤，不当成观测。
+  POLYMARKET_PAGE_SIZE（默认 100） / POLYMARKET_WORKERS（默认 4）
+  POLYMARKET_MAX_PAGES（默认 5000）只防失控（如服务端忽略 offset）：翻到上限还没见到空页直接报错，不留残缺快照
+"""
+import os, re, csv, time, json, sys
+from collections import deque
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-import requests
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from macro.core import config
+from macro.net import hedged
+from macro.instrument import span, count
+from macro.artifacts import atomic_open
+from macro.http_cache import CACHE
 
 OUT = Path("data/macro"); OUT.mkdir(parents=True, exist_ok=True)
 CSV = OUT / "polymarket_live.csv"
+SNAP_DIR = OUT / "polymarket" / "snapshots"
+SNAP_FIELDS = ["ts", "market_id", "question", "outcome", "price", "matched"]
+LIVE_FIELDS = ["ts", "prob", "source"]
 
-PRIMARY  = "https://delta.polymarket.com/markets?limit=50"
-FALLBACK = "https://polymarket.com/api/markets?limit=50"  # 备用入口，若失效可再换
+PRIMARY  = os.getenv("POLYMARKET_PRIMARY", "https://delta.polymarket.com/markets?limit=50")
+FALLBACK = os.getenv("POLYMARKET_FALLBACK", "https://polymarket.com/api/markets?limit=50")  # 备用入口，若失效可再换
+PAGE_SIZE = int(os.getenv("POLYMARKET_PAGE_SIZE", "100"))
+WORKERS = int(os.getenv("POLYMARKET_WORKERS", "4"))
+MAX_PAGES = int(os.getenv("POLYMARKET_MAX_PAGES", "5000"))
+CUT_WORDS = ["cut","decrease","lower","rate"]
 
-def extract_prob(items):
-    def one(m):
-        prob = 0.0; found = False
-        for o in (m.get("outcomes") or []):
-            try:
-                p = float(o.get("price", 0))
-                if p > 0: prob += p; found = True
-            except: pass
-        return min(prob, 1.0) if found else None
-
-    probs=[]
-    for m in items:
-        title = (m.get("question") or m.get("title") or "").lower()
-        if any(k in title for k in ["cut","decrease","lower","rate"]):
-            p = one(m)
-            if p is not None: probs.append(p)
-    if probs:
-        return round(sum(probs)/len(probs), 4)
-    return None
+def load_filter(cfg_path='./config/macro.yaml'):
+    """polymarket_filters.phrases 预编译成一个不区分大小写的正则；没配置返回 None。"""
+    phrases = [str(p) for p in ((config(cfg_path).get('polymarket_filters') or {}).get('phrases') or []) if str(p).strip()]
+    if not phrases: return None
+    return re.compile("|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True)), re.IGNORECASE)
+
+def outcomes(m):
+    """[(名称, 价格)]；兼容 outcomes=[{name, price}] 和 gamma 风格的 outcomes/outcomePrices JSON 字符串。"""
+    out = []
+    raw = m.get("outcomes") or []
+    if isinstance(raw, str):
+        try: raw = json.loads(raw)
+        except Exception: raw = []
+    prices = m.get("outcomePrices")
+    if isinstance(prices, str):
+        try: prices = json.loads(prices)
+        except Exception: prices = None
+    for i, o in enumerate(raw):
+        if isinstance(o, dict):
+            name, p = o.get("name"), o.get("price")
+        else:
+            name, p = o, (prices[i] if prices and i < len(prices) else None)
+        try: out.append((str(name or ""), float(p)))
+        except (TypeError, ValueError): pass
+    return out
+
+def market_prob(m):
+    """Yes 的价格；没有 Yes/No 命名时沿用旧口径（各结果价格之和，截到 1）。"""
+    outs = outcomes(m)
+    for name, p in outs:
+        if name.strip().lower() == "yes": return p
+    ps = [p for _, p in outs if p > 0]
+    return min(sum(ps), 1.0) if ps else None
+
+def is_fallback(source):
+    return str(source or "").startswith("fallback")
 
 def read_last_csv():
+    """最后一个真实观测的概率（跳过兜底行）。"""
     if CSV.exists():
         try:
-            rows = list(csv.DictReader(CSV.open(encoding="utf-8")))
-            if rows:
-                v = rows[-1].get("prob")
-                return float(v) if v not in (None,"") else None
+            for row in reversed(list(csv.DictReader(CSV.open(encoding="utf-8")))):
+                v = row.get("prob")
+                if v not in (None, "") and not is_fallback(row.get("source")): return float(v)
         except: pass
     return None
 
-def try_fetch(url, timeout=12):
-    r = requests.get(url, timeout=timeout)
-    r.raise_for_status()
-    data = r.json()
-    items = data.get("markets") or data  # 兼容不同结构
-    return extract_prob(items)
+def append_live(prob, ts, source="live"):
+    """polymarket_live.csv 追加一行 (ts, prob, source)；旧格式文件先迁移成三列（缺的列留空）。"""
+    rows = []
+    if CSV.exists():
+        with CSV.open(encoding="utf-8") as f:
+            r = csv.DictReader(f)
+            if r.fieldnames == LIVE_FIELDS:
+                with CSV.open("a", newline="", encoding="utf-8") as fa:
+                    csv.writer(fa).writerow([ts, prob, source])
+                return
+            rows = [{k: x.get(k) or "" for k in LIVE_FIELDS} for x in r]
+    with atomic_open(CSV, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=LIVE_FIELDS)
+        w.writeheader(); w.writerows(rows)
+        w.writerow({"ts": ts, "prob": prob, "source": source})
+
+def page_url(url, offset, limit=PAGE_SIZE):
+    parts = urlsplit(url)
+    q = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in ("limit", "offset")]
+    q += [("limit", str(limit)), ("offset", str(offset))]
+    return urlunsplit(parts._replace(query=urlencode(q)))
+
+def fetch_page(url, offset, limit=PAGE_SIZE, timeout=12):
+    with span("fetch.polymarket_page", offset=offset):
+        data = CACHE.get(page_url(url, offset, limit), "polymarket", timeout=timeout).json()
+    items = data.get("markets") if isinstance(data, dict) else data  # 兼容不同结构
+    return list(items or [])
+
+def iter_pages(url, start=0, step=None, limit=PAGE_SIZE, workers=WORKERS, max_pages=MAX_PAGES):
+    """
+    从 offset=start 起按顺序产出各页 items，直到某页为空。后续页按 offset 每次加 step（默认 limit）预先派发，
+    最多 workers 个请求同时在途（消费者处理慢时不再多拉）。某页不满 step 时不当作结束（服务端可能把页截短了）：
+    已按旧步长派发的页作废，从实际拿到的位置按新步长续翻。翻满 max_pages 页仍没见到空页抛 RuntimeError。
+    """
+    step = step or limit
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="polymarket") as ex:
+        inflight, nxt, pages = deque(), start, 0
+        while True:
+            while len(inflight) < workers and pages + len(inflight) < max_pages:
+                inflight.append((nxt, ex.submit(fetch_page, url, nxt, limit))); nxt += step
+            if not inflight:
+                raise RuntimeError(f"polymarket: still paging after {max_pages} pages (offset {nxt}); "
+                                   f"raise POLYMARKET_MAX_PAGES")
+            offset, fut = inflight.popleft()
+            items = fut.result(); pages += 1
+            if not items:
+                for _, f in inflight: f.cancel()
+                return
+            yield items
+            if len(items) < step:
+                for _, f in inflight: f.cancel()
+                inflight.clear()
+                step, nxt = len(items), offset + len(items)
+
+class SnapshotWriter:
+    """一次运行的快照分区：先写临时文件，commit() 时原子改名；中途失败不留半个快照。"""
+    def __init__(self, ts: datetime, root=SNAP_DIR):
+        self.ts = ts.strftime("%Y-%m-%dT%H:%M:%SZ")
+        part = root / f"dt={ts:%Y-%m-%d}"; part.mkdir(parents=True, exist_ok=True)
+        self.path = part / f"part-{ts:%H%M%S%f}.csv"
+        self._tmp = self.path.with_suffix(".tmp")
+        self._f = self._tmp.open("w", newline="", encoding="utf-8")
+        self._w = csv.writer(self._f); self._w.writerow(SNAP_FIELDS)
+        self.markets = self.rows = 0
+
+    def add(self, m, matched):
+        mid = str(m.get("id") or m.get("conditionId") or m.get("slug") or "")
+        q = m.get("question") or m.get("title") or ""
+        outs = outcomes(m) or [("", "")]
+        self._w.writerows([self.ts, mid, q, name, p, int(matched)] for name, p in outs)
+        self.markets += 1; self.rows += len(outs)
+
+    def commit(self):
+        self._f.flush(); os.fsync(self._f.fileno())
+        self._f.close(); os.replace(self._tmp, self.path)
+        return self.path
+
+    def abort(self):
+        self._f.close()
+        try: self._tmp.unlink()
+        except FileNotFoundError: pass
+
+def read_snapshots(start=None, end=None, root=SNAP_DIR):
+    """按日期分区读回快照（start/end 为 YYYY-MM-DD，含端点），返回 DataFrame。"""
+    import pandas as pd
+    parts = []
+    for d in sorted(Path(root).glob("dt=*")):
+        day = d.name[3:]
+        if (start and day < start) or (end and day > end): continue
+        parts += sorted(d.glob("part-*.csv"))
+    if not parts: return pd.DataFrame(columns=SNAP_FIELDS)
+    return pd.concat([pd.read_csv(p, dtype={"market_id": str}) for p in parts], ignore_index=True)
+
+def ingest(url, first, flt, now):
+    """first: 已拿到的第 0 页；继续翻完剩余页，写快照并返回 (prob, writer)。"""
+    snap, probs, fallback = SnapshotWriter(now), [], []
+    try:
+        # 第 0 页的条数就是服务端实际的页大小（可能比请求的 limit 小），后续页按它续翻
+        rest = iter_pages(url, start=len(first), step=len(first)) if first else ()
+        for items in chain([first], rest):
+            for m in items:
+                title = m.get("question") or m.get("title") or ""
+                matched = flt is None or bool(flt.search(title))
+                snap.add(m, matched)
+                if any(k in title.lower() for k in CUT_WORDS):
+                    p = market_prob(m)
+                    if p is not None: (probs if matched else fallback).append(p)
+        snap.commit()
+        count("rows_processed", snap.markets, stage="polymarket")
+    except Exception:
+        snap.abort(); raise
+    # 短语一个都没命中时退回旧口径（只看关键词）
+    use = probs or fallback
+    return (round(sum(use)/len(use), 4) if use else None), snap
 
 def main():
     prob = None
     errs = []
-    for url in (PRIMARY, FALLBACK):
-        try:
-            prob = try_fetch(url)
-            if prob is not None:
-                src = url
-                break
-        except Exception as e:
-            errs.append(f"{url}: {e}")
+    flt = load_filter()
+    now = datetime.now(timezone.utc)
+    def attempt(url):
+        def run():
+            try:
+                return url, fetch_page(url, 0)
+            except Exception as e:
+                errs.append(f"{url}: {e}"); raise
+        return run
+    # 第一页：主入口慢了就并发请求备用入口，先回的入口负责翻完剩余页
+    try:
+        url, first = hedged([attempt(PRIMARY), attempt(FALLBACK)], label="polymarket")
+        t0 = time.perf_counter()
+        with span("ingest.polymarket") as sp:
+            prob, snap = ingest(url, first, flt, now)
+            sp["markets"] = snap.markets
+        print(f"[polymarket] snapshot {snap.markets} markets / {snap.rows} rows "
+              f"in {time.perf_counter() - t0:.2f}s -> {snap.path}")
+    except Exception as e:
+        errs.append(f"ingest: {e}")
+        prob = None
 
+    source = "live"
     if prob is None:
         # 优先用上次值，再用环境变量
-        prob = read_last_csv()
+        prob, source = read_last_csv(), "fallback:last"
         if prob is None:
             envv = os.getenv("POLYMARKET_PROB")
             try: prob = float(envv) if envv not in (None,"") else None
             except: prob = None
+            source = "fallback:env"
 
     # 仍然没有，就给一个温和兜底，避免空值
     if prob is None:
-        prob = 0.33
+        prob, source = 0.33, "fallback:default"
 
-    with CSV.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=["prob"])
-        w.writeheader()
-        w.writerow({"prob": prob})
-    print(f"[polymarket] wrote {CSV} with prob={prob}")
+    append_live(prob, now.strftime("%Y-%m-%dT%H:%M:%SZ"), source)
+    print(f"[polymarket] appended {CSV} with prob={prob} ({source})")
     if errs:
         print("[polymarket] fallback notes:", *errs, sep="\n  - ")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
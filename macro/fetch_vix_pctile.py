@@ -2,24 +2,43 @@
 # macro/fetch_vix_pctile.py
 import os
 from pathlib import Path
-import io, sys
-import pandas as pd
+import io, sys, json
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from macro.core import lazy
+from macro.price_store import PriceStore
+from macro.rolling_rank import RollingPercentile
+from macro.net import hedged
+from macro.instrument import span
+from macro.artifacts import atomic_write, write_json, FSYNC
+from macro.http_cache import CACHE, cached_frame
+
+pd = lazy("pandas")
 
 OUT_DIR = Path("data/macro"); OUT_DIR.mkdir(parents=True, exist_ok=True)
 CSV_OUT = OUT_DIR / "vix.csv"
+STATE_OUT = OUT_DIR / "vix.state.json"  # 增量检查点
 
-WINDOW = int(os.getenv("VIX_WINDOW", "252"))  # 1年交易日
+# 分位窗口，可逗号分隔多个（如 252,126,1260）；第一个写入 pctile 列
+WINDOWS = [int(w) for w in os.getenv("VIX_WINDOW", "252").split(",") if w.strip()]
+WINDOW = WINDOWS[0]  # 默认 1年交易日
 FALLBACK_ENV = os.getenv("VIX_PCTILE")        # 可手动兜底
+TICKER = "^VIX"
+STOOQ_URL = os.getenv("STOOQ_URL", "https://stooq.com/q/d/l/?s=%5Evix&i=d")
+STORE = PriceStore()
 
 def pctile(series, value):
     if series.dropna().empty: return None
     return (series <= value).mean()
 
-def fetch_stooq():
-    import requests, io, pandas as pd
-    url = "https://stooq.com/q/d/l/?s=%5Evix&i=d"
-    r = requests.get(url, timeout=12); r.raise_for_status()
-    df = pd.read_csv(io.StringIO(r.text))
+def fetch_stooq(start=None):
+    url = STOOQ_URL
+    if start is not None:
+        url += f"&d1={start:%Y%m%d}"  # 只要增量
+    with span("fetch.stooq"):
+        r = CACHE.get(url, "stooq")
+    with span("parse.stooq", bytes=len(r.content)):
+        df = pd.read_csv(io.StringIO(r.text))
     # 统一列名大小写并兜底
     df.columns = [c.strip().lower() for c in df.columns]
     # 可能的日期/收盘列名集合
@@ -29,46 +48,142 @@ def fetch_stooq():
         raise ValueError(f"unexpected stooq columns: {df.columns.tolist()}")
     df = df.rename(columns={date_col:"date", close_col:"close"})
     df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date","close"]).sort_values("date").tail(WINDOW)
+    df = df.dropna(subset=["date","close"]).sort_values("date")
     return df
 
-def fetch_yahoo():
+def fetch_yahoo(start=None):
     try:
         import yfinance as yf
     except ImportError:
         return None
-    ticker = yf.Ticker("^VIX")
-    df = ticker.history(period=f"{max(WINDOW, 300)}d")[["Close"]].rename(columns={"Close":"close"})
-    if df.empty: return None
-    df = df.reset_index().rename(columns={"Date":"date"}).tail(WINDOW)
-    return df
+    def pull():
+        ticker = yf.Ticker("^VIX")
+        hist = ticker.history(start=start) if start is not None else ticker.history(period=f"{max(*WINDOWS, 300)}d")
+        df = hist[["Close"]].rename(columns={"Close":"close"})
+        return df.reset_index().rename(columns={"Date":"date"})
+    with span("fetch.yahoo"):
+        return cached_frame(f"yf:^VIX:{start or 'init'}", "yfinance", pull)
 
-def main():
-    df = None
-    # 主源
+def _logged(name, fn):
+    def run():
+        try:
+            df = fn()
+        except Exception as e:
+            print(f"[vix] {name} failed: {e}", file=sys.stderr); raise
+        return df if df is not None and not df.empty else None
+    return run
+
+def sync_store():
+    """把 ^VIX 增量同步进本地价格库（从最后一个 bar 当天起），返回新增行数。"""
+    last = STORE.last_date(TICKER)
+    start = last.date() if last is not None else None
+    # 主源 stooq，慢了就同时请求备源 yahoo
     try:
-        df = fetch_stooq()
-    except Exception as e:
-        print(f"[vix] stooq failed: {e}", file=sys.stderr)
-    # 备源
-    if df is None:
-        df = fetch_yahoo()
-
-    if df is None or df.empty:
+        df = hedged([_logged("stooq", lambda: fetch_stooq(start)),
+                     _logged("yahoo", lambda: fetch_yahoo(start))], label="vix")
+    except Exception:
+        df = None
+    return STORE.append(TICKER, df)
+
+def _row(d, close, vals):
+    return ",".join([d.strftime("%Y-%m-%d"), repr(close)] +
+                    ["" if v is None else str(round(v, 4)) for v in vals]) + "\n"
+
+class PctileHistory:
+    """
+    增量维护 vix.csv：每个新 bar O(log W)，只追加新行。
+    检查点取倒数第二行（价格库只有最后一个 bar 会被原地覆盖）：记下它的日期 / 收盘价、
+    它在 vix.csv 里行尾的字节位置、到它为止最近 max(W) 个收盘价。下次从检查点起读价格库，
+    截掉 vix.csv 检查点之后的部分再续算追加。检查点对不上（首次运行 / 窗口变了 /
+    文件被改写 / 价格库重导）时全量重算。常驻进程持有同一个对象，检查点留在内存里。
+    """
+    def __init__(self, csv_path=CSV_OUT, state_path=STATE_OUT, windows=WINDOWS):
+        self.csv_path, self.state_path = Path(csv_path), Path(state_path)
+        self.windows = [int(w) for w in windows]
+        self.header = ",".join(["date", "close", "pctile"] + [f"pctile_{w}" for w in self.windows[1:]]) + "\n"
+        self._ck = None
+
+    def _checkpoint(self):
+        ck = self._ck
+        if ck is None:
+            try: ck = json.loads(self.state_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError): return None
+        if ck.get("windows") != self.windows: return None
+        line = ck["line"].encode("utf-8")
+        try:
+            with self.csv_path.open("rb") as f:
+                f.seek(max(ck["offset"] - len(line), 0))
+                if f.read(len(line)) != line: return None
+        except OSError:
+            return None
+        return ck
+
+    def reset(self):
+        """vix.csv 被别处改写（如兜底值）后调用：丢掉检查点，下次全量重算。"""
+        self._ck = None
+        self.state_path.unlink(missing_ok=True)
+
+    def update(self, store, ticker=TICKER):
+        """把价格库同步进 vix.csv，返回 (最后一行 dict, 本次计算的行数)；库里没数据返回 (None, 0)。"""
+        ck = self._checkpoint()
+        if ck is not None:
+            df = store.read(ticker, start=ck["date"])
+            if df is None or df.empty or f"{df['date'].iloc[0]:%Y-%m-%d}" != ck["date"] \
+                    or float(df["close"].iloc[0]) != ck["close"]:
+                ck = None
+        if ck is None:
+            df = store.read(ticker)
+            if df is None or df.empty: return None, 0
+        dates, close = df["date"].tolist(), df["close"].astype(float).tolist()
+        rps = {w: RollingPercentile.resume(w, ck["recent"]) if ck else RollingPercentile(w)
+               for w in self.windows}
+        big = rps[max(self.windows)]
+        offset = ck["offset"] if ck else len(self.header)
+        out, new_ck = [], None
+        for i in range(1 if ck else 0, len(close)):  # 检查点那一行已在文件里
+            c = close[i]
+            line = _row(dates[i], c, [rps[w].push(c) if c == c else None for w in self.windows])
+            out.append(line); offset += len(line)
+            if i == len(close) - 2:
+                new_ck = {"windows": self.windows, "date": f"{dates[i]:%Y-%m-%d}", "close": c,
+                          "offset": offset, "line": line, "recent": big.values()}
+        body = "".join(out)
+        if ck:
+            with self.csv_path.open("r+b") as f:
+                f.seek(ck["offset"]); f.truncate(); f.write(body.encode("utf-8")); f.flush()
+                if FSYNC: os.fsync(f.fileno())
+        else:
+            atomic_write(self.csv_path, self.header + body)
+        if new_ck is not None:
+            write_json(self.state_path, new_ck, indent=None)
+        elif ck is None:
+            self.state_path.unlink(missing_ok=True)  # 只有一行，没有检查点
+        self._ck = new_ck or ck
+        last = out[-1] if out else ck["line"]
+        return dict(zip(self.header.strip().split(","), last.strip().split(","))), len(out)
+
+HISTORY = PctileHistory()
+
+def main():
+    n = sync_store()
+    rows = STORE.count(TICKER)
+    if rows:
+        print(f"[vix] store {TICKER}: {rows} rows (+{n})")
+    else:
         # 环境或固定兜底
         try:
             v = float(FALLBACK_ENV) if FALLBACK_ENV not in (None,"") else 0.3
         except Exception:
             v = 0.3
-        CSV_OUT.write_text("pctile\n" + str(v) + "\n", encoding="utf-8")
+        atomic_write(CSV_OUT, f"date,close,pctile\n{pd.Timestamp.today():%Y-%m-%d},,{v}\n")
+        HISTORY.reset()
         print(f"[vix] wrote {CSV_OUT} with pctile={v} (fallback)")
         return
 
-    close = df["close"].astype(float)
-    latest = close.iloc[-1]
-    pct = round(pctile(close, latest), 4)
-    CSV_OUT.write_text("pctile\n" + str(pct) + "\n", encoding="utf-8")
-    print(f"[vix] wrote {CSV_OUT} with pctile={pct}")
+    with span("compute.vix_pctile") as sp:
+        last, k = HISTORY.update(STORE)
+        sp["rows"] = k
+    print(f"[vix] wrote {CSV_OUT} ({rows} days, {k} computed, windows={WINDOWS}) latest {last}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
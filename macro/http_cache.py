@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# macro/http_cache.py
+"""
+磁盘响应缓存：body + 元数据（ETag / Last-Modified / 抓取时间）按 URL 哈希存放在 data/cache/http/。
+  - TTL 内直接用缓存，不发请求
+  - 过期后带 If-None-Match / If-Modified-Since 发条件请求，304 复用缓存
+  - 总大小超过上限时按最近访问时间（LRU）淘汰
+  - 按来源统计 hits / misses / revalidated / bytes_saved / bytes_fetched
+yfinance 不是裸 HTTP，用 cached_frame() 只按 TTL 缓存结果表。
+HTTP_CACHE=off 关闭缓存（请求照常走共享连接池）。
+"""
+import os, io, json, time, hashlib, threading
+from pathlib import Path
+
+from macro.net import get_session, TIMEOUT
+from macro.instrument import count
+from macro.artifacts import atomic_write
+
+CACHE_DIR = Path(os.getenv("HTTP_CACHE_DIR", "data/cache/http"))
+MAX_BYTES = int(float(os.getenv("HTTP_CACHE_MAX_MB", "64")) * 2**20)
+ENABLED = os.getenv("HTTP_CACHE", "on").lower() not in ("0", "off", "false", "no")
+RESCAN_EVERY = 256  # 每写这么多次重新扫一遍目录校正总量（同目录可能有别的进程在写）
+# 各来源 TTL（秒），可用 HTTP_CACHE_TTL_<SOURCE> 覆盖
+TTL = {"stooq": 3600, "polymarket": 120, "yfinance": 3600}
+
+def ttl_for(source):
+    v = os.getenv(f"HTTP_CACHE_TTL_{source.upper()}")
+    try: return float(v) if v not in (None, "") else float(TTL.get(source, 0))
+    except ValueError: return float(TTL.get(source, 0))
+
+class CachedResponse:
+    def __init__(self, content: bytes, status_code=200, from_cache=False, encoding="utf-8"):
+        self.content, self.status_code, self.from_cache, self.encoding = content, status_code, from_cache, encoding
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+class HttpCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES, enabled=ENABLED):
+        self.root, self.max_bytes, self.enabled = Path(root), max_bytes, enabled
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._total, self._writes = None, 0  # 缓存总字节数（None = 还没扫过目录）
+
+    # ---- 存储
+    def _paths(self, key):
+        h = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.root / f"{h}.body", self.root / f"{h}.json"
+
+    def _load(self, key):
+        body, meta = self._paths(key)
+        try:
+            m = json.loads(meta.read_text(encoding="utf-8"))
+            return m if body.exists() else None
+        except Exception:
+            return None
+
+    def _save_meta(self, key, m):
+        # 临时文件名带 pid / 线程号：多线程、多进程同时写同一个 key 互不踩（缓存丢了可以重抓，不 fsync）
+        atomic_write(self._paths(key)[1], json.dumps(m), fsync=False)
+
+    def _store(self, key, content: bytes, m):
+        old = self._load(key)
+        atomic_write(self._paths(key)[0], content, fsync=False)
+        self._save_meta(key, m)
+        with self._lock:
+            self._writes += 1
+            if self._total is not None and self._writes % RESCAN_EVERY:
+                self._total += m["size"] - (old or {}).get("size", 0)
+            else:
+                self._total = None
+            # 总量按增量累计，只有第一次、定期校正和超出上限时才扫整个目录
+            if self._total is None or self._total > self.max_bytes:
+                self._total = self._evict()
+
+    def _evict(self):
+        """按 last_access 从旧到新删到总量不超过上限，返回剩余总字节数。"""
+        metas = []
+        for p in self.root.glob("*.json"):
+            try: m = json.loads(p.read_text(encoding="utf-8"))
+            except Exception: continue
+            metas.append((m.get("last_access", 0), m.get("size", 0), p))
+        total = sum(s for _, s, _ in metas)
+        for _, size, p in sorted(metas):
+            if total <= self.max_bytes: break
+            for q in (p, p.with_suffix(".body")):
+                try: q.unlink()
+                except FileNotFoundError: pass
+            total -= size
+        return total
+
+    def _count(self, source, **kw):
+        with self._lock:
+            st = self.stats.setdefault(source, {"hits": 0, "misses": 0, "revalidated": 0,
+                                                "bytes_saved": 0, "bytes_fetched": 0})
+            for k, v in kw.items(): st[k] += v
+        for k, v in kw.items(): count(f"http_{k}", v, source=source)
+
+    def _read_body(self, key, m, source, **count):
+        content = self._paths(key)[0].read_bytes()
+        m["last_access"] = time.time(); self._save_meta(key, m)
+        self._count(source, bytes_saved=len(content), **count)
+        return content
+
+    # ---- 对外
+    def get(self, url, source="http", ttl=None, timeout=None, **kw):
+        """带缓存的 GET；非 2xx/304 抛 requests.HTTPError。"""
+        ttl = ttl_for(source) if ttl is None else ttl
+        if not self.enabled:
+            r = get_session().get(url, timeout=timeout or TIMEOUT, **kw); r.raise_for_status()
+            self._count(source, misses=1, bytes_fetched=len(r.content))
+            return CachedResponse(r.content, r.status_code, False, r.encoding)
+        m = self._load(url)
+        now = time.time()
+        if m and now - m["fetched_at"] < ttl:
+            return CachedResponse(self._read_body(url, m, source, hits=1), 200, True, m.get("encoding"))
+
+        headers = dict(kw.pop("headers", None) or {})
+        if m and m.get("etag"): headers["If-None-Match"] = m["etag"]
+        if m and m.get("last_modified"): headers["If-Modified-Since"] = m["last_modified"]
+        r = get_session().get(url, timeout=timeout or TIMEOUT, headers=headers, **kw)
+        if r.status_code == 304 and m:
+            m["fetched_at"] = now
+            return CachedResponse(self._read_body(url, m, source, revalidated=1), 200, True, m.get("encoding"))
+        r.raise_for_status()
+        self._count(source, misses=1, bytes_fetched=len(r.content))
+        self._store(url, r.content, {"url": url, "source": source, "fetched_at": now, "last_access": now,
+                                     "size": len(r.content), "encoding": r.encoding,
+                                     "etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")})
+        return CachedResponse(r.content, r.status_code, False, r.encoding)
+
+    def cached(self, key, source, fn, ttl=None):
+        """TTL 内返回缓存的 bytes，否则调用 fn() -> bytes 并缓存（fn 返回 None 不缓存）。"""
+        ttl = ttl_for(source) if ttl is None else ttl
+        m = self._load(key) if self.enabled else None
+        if m and time.time() - m["fetched_at"] < ttl:
+            return self._read_body(key, m, source, hits=1)
+        content = fn()
+        if content is None: return None
+        self._count(source, misses=1, bytes_fetched=len(content))
+        if self.enabled:
+            now = time.time()
+            self._store(key, content, {"url": key, "source": source, "fetched_at": now,
+                                       "last_access": now, "size": len(content)})
+        return content
+
+    def summary(self):
+        lines = []
+        for src, st in sorted(self.stats.items()):
+            lines.append(f"{src}: hits={st['hits']} revalidated={st['revalidated']} misses={st['misses']} "
+                         f"saved={st['bytes_saved']/1024:.1f}KB fetched={st['bytes_fetched']/1024:.1f}KB")
+        return lines
+
+CACHE = HttpCache()
+
+_UTC_OFFSET = r"(\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)(?:Z|[+-]\d{2}:?\d{2})$"
+
+def cached_frame(key, source, fn, ttl=None):
+    """缓存返回 DataFrame 的抓取（如 yfinance）；以 CSV 存，读回时 date 列解析为日期。"""
+    import pandas as pd
+    def produce():
+        df = fn()
+        return None if df is None or df.empty else df.to_csv(index=False).encode("utf-8")
+    content = CACHE.cached(key, source, produce, ttl)
+    if content is None: return None
+    df = pd.read_csv(io.BytesIO(content))
+    if "date" in df.columns:
+        # yfinance 的日期带交易所时区（首尔 +09:00、纽约 -04:00/-05:00 混排）：去掉偏移只留当地日期，
+        # 与 PriceStore.append 直接吃 DataFrame 时的口径一致；先转 UTC 会把亚洲交易日整体挪前一天
+        local = df["date"].astype(str).str.replace(_UTC_OFFSET, r"\1", regex=True)
+        df["date"] = pd.to_datetime(local, errors="coerce")
+    return df
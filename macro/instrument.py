@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# macro/instrument.py
+"""
+轻量埋点（只用标准库，进程内全局、线程安全）：
+  span(name, **attrs)      计时区间，可嵌套（按线程记父子关系），结束时采样内存
+  count(name, v, **labels) 计数器：http_requests / http_retries / http_bytes_fetched / rows_processed ...
+  profiled(name)           按需 cProfile / pyinstrument（MACRO_PROFILE=vix,render 或 all）
+  write_report(path, prom) 运行报告 JSON（可选 Prometheus textfile）
+span 名按 <类别>.<对象> 命名：fetch.* / parse.* / ingest.* / compute.* / render.* / stage.*
+"""
+import os, sys, json, time, threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from macro.artifacts import atomic_write
+
+PROFILE = os.getenv("MACRO_PROFILE", "")              # 逗号分隔的 span/阶段名，或 all
+PROFILER = os.getenv("MACRO_PROFILER", "cprofile")     # cprofile | pyinstrument
+PROFILE_DIR = Path(os.getenv("MACRO_PROFILE_DIR", "out/profile"))
+
+_lock = threading.Lock()
+_local = threading.local()
+_t0 = time.perf_counter()
+_started = datetime.now(timezone.utc)
+_spans, _counters = [], {}
+
+def peak_rss_mb():
+    try:
+        import resource
+        r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return r / 2**20 if sys.platform == 'darwin' else r / 1024  # macOS 是字节，Linux 是 KB
+    except Exception:
+        return None
+
+def rss_mb():
+    """当前 RSS（Linux 读 /proc；其他平台返回 None）。"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except Exception:
+        return None
+
+def reset():
+    global _t0, _started
+    with _lock:
+        _spans.clear(); _counters.clear()
+        _t0, _started = time.perf_counter(), datetime.now(timezone.utc)
+
+@contextmanager
+def span(name, **attrs):
+    stack = _local.__dict__.setdefault("stack", [])
+    rec = {"name": name, "parent": stack[-1]["name"] if stack else None,
+           "thread": threading.current_thread().name, "start_s": time.perf_counter() - _t0}
+    rec.update(attrs)
+    stack.append(rec)
+    t = time.perf_counter()
+    try:
+        yield rec  # 调用方可往 rec 里补充属性（如 rows）
+    except BaseException as e:
+        rec["error"] = repr(e); raise
+    finally:
+        stack.pop()
+        rec["seconds"] = round(time.perf_counter() - t, 6)
+        rec["rss_mb"] = rss_mb()
+        with _lock: _spans.append(rec)
+
+def count(name, value=1, **labels):
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock: _counters[key] = _counters.get(key, 0) + value
+
+def _wanted(name):
+    sel = {s.strip() for s in PROFILE.split(",") if s.strip()}
+    return "all" in sel or name in sel
+
+@contextmanager
+def profiled(name, out_dir=None):
+    """MACRO_PROFILE 选中 name 时对这段代码做 profile，结果写到 out/profile/<name>.prof|.html。"""
+    if not _wanted(name):
+        yield; return
+    out_dir = Path(out_dir or PROFILE_DIR); out_dir.mkdir(parents=True, exist_ok=True)
+    if PROFILER == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("[instrument] pyinstrument not installed; falling back to cProfile", file=sys.stderr)
+        else:
+            p = Profiler(); p.start()
+            try: yield
+            finally:
+                p.stop(); (out_dir / f"{name}.html").write_text(p.output_html(), encoding="utf-8")
+            return
+    import cProfile
+    p = cProfile.Profile()
+    try:
+        p.enable()
+    except ValueError as e:  # 3.12+ 同一时刻只允许一个 profiler
+        print(f"[instrument] profile {name} skipped: {e}", file=sys.stderr)
+        yield; return
+    try: yield
+    finally:
+        p.disable(); p.dump_stats(str(out_dir / f"{name}.prof"))
+
+def report(extra=None):
+    with _lock:
+        spans = sorted(_spans, key=lambda r: r["start_s"])
+        counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(_counters.items())]
+    summary = {}
+    for r in spans:
+        s = summary.setdefault(r["name"], {"count": 0, "total_s": 0.0, "max_s": 0.0})
+        s["count"] += 1; s["total_s"] += r["seconds"]; s["max_s"] = max(s["max_s"], r["seconds"])
+    for s in summary.values(): s["total_s"] = round(s["total_s"], 6)
+    out = {"started": _started.isoformat(timespec="seconds"), "wall_s": round(time.perf_counter() - _t0, 6),
+           "peak_rss_mb": peak_rss_mb(), "summary": summary, "counters": counters, "spans": spans}
+    if extra: out.update(extra)
+    return out
+
+def _prom_labels(d):
+    if not d: return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in sorted(d.items())) + "}"
+
+def prometheus(rep):
+    lines = ["# TYPE macro_run_wall_seconds gauge", f"macro_run_wall_seconds {rep['wall_s']}"]
+    if rep.get("peak_rss_mb") is not None:
+        lines += ["# TYPE macro_peak_rss_megabytes gauge", f"macro_peak_rss_megabytes {rep['peak_rss_mb']:.1f}"]
+    lines += ["# TYPE macro_span_seconds_total counter", "# TYPE macro_span_count counter"]
+    for name, s in sorted(rep["summary"].items()):
+        lines.append(f"macro_span_seconds_total{_prom_labels({'span': name})} {s['total_s']}")
+        lines.append(f"macro_span_count{_prom_labels({'span': name})} {s['count']}")
+    typed = set()
+    for c in rep["counters"]:
+        metric = "macro_" + "".join(ch if ch.isalnum() else "_" for ch in c["name"])
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter"); typed.add(metric)
+        lines.append(f"{metric}{_prom_labels(c['labels'])} {c['value']}")
+    return "\n".join(lines) + "\n"
+
+def write_report(path="out/run_report.json", prom=None, extra=None):
+    """写运行报告；prom 给出路径时同时写 Prometheus textfile（node_exporter textfile collector 可直接收）。"""
+    rep = report(extra)
+    atomic_write(path, json.dumps(rep, ensure_ascii=False, indent=1))
+    if prom: atomic_write(prom, prometheus(rep))
+    return rep
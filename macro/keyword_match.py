@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# macro/keyword_match.py
+"""
+多关键词匹配：把整列文本拼成一个大字符串、整体 lower 一次，再对每个关键词做 C 层的 str.find 扫描，
+命中位置用 searchsorted 映射回行号。每个关键词单独扫描，所以重叠/包含关系
+（如 “关税” ⊂ “关税上调”、“section 301” 与 “301 tariff”）都各自计数；纯子串匹配，
+不用 \\b，中文（无空格分词）和英文同一套规则。
+"""
+from __future__ import annotations
+import unicodedata
+
+from macro.core import lazy
+
+np, pd = lazy("numpy"), lazy("pandas")
+
+def _norm_kw(k):
+    return unicodedata.normalize("NFKC", str(k)).strip().lower()
+
+class KeywordMatcher:
+    def __init__(self, keywords):
+        seen, kws = set(), []
+        for k in keywords or []:
+            k = _norm_kw(k)
+            if k and k not in seen:
+                seen.add(k); kws.append(k)
+        self.keywords = kws
+
+    def scan(self, texts):
+        """
+        texts: 可迭代的字符串（None/NaN 当空串）。
+        返回 (hit: bool[n], rows: {keyword: 命中行号 int64[]（升序去重）})。
+        """
+        lst = ["" if t is None or t != t else str(t) for t in texts]
+        n = len(lst)
+        hit = np.zeros(n, dtype=bool)
+        rows = {k: np.empty(0, dtype=np.int64) for k in self.keywords}
+        if not n or not self.keywords: return hit, rows
+        blob = "\n".join(lst).lower()
+        if len(blob) != sum(map(len, lst)) + n - 1:  # 个别字符 lower 后变长：逐行 lower 重新拼
+            lst = [t.lower() for t in lst]; blob = "\n".join(lst)
+        lens = np.fromiter(map(len, lst), dtype=np.int64, count=n)
+        starts = np.concatenate(([0], np.cumsum(lens + 1)[:-1]))
+        for k in self.keywords:
+            pos, i, find = [], blob.find(k), blob.find
+            while i != -1:
+                pos.append(i); i = find(k, i + 1)
+            if pos:
+                r = np.unique(np.searchsorted(starts, np.asarray(pos, dtype=np.int64), side="right") - 1)
+                rows[k] = r; hit[r] = True
+        return hit, rows
+
+    def match(self, texts: pd.Series):
+        """返回 (hit: 与 texts 同索引的 bool Series, counts: 每个关键词命中的行数 Series)。"""
+        hit, rows = self.scan(texts.tolist())
+        counts = pd.Series({k: len(r) for k, r in rows.items()}, dtype="int64")
+        return pd.Series(hit, index=texts.index), counts
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# macro/net.py
+"""
+共享 HTTP 连接池 + 对冲请求（hedged request）。
+  get_session()      进程内唯一的 keep-alive Session（线程间共享）
+  hedged(calls, ..)  先跑主源，delay 秒内没结果就并发启动备源，谁先成功用谁
+连接错误和 502/503/504 由连接池按 HTTP_RETRIES 次重试（指数退避），请求数（http_requests，按状态码）、重试与对冲次数都记进 instrument 计数器。
+"""
+import os, queue, threading, time
+
+from macro.instrument import count
+
+TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "12"))
+HEDGE_DELAY = float(os.getenv("HEDGE_DELAY", "2.0"))  # 主源多久没回就启动备源
+POOL_SIZE = int(os.getenv("HTTP_POOL", "16"))
+RETRIES = int(os.getenv("HTTP_RETRIES", "1"))
+
+_session = None
+_lock = threading.Lock()
+
+def get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            class CountingRetry(Retry):
+                def increment(self, method=None, url=None, *a, **kw):
+                    nxt = super().increment(method, url, *a, **kw)  # 次数用尽时抛出，不计数
+                    count("http_retries")
+                    return nxt
+
+            s = requests.Session()
+            retry = CountingRetry(total=RETRIES, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                                  allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False)
+            ad = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            s.mount("http://", ad); s.mount("https://", ad)
+            s.headers["User-Agent"] = "macro-pipeline/3.3"
+            # 每个拿到响应的请求计一次（连接池内部的重试另记 http_retries）
+            s.hooks["response"].append(lambda r, *a, **kw: count("http_requests", status=r.status_code))
+            _session = s
+        return _session
+
+def get(url, timeout=None, **kw):
+    r = get_session().get(url, timeout=timeout or TIMEOUT, **kw)
+    r.raise_for_status()
+    return r
+
+def hedged(calls, delay=None, deadline=None, label="hedged"):
+    """
+    calls: 无参可调用对象列表，按优先级排列；返回 None 视为失败。
+    第 i 个调用失败或 delay 秒未完成时启动第 i+1 个；返回第一个成功的结果。
+    全部失败抛出最后一个异常（都只是返回 None 时返回 None）；超过 deadline 秒抛 TimeoutError。
+    用 daemon 线程：落后的请求不会拖住进程退出。
+    """
+    delay = HEDGE_DELAY if delay is None else delay
+    t_end = None if deadline is None else time.monotonic() + deadline
+    q, errs = queue.Queue(), []
+    started = finished = 0
+
+    def run(i):
+        try: q.put((calls[i](), None))
+        except Exception as e: q.put((None, e))
+
+    def launch():
+        nonlocal started
+        if started: count("http_hedges", label=label)
+        threading.Thread(target=run, args=(started,), name=f"{label}-{started}", daemon=True).start()
+        started += 1
+
+    launch()
+    while finished < started:
+        left = None if t_end is None else t_end - time.monotonic()
+        if left is not None and left <= 0:
+            raise TimeoutError(f"{label}: no result within {deadline}s")
+        timeout = delay if started < len(calls) else left
+        if left is not None: timeout = min(timeout, left)
+        try:
+            res, err = q.get(timeout=timeout)
+        except queue.Empty:
+            if started < len(calls): launch()  # 主源超过 delay 仍未返回：对冲
+            continue
+        finished += 1
+        if err is None and res is not None: return res
+        if err is not None:
+            errs.append(err); count("http_failures", label=label)
+        if finished == started and started < len(calls): launch()
+    if errs: raise errs[-1]
+    return None
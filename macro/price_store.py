@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# macro/price_store.py
+"""
+本地价格库：每个 ticker 一个定长记录的二进制文件（date=自 1970 起的天数 int64, close=float64），
+按日期递增追加。读取用 np.memmap 只映射需要的部分；日常运行只追加新 bar，
+同日期的最后一条允许原地覆盖（盘中价 -> 收盘价）。
+
+  python3 macro/price_store.py import              # 导入 data/prices/*.csv
+  python3 macro/price_store.py import a.csv --ticker ^GSPC
+  python3 macro/price_store.py show ^VIX
+"""
+from __future__ import annotations
+import os, re, sys, argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from macro.core import lazy
+
+np, pd = lazy("numpy"), lazy("pandas")
+
+STORE_DIR = Path(os.getenv("PRICE_STORE", "data/store"))
+PRICES_DIR = Path("data/prices")
+REC_FIELDS = [("date", "<i8"), ("close", "<f8")]
+REC_SIZE = 16  # 每条记录的字节数
+
+def _rec():
+    return np.dtype(REC_FIELDS)
+
+# data/prices 下现有 CSV 文件名 -> ticker
+CSV_TICKERS = {"spx.csv": "^GSPC", "dxy.csv": "DX-Y.NYB", "tnx.csv": "^TNX", "vix.csv": "^VIX"}
+
+def _fname(ticker: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", ticker) + ".bin"
+
+def _days(dates) -> np.ndarray:
+    d = pd.to_datetime(pd.Series(dates), errors="coerce")
+    if getattr(d.dt, "tz", None) is not None:
+        d = d.dt.tz_localize(None)  # yfinance 带时区：保留交易所本地日期
+    return d.values.astype("datetime64[D]").astype("int64")
+
+def read_price_csv(path: Path):
+    """读 data/prices 风格的 CSV（date + close；没有 close 时取最后一列）。"""
+    df = pd.read_csv(path)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    if "close" not in df.columns:
+        df = df.rename(columns={df.columns[-1]: "close"})
+    return df[["date", "close"]]
+
+class PriceStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, ticker: str) -> Path:
+        return self.root / _fname(ticker)
+
+    def count(self, ticker: str) -> int:
+        p = self.path(ticker)
+        return p.stat().st_size // REC_SIZE if p.exists() else 0
+
+    def _tail_rec(self, ticker):
+        n = self.count(ticker)
+        if not n: return None
+        with self.path(ticker).open("rb") as f:
+            f.seek((n - 1) * REC_SIZE)
+            return np.frombuffer(f.read(REC_SIZE), dtype=_rec())[0]
+
+    def last_date(self, ticker: str):
+        rec = self._tail_rec(ticker)
+        return None if rec is None else pd.Timestamp(int(rec["date"]), unit="D")
+
+    def read(self, ticker: str, tail: int | None = None, start=None):
+        """返回 DataFrame[date, close]（按日期升序）；库里没有则 None。"""
+        n = self.count(ticker)
+        if not n: return None
+        off = max(n - tail, 0) if tail else 0
+        mm = np.memmap(self.path(ticker), dtype=_rec(), mode="r",
+                       offset=off * REC_SIZE, shape=(n - off,))
+        if start is not None:
+            mm = mm[np.searchsorted(mm["date"], _days([start])[0]):]
+        return pd.DataFrame({"date": mm["date"].astype("datetime64[D]").astype("datetime64[ns]"),
+                             "close": np.array(mm["close"], dtype="f8")})
+
+    def append(self, ticker: str, df) -> int:
+        """
+        追加比库内最后日期更新的行，返回写入行数。
+        与最后一条同日期的行覆盖最后一条；更早的日期忽略（历史不可改）。
+        """
+        if df is None or len(df) == 0: return 0
+        rec = np.empty(len(df), dtype=_rec())
+        rec["date"] = _days(df["date"])
+        rec["close"] = pd.to_numeric(pd.Series(df["close"]).reset_index(drop=True), errors="coerce").to_numpy("f8")
+        rec = rec[(rec["date"] > np.iinfo("i8").min) & np.isfinite(rec["close"])]
+        # 稳定排序且只按日期比较：同日期的行保持到达顺序（np.sort(order=) 会用 close 打破平局）
+        rec = rec[np.argsort(rec["date"], kind="stable")]
+        if len(rec) == 0: return 0
+        # 同一日期保留最后一条
+        keep = np.append(rec["date"][1:] != rec["date"][:-1], True)
+        rec = rec[keep]
+
+        p = self.path(ticker)
+        size = p.stat().st_size if p.exists() else 0
+        if size % REC_SIZE:  # 上次写入被中断，截掉半条记录
+            with p.open("r+b") as f: f.truncate(size - size % REC_SIZE)
+        last = self._tail_rec(ticker)
+        written = 0
+        if last is not None:
+            same = rec[rec["date"] == last["date"]]
+            if len(same) and same["close"][-1] != last["close"]:
+                with p.open("r+b") as f:
+                    f.seek(-REC_SIZE, os.SEEK_END); f.write(same[-1:].tobytes())
+                written += 1
+            rec = rec[rec["date"] > last["date"]]
+        if len(rec):
+            with p.open("ab") as f: f.write(rec.tobytes())
+        return written + len(rec)
+
+    def import_csv(self, path: Path, ticker: str) -> int:
+        return self.append(ticker, read_price_csv(path))
+
+def main():
+    ap = argparse.ArgumentParser(description="local price store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="import CSV files (default: data/prices/*.csv)")
+    imp.add_argument("paths", nargs="*")
+    imp.add_argument("--ticker", help="ticker for a single CSV (default: by file name)")
+    show = sub.add_parser("show", help="print the tail of one ticker")
+    show.add_argument("ticker")
+    show.add_argument("-n", type=int, default=5)
+    ap.add_argument("--store", default=str(STORE_DIR))
+    args = ap.parse_args()
+
+    store = PriceStore(args.store)
+    if args.cmd == "import":
+        paths = [Path(p) for p in args.paths] or sorted(PRICES_DIR.glob("*.csv"))
+        for p in paths:
+            ticker = args.ticker or CSV_TICKERS.get(p.name)
+            if not ticker:
+                print(f"[store] skip {p}: unknown ticker (use --ticker)", file=sys.stderr); continue
+            n = store.import_csv(p, ticker)
+            print(f"[store] {p} -> {ticker}: +{n} rows (total {store.count(ticker)})")
+    else:
+        df = store.read(args.ticker, tail=args.n)
+        print("(empty)" if df is None else df.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# macro/returns.py
+"""
+价格对齐与收益率：各序列先按日期建索引（只做一次），再按策略对齐成价格宽表，对数收益一次算出，
+下游的相关 / 波动都从这张 T×N 收益矩阵取，不再逐对 concat + pct_change。
+对齐策略 RETURNS_ALIGN：
+  inner   只保留所有序列都有收盘价的日期
+  ffill   日期取并集，缺的价格沿用之前的值，最多 RETURNS_MAX_STALE（默认 3）个日期，更旧的置空（默认）
+  asof    以 base 序列（默认第一个）的交易日为日历，其余序列取当日或之前最近的收盘价，
+          不早于 RETURNS_ASOF_TOLERANCE（默认 4）个自然日
+三种策略都只向前看：某日的价格不会用到之后的数据。沿用旧价的那天收益为 0，恢复报价那天承担整段变动。
+"""
+from __future__ import annotations
+import os
+
+from macro.core import lazy
+
+np, pd = lazy("numpy"), lazy("pandas")
+
+POLICIES = ("inner", "ffill", "asof")
+ALIGN = os.getenv("RETURNS_ALIGN", "ffill").lower()
+MAX_STALE = int(os.getenv("RETURNS_MAX_STALE", "3"))
+ASOF_TOLERANCE = int(os.getenv("RETURNS_ASOF_TOLERANCE", "4"))
+
+def by_date(obj) -> pd.Series:
+    """DataFrame[date, close] 或以日期为索引的 Series -> 按交易日排序、去重（同日保留最后一条）的 float Series。"""
+    vals, idx = (obj["close"], obj["date"]) if isinstance(obj, pd.DataFrame) else (obj, obj.index)
+    if not isinstance(idx, pd.DatetimeIndex): idx = pd.DatetimeIndex(pd.to_datetime(idx))
+    if idx.tz is not None: idx = idx.tz_localize(None)  # 保留交易所当地日期
+    if not idx.is_normalized: idx = idx.normalize()  # 已是整日的（价格库的常态）免一次拷贝
+    s = pd.Series(vals.to_numpy(dtype=float), index=idx)
+    if not s.index.is_monotonic_increasing: s = s.sort_index(kind="stable")
+    return s[~s.index.duplicated(keep="last")]
+
+def align_prices(series: dict, how=None, base=None, max_stale=None, tolerance=None) -> pd.DataFrame:
+    """{name: DataFrame[date, close] | Series} -> 按 how 对齐的价格宽表（列顺序同 series，空序列跳过）。"""
+    how = (how or ALIGN).lower()
+    if how not in POLICIES: raise ValueError(f"unknown alignment policy {how!r}, expected one of {POLICIES}")
+    cols = {k: by_date(v) for k, v in series.items() if v is not None and len(v)}
+    if not cols: return pd.DataFrame()
+    if how == "inner":
+        px = pd.concat(cols, axis=1, join="inner")
+    elif how == "ffill":
+        limit = MAX_STALE if max_stale is None else max_stale
+        px = pd.concat(cols, axis=1).ffill(limit=limit if limit >= 0 else None)
+    else:
+        base = base if base in cols else next(iter(cols))
+        cal = cols[base].index
+        tol = pd.Timedelta(days=ASOF_TOLERANCE if tolerance is None else tolerance)
+        px = pd.DataFrame({k: s if k == base else s.reindex(cal, method="ffill", tolerance=tol)
+                           for k, s in cols.items()}, index=cal)
+    px.index.name = "date"
+    return px
+
+def log_returns(px: pd.DataFrame) -> pd.DataFrame:
+    """价格宽表 -> 同形状的对数收益（首行为 NaN；任一端缺价或价格非正时为 NaN）。"""
+    a = px.to_numpy(dtype=float)
+    r = np.full(a.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lp = np.log(np.where(a > 0, a, np.nan))
+    r[1:] = lp[1:] - lp[:-1]
+    return pd.DataFrame(r, index=px.index, columns=px.columns)
+
+def aligned_returns(series: dict, how=None, base=None, **kw) -> pd.DataFrame:
+    return log_returns(align_prices(series, how, base, **kw))
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# macro/rolling_corr.py
+"""
+全市场滚动相关矩阵：对 T×N 收益率一次扫描，按窗口维护 Σn / Σx / Σx² / Σxy 的滑动和，
+每个时点的 N×N 相关矩阵由这些和直接算出（O(T·N²)，不对每个窗口重新计算）。
+多个窗口共享同一次扫描；缺失值按 pairwise complete 处理（同 pandas .corr）。
+窗口内方差为 0 的序列（常数、停牌沿用旧价）与任何序列的相关都是 NaN；其余对角线恒为 1。
+
+结果落盘为 data/macro/corr_rolling/：
+  index.json   {"dates": [...], "tickers": [...], "windows": [...], "digest": 除最后一行外收益率的摘要}
+  w{win}.npy   float32，形状 (T, N, N)，可 np.load(mmap_mode="r") 按日期切片
+日常运行用 append_history：只重算最后一个已存行和新行，原地续写 .npy。
+"""
+from __future__ import annotations
+import os, io, json, hashlib
+from pathlib import Path
+
+from macro.core import lazy
+from macro.artifacts import write_json
+
+np, pd = lazy("numpy"), lazy("pandas")
+
+HIST_DIR = Path("data/macro/corr_rolling")
+CHUNK_ELEMS = 1_000_000  # 每块 chunk·N² 的上限，控制临时内存
+# 窗口方差 <= VAR_EPS × 该列全样本的 E[x²] 视为常数序列（停牌 / 沿用旧价），相关记 NaN；
+# 按全样本而不是窗口自身定标：滑动和减出来的零方差窗口只剩舍入残差，和窗口自己的 Σx² 同量级
+VAR_EPS = 1e-10
+_INDEX = {}  # out_dir -> ((size, mtime_ns), index)：常驻进程里不必每轮重读 index.json
+
+def _outer(a, b):
+    return a[:, :, None] * b[:, None, :]
+
+def _corr_pairwise(n, sxy, sx, sxx, floor):
+    # sy / syy 就是 sx / sxx 的转置（pairwise mask 对称）
+    sy, syy = sx.swapaxes(-1, -2), sxx.swapaxes(-1, -2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * sxy - sx * sy
+        vx, vy = n * sxx - sx * sx, n * syy - sy * sy
+        c = cov / np.sqrt(vx * vy)
+        nn = n * n
+        flat = (vx <= floor[:, None] * nn) | (vy <= floor[None, :] * nn)
+    c[flat] = np.nan
+    i = np.arange(c.shape[-1])
+    c[..., i, i] = np.where(flat[..., i, i], np.nan, 1.0)
+    return c
+
+def _corr_dense(n, sxy, sx, sxx, floor):
+    # 窗口内无缺失：均值/方差都是向量，只有协方差是矩阵
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = sx / n[:, None]
+        var = sxx / n[:, None] - mu * mu
+        flat = var <= floor
+        inv = np.where(flat, np.nan, 1.0 / np.sqrt(var))
+        c = sxy / n[:, None, None]
+        c -= _outer(mu, mu)
+        c *= inv[:, :, None]; c *= inv[:, None, :]
+    i = np.arange(c.shape[-1])
+    c[:, i, i] = np.where(flat, np.nan, 1.0)
+    return c
+
+def rolling_corr_blocks(returns: np.ndarray, windows, min_periods=None, chunk=None):
+    """
+    returns: (T, N) 收益率，NaN 表示缺失。
+    逐块产出 (start, {win: (rows, N, N) 相关矩阵})；窗口内有效样本 < min_periods（默认=窗口）记 NaN。
+    块内涉及的行都无缺失时走向量化的快路径，否则按 pairwise 四个矩阵和计算。
+    """
+    x = np.asarray(returns, dtype="f8")
+    T, N = x.shape
+    windows = sorted({int(w) for w in windows})
+    mask = np.isfinite(x)
+    row_ok = mask.all(axis=1)
+    z = np.where(mask, x, 0.0)
+    m = mask.astype("f8")
+    floor = VAR_EPS * (z * z).sum(axis=0) / np.maximum(m.sum(axis=0), 1)
+    chunk = chunk or max(1, min(T, CHUNK_ELEMS // max(N * N, 1)))
+
+    def rows(lo, hi):
+        # 行 [lo, hi)，lo<0 的部分补零行（掩码也为 0）
+        pad = max(0, min(hi, 0) - lo) if hi > 0 else hi - lo
+        lo_c, hi_c = max(lo, 0), max(hi, 0)
+        zz, mm = z[lo_c:hi_c], m[lo_c:hi_c]
+        if pad:
+            zz = np.concatenate([np.zeros((pad, N)), zz]); mm = np.concatenate([np.zeros((pad, N)), mm])
+        return zz, mm
+
+    def dense_terms(lo, hi):
+        zz, mm = rows(lo, hi)
+        return mm[:, 0], zz, zz * zz, _outer(zz, zz)
+
+    def pair_terms(lo, hi):
+        zz, mm = rows(lo, hi)
+        return _outer(mm, mm), _outer(zz, mm), _outer(zz * zz, mm), _outer(zz, zz)
+
+    zero = np.zeros((N, N))
+    carry = {w: [zero] * 4 for w in windows}  # 上一行的窗口和 n, sx, sxx, sxy（均为 N×N）
+    for a in range(0, T, chunk):
+        b = min(a + chunk, T)
+        blocks = {}
+        add_d = add_p = None
+        for w in windows:
+            need = min_periods or w
+            cn, csx, csxx, csxy = carry[w]
+            if row_ok[max(a - w, 0):b].all():
+                add_d = add_d or dense_terms(a, b)
+                n, sx, sxx, sxy = (np.cumsum(p - q, axis=0) for p, q in zip(add_d, dense_terms(a - w, b - w)))
+                n += cn[0, 0]; sx += csx[:, 0]; sxx += csxx[:, 0]; sxy += csxy
+                c = _corr_dense(n, sxy, sx, sxx, floor)
+                c[n < need] = np.nan
+                carry[w] = [np.full((N, N), n[-1]), np.repeat(sx[-1][:, None], N, 1),
+                            np.repeat(sxx[-1][:, None], N, 1), sxy[-1]]
+            else:
+                add_p = add_p or pair_terms(a, b)
+                n, sx, sxx, sxy = (np.cumsum(p - q, axis=0) + c0
+                                   for p, q, c0 in zip(add_p, pair_terms(a - w, b - w), carry[w]))
+                c = _corr_pairwise(n, sxy, sx, sxx, floor)
+                c[n < need] = np.nan
+                carry[w] = [n[-1], sx[-1], sxx[-1], sxy[-1]]
+            blocks[w] = c
+        yield a, blocks
+
+def rolling_corr(returns: np.ndarray, windows, min_periods=None):
+    """一次性返回 {win: (T, N, N)}；大宇宙请用 rolling_corr_blocks / write_history 分块落盘。"""
+    T, N = np.shape(returns)
+    out = {int(w): np.empty((T, N, N), dtype="f4") for w in windows}
+    for a, blocks in rolling_corr_blocks(returns, windows, min_periods):
+        for w, c in blocks.items():
+            out[w][a:a + len(c)] = c
+    return out
+
+def _stamp(path):
+    try: st = os.stat(path)
+    except FileNotFoundError: return None
+    return st.st_size, st.st_mtime_ns
+
+def _write_index(out_dir, idx):
+    write_json(out_dir / "index.json", idx, indent=None)
+    _INDEX[str(out_dir)] = (_stamp(out_dir / "index.json"), idx)
+
+def _read_index(out_dir):
+    hit = _INDEX.get(str(out_dir))
+    if hit and hit[0] == _stamp(out_dir / "index.json"): return hit[1]
+    try: return json.loads((out_dir / "index.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError): return None
+
+def _digest(x):
+    return hashlib.sha256(np.ascontiguousarray(x, dtype="f8").tobytes()).hexdigest()[:16]
+
+def write_history(returns: pd.DataFrame, windows, out_dir: Path = HIST_DIR):
+    """把收益率宽表（macro.returns.log_returns 的输出）各窗口的滚动相关矩阵写入 out_dir，返回 out_dir。"""
+    out_dir = Path(out_dir); out_dir.mkdir(parents=True, exist_ok=True)
+    ret = returns.to_numpy(dtype=float)
+    T, N = ret.shape
+    windows = sorted({int(w) for w in windows})
+    # 先写到临时 .npy，写完整再改名：正在 mmap 旧文件的读者不受影响
+    tmp = {w: out_dir / f".w{w}.npy.{os.getpid()}.tmp" for w in windows}
+    mms = {w: np.lib.format.open_memmap(tmp[w], mode="w+", dtype="f4", shape=(T, N, N)) for w in windows}
+    for a, blocks in rolling_corr_blocks(ret, windows):
+        for w, c in blocks.items():
+            mms[w][a:a + len(c)] = c
+    for w, mm in mms.items():
+        mm.flush(); del mm
+        os.replace(tmp[w], out_dir / f"w{w}.npy")
+    mms.clear()
+    idx = {"dates": [d.strftime("%Y-%m-%d") for d in returns.index],
+           "tickers": [str(c) for c in returns.columns], "windows": windows,
+           "digest": _digest(ret[:max(T - 1, 0)])}
+    _write_index(out_dir, idx)
+    return out_dir
+
+def _npy_header(path):
+    """(数据起始字节, shape)；不是可原地续写的 v1.0 float32 C 序 .npy 返回 None。"""
+    try:
+        with open(path, "rb") as f:
+            if np.lib.format.read_magic(f) != (1, 0): return None
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            if fortran or dtype != np.dtype("<f4"): return None
+            return f.tell(), shape
+    except (OSError, ValueError):
+        return None
+
+def _resume_point(out_dir, dates, tickers, windows, ret):
+    """已存历史可续写时返回 (k, {win: 数据起始字节})：行 [0, k) 不用重算。"""
+    idx = _read_index(out_dir)
+    if idx is None: return None
+    t0 = len(idx.get("dates") or ()); k = t0 - 1  # 最后一个已存 bar 可能被修订，连同新行一起重算
+    if k < 1 or len(dates) < t0 or idx.get("tickers") != tickers or idx.get("windows") != windows:
+        return None
+    if idx["dates"][:k] != dates[:k] or idx.get("digest") != _digest(ret[:k]):
+        return None
+    offs = {}
+    for w in windows:
+        h = _npy_header(out_dir / f"w{w}.npy")
+        if h is None or h[1] != (t0, len(tickers), len(tickers)): return None
+        offs[w] = h[0]
+    return k, offs
+
+def append_history(returns: pd.DataFrame, windows, out_dir: Path = HIST_DIR) -> int:
+    """
+    增量版 write_history：日期 / 代码 / 窗口与已存历史一致、且此前各行收益率没变时，
+    从最后一个已存行起重算（前面补 max(W) 行热身），原地写进 w{win}.npy 再改写头部的 shape，
+    每次 O((W + 新行)·N²)。对不上时退回 write_history 全量重写。返回重算的行数。
+    """
+    out_dir = Path(out_dir)
+    ret = returns.to_numpy(dtype=float)
+    T, N = ret.shape
+    windows = sorted({int(w) for w in windows})
+    dates = [d.strftime("%Y-%m-%d") for d in returns.index]
+    tickers = [str(c) for c in returns.columns]
+    hit = _resume_point(out_dir, dates, tickers, windows, ret)
+    heads = {}
+    if hit is not None:
+        for w in windows:
+            b = io.BytesIO()
+            np.lib.format.write_array_header_1_0(b, {"descr": "<f4", "fortran_order": False, "shape": (T, N, N)})
+            heads[w] = b.getvalue()
+        if any(len(heads[w]) != hit[1][w] for w in windows): hit = None  # 头部放不下新 shape
+    if hit is None:
+        write_history(returns, windows, out_dir)
+        return T
+    k, offs = hit
+    lo = max(k - max(windows), 0)
+    row = N * N * 4
+    # 文件只增不减：已存行原地覆盖、新行写在末尾，正在 mmap 旧文件的读者不会读到截断的页
+    files = {w: open(out_dir / f"w{w}.npy", "r+b") for w in windows}
+    try:
+        for a, blocks in rolling_corr_blocks(ret[lo:], windows):
+            skip = max(k - lo - a, 0)
+            for w, c in blocks.items():
+                if skip >= len(c): continue
+                f = files[w]; f.seek(offs[w] + (lo + a + skip) * row)
+                f.write(c[skip:].astype("<f4").tobytes())
+        for w, f in files.items():
+            f.seek(0); f.write(heads[w])
+    finally:
+        for f in files.values(): f.close()
+    _write_index(out_dir, {"dates": dates, "tickers": tickers, "windows": windows,
+                           "digest": _digest(ret[:T - 1])})
+    return T - k
+
+def load_history(window: int, out_dir: Path = HIST_DIR):
+    """返回 (dates, tickers, memmap(T, N, N))。"""
+    out_dir = Path(out_dir)
+    idx = json.loads((out_dir / "index.json").read_text(encoding="utf-8"))
+    return idx["dates"], idx["tickers"], np.load(out_dir / f"w{int(window)}.npy", mmap_mode="r")
+
+def corr_at(window: int, a: str, b: str, date=None, out_dir: Path = HIST_DIR):
+    """取某日（默认最后一日）两 ticker 的相关系数；无值返回 None。"""
+    dates, tickers, mm = load_history(window, out_dir)
+    if a not in tickers or b not in tickers or not dates: return None
+    t = len(dates) - 1 if date is None else int(np.searchsorted(dates, str(date)[:10], side="right")) - 1
+    if t < 0: return None
+    v = float(mm[t, tickers.index(a), tickers.index(b)])
+    return None if v != v else round(v, 4)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# macro/rolling_rank.py
+"""
+滚动分位：窗口内维护一个有序列表，新值 bisect 插入、最旧值 bisect 定位后删除，
+每来一个 bar 得到 “窗口内 <= 当前值的比例”（与 (series <= value).mean() 同口径）。
+查找 O(log W)；list 插入/删除是一次 memmove，W=252~2520 时可忽略。
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+
+class RollingPercentile:
+    def __init__(self, window: int):
+        self.window = int(window)
+        self._fifo = deque()
+        self._sorted = []
+
+    @classmethod
+    def resume(cls, window: int, recent):
+        """用窗口里原有的值（按时间顺序，超出窗口的旧值自动丢弃）恢复状态，之后照常 push。"""
+        rp = cls(window)
+        rp._fifo.extend(list(recent)[-rp.window:])
+        rp._sorted = sorted(rp._fifo)
+        return rp
+
+    def values(self) -> list:
+        """窗口内的值，按时间顺序（可序列化后交给 resume）。"""
+        return list(self._fifo)
+
+    def __len__(self):
+        return len(self._fifo)
+
+    def push(self, x: float) -> float:
+        """加入新值（必要时淘汰最旧值），返回新值在窗口中的分位。"""
+        self._fifo.append(x)
+        insort(self._sorted, x)
+        if len(self._fifo) > self.window:
+            old = self._fifo.popleft()
+            del self._sorted[bisect_left(self._sorted, old)]
+        return bisect_right(self._sorted, x) / len(self._sorted)
+
+    def rank(self, x: float):
+        """不入窗，只查 x 在当前窗口中的分位；空窗口返回 None。"""
+        if not self._sorted: return None
+        return bisect_right(self._sorted, x) / len(self._sorted)
+
+def percentile_history(values, windows) -> dict:
+    """一次扫描，返回 {win: [每个 bar 的分位]}；NaN 不入窗，对应位置为 None。"""
+    rps = {int(w): RollingPercentile(w) for w in windows}
+    out = {w: [] for w in rps}
+    for v in values:
+        ok = v is not None and v == v
+        for w, rp in rps.items():
+            out[w].append(rp.push(float(v)) if ok else None)
+    return out
@@ -1,10 +1,12 @@
-import os
+import os, sys
 from datetime import datetime
-def main(base='..', out_dir='./report_out'):
-    out = os.path.join(base, out_dir, f"ai_chips_weekly_{datetime.utcnow().strftime('%Y-%m-%d')}.md")
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from macro.artifacts import atomic_write
+def main(base='..', out_dir='./report_out', slug='ai_chips_weekly', title='AI Chips Weekly'):
+    out = os.path.join(base, out_dir, f"{slug}_{datetime.utcnow().strftime('%Y-%m-%d')}.md")
     os.makedirs(os.path.dirname(out), exist_ok=True)
     if not os.path.exists(out):
-        with open(out,'w',encoding='utf-8') as f:
-            f.write("# AI Chips Weekly\n\n## Executive Summary\n(placeholder)\n")
+        atomic_write(out, f"# {title}\n\n## Executive Summary\n(placeholder)\n")
     print("Weekly MD:", out)
 if __name__=='__main__': main()
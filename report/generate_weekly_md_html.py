@@ -1,26 +1,290 @@
-import sys, re, os
+import sys, re, os, io
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from macro.artifacts import atomic_open
 
 ARCH_PATH = "./report_assets/architecture.png"
 
+# 单遍、逐行的 Markdown -> HTML：块级（标题 / 段落 / 嵌套列表 / 表格 / 围栏代码 / 分隔线）按行状态机处理，
+# 行内（代码 / 图片 / 链接 / 粗体 / 斜体）只作用于各块自己的文字（单元格、标题、段落行、列表项），套标签之前替换，
+# 标记不会跨单元格或跨行。为了不逐段调用正则：块级输出里每段文字先占一个 \x00 槽位，原文另存；flush 时
+# 把一批原文用 \n 连起来做一遍行内替换（行内标记都不跨 \n，等价于逐段替换），再按槽位填回，交给 write 回调，
+# 不拼整篇的中间大字符串。与旧实现一致，正文里的原始 HTML 原样透传，只有代码块/行内代码会转义。
+_ITEM = re.compile(r'([ \t]*)([-*+]|[0-9]{1,9}[.)])[ \t]+(.*)$')
+_HR = re.compile(r' {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+_FENCE = re.compile(r' {0,3}(`{3,}|~{3,})[ \t]*([^`\s]*)')
+_TABLE_SEP = re.compile(r'[ \t]*\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)*\|?[ \t]*$')
+_CELL_SPLIT = re.compile(r'(?<!\\)\|')
+# 每个分支都以字面字符开头（前向否定断言放在首字符之后），正则引擎能按首字符快速跳过普通文本
+_INLINE = re.compile(
+    r'`(`*)(.+?)`\1'                                         # 1-2 行内代码
+    r'|!\[([^\]\n]*)\]\(([^)\s]*)(?:[ \t]+"([^"\n]*)")?\)'   # 3-5 图片
+    r'|\[([^\]\n`*_\[]+)\]\(([^)\s&<>"\']*)\)'               # 6-7 链接：文字里没有标记、地址不用转义、没有 title
+    r'|\[([^\]\n]+)\]\(([^)\s]*)(?:[ \t]+"([^"\n]*)")?\)'    # 8-10 其余链接
+    r'|\*\*(.+?)\*\*|_(?<!\w_)_(?!\s)(.+?)(?<!\s)__(?!\w)'   # 11-12 粗体（__ 不在词中间生效）
+    r'|\*(?<![\w*]\*)(?![\s*])(.+?)(?<![\s*])\*(?![\w*])'    # 13 斜体
+)
+
+_ESC = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'})
+
+def _esc(s):
+    return s.translate(_ESC) if ('&' in s or '"' in s or '<' in s or '>' in s or "'" in s) else s
+
+def _sub(m):
+    # 按最后一个参与匹配的分组分派；链接最常见，放在最前。链接文字 / 粗体内部没有标记字符就不再扫描
+    i = m.lastindex
+    if i == 7:  # 正则已保证不用再扫描、不用转义
+        return f'<a href="{m[7]}">{m[6]}</a>'
+    if i == 9 or i == 10:
+        text, href, title = m.group(8, 9, 10)
+        if '`' in text or '[' in text or '*' in text or '_' in text: text = inline(text)
+        if title: return f'<a href="{_esc(href)}" title="{_esc(title)}">{text}</a>'
+        return f'<a href="{_esc(href)}">{text}</a>'
+    if i > 10:
+        text = m[i]
+        if '`' in text or '[' in text or '*' in text or '_' in text: text = inline(text)
+        return f'<em>{text}</em>' if i == 13 else f'<strong>{text}</strong>'
+    if i == 2:
+        return f'<code>{_esc(m.group(2).strip())}</code>'
+    alt, src, title = m.group(3, 4, 5)
+    if title: return f'<img alt="{_esc(alt)}" src="{_esc(src)}" title="{_esc(title)}"/>'
+    return f'<img alt="{_esc(alt)}" src="{_esc(src)}"/>'
+
+def inline(text):
+    return _INLINE.sub(_sub, text)
+
+def _cells(s):
+    """已 strip 的表格行 -> 各单元格文字。"""
+    if s.startswith('|'): s = s[1:]
+    if s.endswith('|') and not s.endswith('\\|'): s = s[:-1]
+    if '\\|' not in s: return [c.strip() for c in s.split('|')]
+    return [c.strip().replace('\\|', '|') for c in _CELL_SPLIT.split(s)]
+
+def _align(sep):
+    out = []
+    for c in _cells(sep):
+        left, right = c.startswith(':'), c.endswith(':')
+        out.append(' style="text-align:center"' if left and right else
+                   ' style="text-align:right"' if right else
+                   ' style="text-align:left"' if left else '')
+    return out
+
+@lru_cache(maxsize=64)
+def _table_tpl(sep, nhead):
+    """分隔行 + 表头列数 -> (列数, 行模板, 表头模板)；一份周报里的表格格式大多相同，按分隔行缓存。"""
+    al = _align(sep)
+    tr = '<tr>' + ''.join([f'<td{a}>\x00</td>' for a in al]) + '</tr>\n'
+    th = (al + [''] * nhead)[:nhead]
+    return len(al), tr, '<table>\n<thead><tr>' + ''.join([f'<th{a}>\x00</th>' for a in th]) + '</tr>\n</thead>\n<tbody>\n'
+
+class MdRenderer:
+    """逐行喂入（feed），flush() 时把缓冲的 HTML 交给 write 回调；结束时调用 close()。"""
+    def __init__(self, write):
+        self._out = write
+        self._buf, self._txt = [], []  # 块级输出（文字处为 \x00 槽位）/ 各槽位的原文
+        self.w, self.t = self._buf.append, self._txt.append
+        self.para = []        # 当前段落的行（段落首行可能是表头，要等下一行才能确定）
+        self.lists = []       # [(缩进, 'ul'|'ol')]，每层都有一个未闭合的 <li>
+        self.table = None     # 当前表格的列数
+        self.tr = ''          # 表格的行模板（每个单元格一个槽位）
+        self.fence = None     # 围栏代码的开头标记
+        self.gap = False      # 列表里刚遇到空行（松散列表：后面还是列表项或缩进续行时不闭合列表）
+        self.hold = False     # 上面三种状态之一成立时，每行先交给 _held
+
+    # ---- 闭合各类块
+    def _flush_para(self):
+        if self.para:
+            self.w('<p>' + '\n'.join(['\x00'] * len(self.para)) + '</p>\n')
+            self._txt += self.para
+            self.para.clear()
+
+    def _close_lists(self, indent=-1):
+        while self.lists and self.lists[-1][0] > indent:
+            self.w(f'</li></{self.lists.pop()[1]}>\n')
+
+    def _close_table(self):
+        if self.table is not None:
+            self.w('</tbody></table>\n'); self.table = None; self.hold = False
+
+    def _close_blocks(self):
+        if self.para: self._flush_para()
+        if self.lists: self._close_lists()
+        if self.table is not None: self._close_table()
+
+    # ---- 各类块
+    def _item(self, indent, tag, marker, text):
+        lists = self.lists
+        if self.para: self._flush_para()
+        while lists and lists[-1][0] > indent:
+            self.w(f'</li></{lists.pop()[1]}>\n')
+        if lists and lists[-1][0] == indent:
+            if lists[-1][1] == tag:
+                self.w('</li>\n')
+            else:
+                self.w(f'</li></{lists.pop()[1]}>\n')
+        if not lists or lists[-1][0] < indent:
+            if tag == 'ol' and int(marker[:-1]) != 1:
+                self.w(f'<ol start="{int(marker[:-1])}">\n')
+            else:
+                self.w(f'<{tag}>\n')
+            lists.append((indent, tag))
+        self.w('<li>\x00'); self.t(text)
+
+    def _table(self, head, sep):
+        cells = _cells(head)
+        self._flush_para(); self._close_lists()
+        self.table, self.tr, thead = _table_tpl(sep.strip(), len(cells))
+        self.hold = True
+        self.w(thead); self._txt += cells
+
+    def _held(self, line, s):
+        """围栏代码内 / 表格内 / 列表里的空行之后的一行；返回 True 表示已处理完。"""
+        if self.fence is not None:
+            if s.startswith(self.fence) and not s.strip(self.fence[0]):
+                self.w('</code></pre>\n'); self.fence = None; self.hold = False
+            else:
+                if '\x00' in line: line = line.replace('\x00', '�')
+                self.w(_esc(line.rstrip('\r\n')) + '\n')
+            return True
+        if self.table is not None:
+            if '|' not in s:
+                self._close_table(); return False
+            n, cells = self.table, _cells(s)
+            if len(cells) != n: cells = (cells + [''] * n)[:n]  # 列数对齐到表头
+            self.w(self.tr); self._txt += cells
+            return True
+        if s:
+            # 空行之后：列表项留在列表里；缩进的续行归到缩进更浅的那一项；顶格的其余内容先闭合列表
+            self.gap = self.hold = False
+            if not (s[0] in '-*+0123456789' and _ITEM.match(line)):
+                indent = len(line.expandtabs(4)) - len(line.expandtabs(4).lstrip(' '))
+                self._close_lists(indent - 1 if indent > self.lists[0][0] else -1)
+        return False
+
+    def feed(self, line):
+        self.feed_lines((line,))
+
+    def feed_lines(self, lines):
+        # 热路径（同层列表项、表格行、段落行、空行）都在这个循环里，状态用局部变量引用，不逐行调方法
+        w, t, para, lists, held = self.w, self.t, self.para, self.lists, self._held
+        for line in lines:
+            s = line.strip()
+            if self.hold:
+                f = self.fence
+                if f is not None and not s.startswith(f):  # 代码块正文（最常见的 hold 行）
+                    if '\x00' in line: line = line.replace('\x00', '�')
+                    w(_esc(line.rstrip('\r\n')) + '\n'); continue
+                n = self.table
+                if n is not None and s[:1] == '|' and s[-1] == '|' and s.count('|') == n + 1:
+                    # 常见的 "| a | b |"：单元格用 \n 隔开、整行占一个槽位，flush 时自然拆成 n 个（转义的 \| 会留在 r 里）
+                    r = s[1:-1].strip().replace(' | ', '\n')
+                    if '|' not in r and ' \n' not in r and '\n ' not in r:
+                        w(self.tr); t(r); continue
+                if held(line, s): continue
+            if not s:
+                if lists:
+                    self._flush_para(); self.gap = self.hold = True
+                elif para:
+                    self._flush_para()
+                continue
+            c = s[0]
+            if c in '-*+0123456789':
+                if c in '-*' and s[-1] == c and _HR.match(line):
+                    self._close_blocks(); w('<hr/>\n'); continue
+                # 常见写法（"- 文字" / "12. 文字"）不走正则
+                p = s.find(' ')
+                if 0 < p < 11 and (c in '-*+' if p == 1 else s[p - 1] in '.)' and s[:p - 1].isdecimal()):
+                    ind = line.index(c)
+                    if ind and line.find('\t', 0, ind) >= 0: ind = len(line[:ind].expandtabs(4))
+                    tag = 'ul' if p == 1 else 'ol'
+                    if lists and not para:
+                        # 相邻项之间的常见转换（同层下一项 / 进一层 / 退回外层的同类列表）就地处理，其余交给 _item
+                        top = lists[-1]
+                        if top[0] > ind:
+                            while lists and lists[-1][0] > ind: w(f'</li></{lists.pop()[1]}>\n')
+                            top = lists[-1] if lists else (-1, '')
+                        if top[0] == ind and top[1] == tag:
+                            w('</li>\n<li>\x00'); t(s[p + 1:].lstrip()); continue
+                        if top[0] < ind and lists and (p == 1 or int(s[:p - 1]) == 1):
+                            w(f'<{tag}>\n<li>\x00'); lists.append((ind, tag)); t(s[p + 1:].lstrip()); continue
+                    self._item(ind, tag, s[:p], s[p + 1:].lstrip()); continue
+                m = _ITEM.match(line)
+                if m:
+                    marker = m.group(2)
+                    self._item(len(m.group(1).expandtabs(4)), 'ol' if marker[0].isdigit() else 'ul',
+                               marker, m.group(3)); continue
+            elif c == '#':
+                n = len(s) - len(s.lstrip('#'))
+                if n < 7 and s[n] in ' \t':
+                    text = s[n:].strip()
+                    if text.endswith('#'):  # 可选的结尾 #
+                        head = text.rstrip('#')
+                        if not head or head[-1] in ' \t': text = head.rstrip()
+                    if para or lists: self._close_blocks()
+                    w(f'<h{n}>\x00</h{n}>\n'); t(text); continue
+            elif c in '`~':
+                m = _FENCE.match(line)
+                if m:
+                    self._close_blocks()
+                    self.fence, self.hold = m.group(1), True
+                    lang = _esc(m.group(2).replace('\x00', '�'))
+                    w(f'<pre><code class="language-{lang}">' if lang else '<pre><code>'); continue
+            elif c == '_' and s[-1] == c and _HR.match(line):
+                self._close_blocks(); w('<hr/>\n'); continue
+            if para and c in '|:-' and '|' in para[-1] and _TABLE_SEP.match(line):
+                self._table(para.pop(), line); continue
+            if lists:  # 列表项的续行
+                w('\n\x00'); t(s); continue
+            para.append(s)
+
+    def flush(self):
+        if self._txt:
+            parts = ''.join(self._buf).split('\x00')
+            out = parts + parts[1:]
+            out[::2], out[1::2] = parts, inline('\n'.join(self._txt)).split('\n')
+            self._out(''.join(out))
+        elif self._buf:
+            self._out(''.join(self._buf))
+        self._buf.clear(); self._txt.clear()
+
+    def close(self):
+        if self.fence is not None:
+            self.w('</code></pre>\n'); self.fence = None; self.hold = False
+        self._close_blocks()
+        self.flush()
+
+def convert(lines, write):
+    """lines: 可迭代的行（如打开的文件）；write: 输出回调（如 f.write）。"""
+    r = MdRenderer(write)
+    it = iter(lines)
+    while True:
+        chunk = list(islice(it, 4096))
+        if not chunk: break
+        r.feed_lines(chunk)
+        r.flush()
+    r.close()
+
 def md_to_html(md):
-    t = md
-    t = re.sub(r'!\[(.*?)\]\((.*?)\)', r'<img alt="\1" src="\2"/>', t)
-    t = re.sub(r'\[(.*?)\]\((.*?)\)', r'<a href="\2">\1</a>', t)
-    t = re.sub(r'^# (.*)$', r'<h1>\1</h1>', t, flags=re.MULTILINE)
-    t = re.sub(r'^## (.*)$', r'<h2>\1</h2>', t, flags=re.MULTILINE)
-    t = re.sub(r'^- (.*)$', r'<ul><li>\1</li></ul>', t, flags=re.MULTILINE)
-    t = '<p>' + t.replace('\n\n','</p><p>') + '</p>'; t = t.replace('</ul>\n<ul>','')
-    return t
+    buf = io.StringIO()
+    convert(md.splitlines(), buf.write)
+    return buf.getvalue()
 
-def wrap_html(body, arch_exists):
+def _head(arch_exists):
     img_html = f'<p><img src="{ARCH_PATH}" alt="Architecture Overview"/></p>' if arch_exists else ''
-    return "<!doctype html><meta charset=\"utf-8\"><body style=\"max-width:860px;margin:40px auto;padding:0 16px;font-family:system-ui\">" + img_html + body + "</body>"
+    return "<!doctype html><meta charset=\"utf-8\"><body style=\"max-width:860px;margin:40px auto;padding:0 16px;font-family:system-ui\">" + img_html
+
+def wrap_html(body, arch_exists):
+    return _head(arch_exists) + body + "</body>"
 
 def main(md_path, out_html):
-    with open(md_path,'r',encoding='utf-8') as f: md=f.read()
     arch_exists = os.path.exists(ARCH_PATH)
-    html = wrap_html(md_to_html(md), arch_exists)
-    with open(out_html,'w',encoding='utf-8') as f: f.write(html)
+    # 原子写：转换中途失败不会留下半个 HTML
+    with open(md_path,'r',encoding='utf-8') as fin, atomic_open(out_html, 'w') as fout:
+        fout.write(_head(arch_exists))
+        convert(fin, fout.write)
+        fout.write("</body>")
     print('HTML saved:', out_html, '| Architecture image:', 'ON' if arch_exists else 'OFF')
 
 if __name__=='__main__':
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# scripts/backfill_metrics.py
+"""
+历史回填：价格库 / VIX / 事件日聚合 / Polymarket 历史只载入一次，向量化算出区间内每个交易日的
+rate_cut_odds / vix_pctile / corr_spx_dxy / corr_spx_10y / 贸易热度，写 out/metrics_history.csv；
+再按 --every 选出报告日，写每日的 metrics.json 并用 Renderer 批量渲染报告。
+
+  python3 scripts/backfill_metrics.py --range 2024-01-01:2024-12-31 --every W-MON
+  python3 scripts/backfill_metrics.py --as-of 2025-10-10
+
+口径：贸易热度按报告日本身为锚点（[d-6, d] vs [d-13, d-7]），而不是按最后一条事件的日期。
+"""
+import os, sys, argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from macro.artifacts import atomic_open, write_json
+
+HISTORY_CSV = Path("out/metrics_history.csv")
+HISTORY_DIR = Path("out/history")
+
+def _asof(series, dates):
+    """把按日期索引的序列对齐到 dates（取当日或之前最近的值）。"""
+    import pandas as pd
+    if series is None or series.empty: return pd.Series(float("nan"), index=dates)
+    s = series[~series.index.duplicated(keep="last")].sort_index()
+    return s.reindex(s.index.union(dates)).ffill().reindex(dates)
+
+def corr_history(window):
+    """SPX-DXY / SPX-10Y 的滚动相关序列（整段历史一次扫描）。"""
+    import pandas as pd
+    from macro.price_store import PriceStore
+    from macro.rolling_corr import rolling_corr
+    from macro.returns import align_prices, log_returns
+    from macro.calc_corr_from_prices import load_tickers, FALLBACKS, PAIRS
+    store, tickers = PriceStore(), load_tickers()
+    names = sorted({n for pair in PAIRS.values() for n in pair})
+    series = {}
+    for n in names:
+        t = tickers.get(n)
+        df = store.read(t) if t else None
+        if df is None and t in FALLBACKS: df = store.read(FALLBACKS[t])
+        series[n] = df
+    px = align_prices(series, base="SPX")
+    out = {}
+    if px.shape[1] < 2: return out
+    c = rolling_corr(log_returns(px).to_numpy(), [window])[window]
+    cols = list(px.columns)
+    for key, (a, b) in PAIRS.items():
+        if a in cols and b in cols:
+            out[key] = pd.Series(c[:, cols.index(a), cols.index(b)].astype(float), index=px.index)
+    return out
+
+def vix_history(window):
+    import pandas as pd
+    from macro.price_store import PriceStore
+    from macro.rolling_rank import percentile_history
+    df = PriceStore().read("^VIX")
+    if df is None: return None
+    p = percentile_history(df["close"].astype(float).tolist(), [window])[window]
+    return pd.Series([float("nan") if v is None else v for v in p], index=pd.DatetimeIndex(df["date"]))
+
+def trade_history(daily_csv, start=None, end=None):
+    """
+    按日命中数 -> 每天的 last7 / prev7 / delta_pct。日表只有有事件的日子，先补成覆盖 [start, end] 的
+    连续自然日（无事件记 0）再滚动，最后一条事件之后的窗口会如实衰减到 0，调用方按日期精确取值即可。
+    """
+    import pandas as pd
+    if not Path(daily_csv).exists(): return None
+    daily = pd.read_csv(daily_csv, index_col="date", parse_dates=["date"])
+    if daily.empty: return None
+    lo, hi = daily.index.min(), daily.index.max()
+    if start is not None: lo = min(lo, pd.Timestamp(start))
+    if end is not None: hi = max(hi, pd.Timestamp(end))
+    hits = daily["hits"].groupby(level=0).sum().reindex(pd.date_range(lo, hi, freq="D"), fill_value=0)
+    last7 = hits.rolling(7, min_periods=1).sum()
+    prev7 = last7.shift(7).fillna(0)
+    delta = ((last7 - prev7) / prev7 * 100).where(prev7 > 0)
+    delta = delta.mask((prev7 == 0) & (last7 > 0), 100.0)
+    return pd.DataFrame({"trade_last7": last7, "trade_prev7": prev7, "trade_delta_pct": delta.round(1)})
+
+def rate_cut_history(path):
+    """
+    Polymarket 概率的时间序列（只取 source 为观测的行）。有 ts/date 列时逐行取时间戳；没有时只有最新值，
+    以文件修改日为它的观测日——更早的日期没有观测，回填为 NaN，不拿今天的值填过去。
+    """
+    import pandas as pd
+    if not Path(path).exists(): return None
+    df = pd.read_csv(path)
+    if "source" in df.columns:  # 抓取失败时写的兜底值不是观测
+        df = df[~df["source"].fillna("").astype(str).str.startswith("fallback")]
+    if df.empty or "prob" not in df.columns: return None
+    tcol = next((c for c in ("ts", "date") if c in df.columns), None)
+    if tcol is None:
+        seen = pd.Timestamp(os.path.getmtime(path), unit="s").normalize()
+        return pd.Series([pd.to_numeric(df["prob"], errors="coerce").iloc[-1]], index=pd.DatetimeIndex([seen])).dropna()
+    t = pd.to_datetime(df[tcol], errors="coerce", utc=True).dt.tz_localize(None).dt.normalize()
+    s = pd.Series(pd.to_numeric(df["prob"], errors="coerce").to_numpy(), index=pd.DatetimeIndex(t))
+    return s[s.index.notna()].dropna()  # 迁移前的旧行没有时间戳
+
+def build_history(start, end, corr_window, vix_window, daily_csv, polymarket_csv):
+    import pandas as pd
+    dates = pd.bdate_range(start, end, name="date")
+    hist = pd.DataFrame(index=dates)
+
+    # 显式 RATE_CUT_ODDS 覆盖所有日期（同 emit_metrics_adapter），否则按观测时间 as-of 对齐
+    try: env_rc = float(os.getenv("RATE_CUT_ODDS", ""))
+    except ValueError: env_rc = None
+    hist["rate_cut_odds"] = env_rc if env_rc is not None else _asof(rate_cut_history(polymarket_csv), dates)
+
+    hist["vix_pctile"] = _asof(vix_history(vix_window), dates).round(4)
+    corr = corr_history(corr_window)
+    for key, col in (("spx_dxy", "corr_spx_dxy"), ("spx_10y", "corr_spx_10y")):
+        hist[col] = _asof(corr.get(key), dates).round(4)
+    hist["stance"] = os.getenv("STANCE", "Neutral")
+
+    th = trade_history(daily_csv, start, end)
+    for c in ("trade_last7", "trade_prev7", "trade_delta_pct"):
+        hist[c] = th[c].reindex(dates) if th is not None else float("nan")
+    return hist
+
+def _num(v):
+    return None if v is None or v != v else float(v)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="backfill metrics history and per-date reports")
+    g = ap.add_mutually_exclusive_group(required=True)
+    g.add_argument("--as-of", help="single date YYYY-MM-DD")
+    g.add_argument("--range", help="START:END (YYYY-MM-DD:YYYY-MM-DD)")
+    ap.add_argument("--every", default="W-MON", help="pandas frequency of report dates within --range (default W-MON)")
+    ap.add_argument("--corr-window", type=int, default=int(os.getenv("CORR_WINDOW", "90").split(",")[0]))
+    ap.add_argument("--vix-window", type=int, default=int(os.getenv("VIX_WINDOW", "252").split(",")[0]))
+    ap.add_argument("--daily", default="data/macro/trade_daily.csv")
+    ap.add_argument("--polymarket", default="data/macro/polymarket_live.csv")
+    ap.add_argument("--outdir", default="report_out")
+    ap.add_argument("--workers", type=int, default=8, help="report writer processes")
+    ap.add_argument("--no-reports", action="store_true", help="only write metrics_history.csv")
+    args = ap.parse_args(argv)
+
+    import pandas as pd
+    start, end = (args.as_of, args.as_of) if args.as_of else args.range.split(":", 1)
+    hist = build_history(start, end, args.corr_window, args.vix_window, args.daily, args.polymarket)
+    HISTORY_CSV.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_open(HISTORY_CSV, "w", newline="") as f:
+        hist.to_csv(f, date_format="%Y-%m-%d", float_format="%.6g")
+    print(f"[backfill] {len(hist)} days -> {HISTORY_CSV}")
+    if args.no_reports or hist.empty: return
+
+    picks = hist if args.as_of else hist.loc[hist.index.isin(pd.date_range(start, end, freq=args.every))]
+    snaps = []
+    for d, r in picks.iterrows():
+        day = d.strftime("%Y-%m-%d")
+        ddir = HISTORY_DIR / day; ddir.mkdir(parents=True, exist_ok=True)
+        metrics = {"rate_cut_odds": _num(r["rate_cut_odds"]), "vix_pctile": _num(r["vix_pctile"]),
+                   "corr_spx_dxy": _num(r["corr_spx_dxy"]), "corr_spx_10y": _num(r["corr_spx_10y"]),
+                   "stance": r["stance"]}
+        trade = {"last7": None if r["trade_last7"] != r["trade_last7"] else int(r["trade_last7"]),
+                 "prev7": None if r["trade_prev7"] != r["trade_prev7"] else int(r["trade_prev7"]),
+                 "delta_pct": _num(r["trade_delta_pct"])}
+        write_json(ddir / "metrics.json", metrics)
+        write_json(ddir / "trade_conflict.json", trade)
+        snaps.append({"metrics": metrics, "events": trade, "as_of": day})
+
+    from scripts.render_summary_v3 import Renderer
+    outs = Renderer(os.getcwd(), args.outdir, allow_na=True).render_many(snaps, args.workers)
+    print(f"[backfill] rendered {len(outs)} reports -> {args.outdir}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 # scripts/emit_metrics_adapter.py
-import os, json, argparse, math
+import os, sys, json, argparse, statistics
+from array import array
 from pathlib import Path
 import csv
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from macro.core import cached
+from macro.artifacts import write_json, STORE as ARTIFACTS
+
 def safe_num(v, default=None):
     try:
         if v is None: return default
@@ -17,9 +22,12 @@ def safe_num(v, default=None):
     except Exception:
         return default
 
+def _parse_json(path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
 def load_from_json(path: Path, key: str):
     try:
-        data = json.loads(path.read_text(encoding="utf-8"))
+        data = cached(path, _parse_json)  # 同一文件多个 key（如 corr.json 的两个相关系数）只解析一次
         # 支持嵌套 key（如 a.b.c）
         cur = data
         for k in key.split('.'):
@@ -31,22 +39,103 @@ def load_from_json(path: Path, key: str):
     except Exception:
         return None
 
-def load_from_csv(path: Path, column: str, agg:str="last"):
+def _header(path: Path):
+    """返回 (列名, 表头字节长度)。"""
+    with path.open("rb") as f:
+        line = f.readline()
+    return next(csv.reader([line.decode("utf-8-sig")]), []), len(line)
+
+def _reverse_lines(path: Path, start: int, block: int = 1 << 16):
+    """从文件末尾向前逐行产出 [start, EOF) 内的非空行（bytes）。"""
+    with path.open("rb") as f:
+        pos = f.seek(0, os.SEEK_END); tail = b""
+        while pos > start:
+            step = min(block, pos - start); pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + tail).split(b"\n")
+            tail = lines[0]
+            for line in reversed(lines[1:]):
+                if line.strip(): yield line
+        if tail.strip(): yield tail
+
+def _date_idx(cols):
+    return next((cols.index(c) for c in ("date", "ts") if c in cols), None)
+
+def _fallback_idx(cols, observed_only):
+    """observed_only 且有 source 列时返回其下标：source 以 fallback 开头的是抓取失败时的兜底值，不算观测。"""
+    return cols.index("source") if observed_only and "source" in cols else None
+
+def _is_fallback(row, si):
+    return si is not None and si < len(row) and row[si].startswith("fallback")
+
+def tail_rows(path: Path, column: str, n: int = 1, as_of: str = None, observed_only: bool = False,
+              numeric: bool = False):
+    """
+    从文件尾部往回读，返回最后 n 行该列的原始值（旧 -> 新）；只解析用到的行。
+    as_of 需要按时间升序追加的文件（date/ts 列）：跳过尾部晚于 as_of 的行。
+    observed_only：跳过 source 列标成 fallback 的兜底行。
+    numeric：跳过该列为空 / 非数值的行，即取最后 n 个数值。
+    按换行切行后逐行解析，不支持引号内含换行的字段（指标 CSV 都是单行记录）；有这种文件用 stream_agg。
+    """
+    cols, head_len = _header(path)
+    if column not in cols: return []
+    ci, di = cols.index(column), (_date_idx(cols) if as_of else None)
+    si = _fallback_idx(cols, observed_only)
+    out = []
+    for raw in _reverse_lines(path, head_len):
+        row = next(csv.reader([raw.decode("utf-8").rstrip("\r")]), [])
+        if di is not None and (row[di] if di < len(row) else "")[:10] > as_of:
+            continue
+        if _is_fallback(row, si): continue
+        v = row[ci] if ci < len(row) else None
+        if numeric and safe_num(v) is None: continue
+        out.append(v)
+        if len(out) >= n: break
+    return out[::-1]
+
+def stream_agg(path: Path, column: str, agg: str, as_of: str = None, span: float = 20):
+    """单遍流式聚合 mean / median / ewm（跳过空值、非数值和 source=fallback* 的兜底行；as_of 之后的行不计）。"""
+    with path.open(encoding="utf-8-sig", newline="") as f:
+        r = csv.reader(f)
+        cols = next(r, [])
+        if column not in cols: return None
+        ci, di = cols.index(column), (_date_idx(cols) if as_of else None)
+        si = _fallback_idx(cols, True)
+        n, total, ew, vals = 0, 0.0, None, (array("d") if agg == "median" else None)
+        alpha = 2.0 / (span + 1.0)
+        for row in r:
+            if di is not None and (row[di] if di < len(row) else "")[:10] > as_of: continue
+            if ci >= len(row) or _is_fallback(row, si): continue
+            try: x = float(row[ci])                        # 常见情况：纯数字
+            except ValueError: x = safe_num(row[ci])       # 空串 / 带 % 等
+            if x is None or x != x: continue
+            n += 1; total += x
+            ew = x if ew is None else alpha * x + (1 - alpha) * ew
+            if vals is not None: vals.append(x)
+    if not n: return None
+    if agg == "mean": return total / n
+    if agg == "median": return statistics.median(vals)
+    return ew
+
+def load_from_csv(path: Path, column: str, agg:str="last", as_of:str=None, n:int=5, span:float=20):
+    """
+    last   最后一行（从文件尾 seek，不读全文件；兜底行也算，它就是当前发布的值）
+    lastN  最后 n 行非空值的均值（同样从尾部读）
+    mean / median / ewm(span)  单遍流式
+    历史聚合（lastN / mean / median / ewm）只用观测行，跳过 source=fallback* 的兜底行。
+    """
     try:
-        rows = list(csv.DictReader(path.open(encoding="utf-8")))
-        if not rows: return None
-        if agg == "last":
-            v = rows[-1].get(column)
-        elif agg == "mean":
-            vals = [safe_num(r.get(column)) for r in rows if safe_num(r.get(column)) is not None]
-            v = sum(vals)/len(vals) if vals else None
-        else:
-            v = rows[-1].get(column)
-        return v
+        if agg in ("last", "lastN"):
+            lastn = agg == "lastN"
+            vals = tail_rows(path, column, n if lastn else 1, as_of, observed_only=lastn, numeric=lastn)
+            if agg == "last": return vals[-1] if vals else None
+            nums = [x for x in map(safe_num, vals) if x is not None]
+            return sum(nums) / len(nums) if nums else None
+        return stream_agg(path, column, agg, as_of, span)
     except Exception:
         return None
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser(description="Emit metrics.json for LumiereX")
     ap.add_argument("--out", default="out/metrics.json")
     # 文件来源
@@ -60,8 +149,11 @@ def main():
     # 环境变量覆盖
     ap.add_argument("--from-env", action="store_true", help="prefer environment variables if present")
     # CSV 聚合策略（可选）
-    ap.add_argument("--csv-agg", default="last", choices=["last","mean"])
-    args = ap.parse_args()
+    ap.add_argument("--csv-agg", default="last", choices=["last","mean","median","ewm","lastN"])
+    ap.add_argument("--csv-n", type=int, default=5, help="rows for --csv-agg lastN")
+    ap.add_argument("--ewm-span", type=float, default=20, help="span for --csv-agg ewm")
+    ap.add_argument("--as-of", help="YYYY-MM-DD: use rows dated on/before this day in dated CSVs")
+    args = ap.parse_args(argv)
 
     out_path = Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
@@ -78,7 +170,8 @@ def main():
             if p.suffix.lower() in [".json"]:
                 num = safe_num(load_from_json(p, key))
             elif p.suffix.lower() in [".csv"]:
-                num = safe_num(load_from_csv(p, key, agg=args.csv_agg))
+                num = safe_num(load_from_csv(p, key, agg=args.csv_agg, as_of=args.as_of,
+                                             n=args.csv_n, span=args.ewm_span))
             else:
                 num = None
             if num is not None: return num
@@ -100,7 +193,9 @@ def main():
     }
 
     # 将 None 正常写出，渲染端会显示 N/A
-    out_path.write_text(json.dumps(metrics, ensure_ascii=False, indent=2), encoding="utf-8")
+    # 原子改写：渲染端 / 常驻调度器并发读取时不会读到半个文件；同时留一个按内容寻址的版本
+    write_json(out_path, metrics)
+    ARTIFACTS.put_json("metrics", metrics)
     print("[emit_metrics_adapter] wrote ->", out_path)
     print(json.dumps(metrics, indent=2, ensure_ascii=False))
 
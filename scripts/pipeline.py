@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# scripts/pipeline.py
+"""
+周报流水线（DAG）：所有阶段在同一进程内运行，无依赖关系的阶段并行。
+每个阶段声明 inputs / outputs；输入文件内容、阶段代码、参数和相关环境变量的哈希没变、
+且输出都还在时跳过该阶段。抓取类阶段（volatile）依赖外部数据，每次都跑，
+其输出内容不变时下游照样会被跳过。
+
+  python3 scripts/pipeline.py                    # 跑整条流水线
+  python3 scripts/pipeline.py --force render     # 强制重跑某阶段（可多次；all = 全部）
+  python3 scripts/pipeline.py --list             # 只列出阶段和依赖
+  python3 scripts/pipeline.py --profile vix     # 对某阶段做 cProfile（out/profile/vix.prof；all = 全部）
+  python3 scripts/pipeline.py --deadline 60      # 抓取阶段的总墙钟预算（默认 FETCH_DEADLINE，60 秒；0 = 不限）
+到 deadline 还没跑完的抓取阶段记为 timeout，保留上次的输出，下游照常用旧输出继续。
+状态记录在 out/.pipeline_state.json；每次运行后裁剪 out/artifacts 的旧版本（ARTIFACT_KEEP）；每次运行的阶段耗时、HTTP 计数和内存写到 out/run_report.json
+（--prom PATH 或 RUN_REPORT_PROM 另写一份 Prometheus textfile）。
+"""
+import os, sys, json, glob, time, hashlib, argparse, importlib, threading
+from pathlib import Path
+from dataclasses import dataclass
+from graphlib import TopologicalSorter, CycleError
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from macro import instrument
+from macro.artifacts import write_json, STORE as ARTIFACTS
+
+STATE = Path("out/.pipeline_state.json")
+CONFIG = "config/macro.yaml"
+DEADLINE = float(os.getenv("FETCH_DEADLINE", "60"))
+
+@dataclass
+class Stage:
+    name: str
+    module: str                 # 入口模块（按 import 路径）
+    func: str = "main"
+    argv: list = None           # 传给 main(argv) 的参数；None 表示无参调用
+    deps: tuple = ()
+    inputs: tuple = ()          # 文件或 glob
+    outputs: tuple = ()         # 文件或 glob
+    env: tuple = ()             # 影响结果的环境变量
+    volatile: bool = False      # 依赖网络等外部状态：总是运行
+
+    def source(self):
+        return ROOT / (self.module.replace(".", "/") + ".py")
+
+STAGES = [
+    Stage("vix", "macro.fetch_vix_pctile", outputs=("data/macro/vix.csv",),
+          env=("VIX_WINDOW", "VIX_PCTILE", "STOOQ_URL"), volatile=True),
+    Stage("corr", "macro.calc_corr_from_prices", inputs=(CONFIG, "data/prices/*.csv"),
+          outputs=("data/macro/corr.json",), env=("CORR_WINDOW", "CORR_SPX_DXY", "CORR_SPX_10Y"), volatile=True),
+    Stage("polymarket", "macro.fetch_polymarket_to_csv", outputs=("data/macro/polymarket_live.csv",),
+          env=("POLYMARKET_PRIMARY", "POLYMARKET_FALLBACK", "POLYMARKET_PROB"), volatile=True),
+    Stage("conflict", "macro.compute_conflict_score", argv=[],
+          inputs=(CONFIG, "data/warehouse/events.csv"),
+          outputs=("data/macro/trade_conflict.json",), env=("EVENTS_CHUNK_ROWS",)),
+    Stage("emit", "scripts.emit_metrics_adapter", deps=("vix", "corr", "polymarket"),
+          argv=["--rate-cut", "data/macro/polymarket_live.csv", "--rate-cut-key", "prob",
+                "--vix", "data/macro/vix.csv", "--vix-key", "pctile",
+                "--corr", "data/macro/corr.json", "--corr-dxy-key", "spx_dxy", "--corr-10y-key", "spx_10y",
+                "--from-env"],
+          inputs=("data/macro/polymarket_live.csv", "data/macro/vix.csv", "data/macro/corr.json"),
+          outputs=("out/metrics.json",),
+          env=("STANCE", "RATE_CUT_ODDS", "VIX_PCTILE", "CORR_SPX_DXY", "CORR_SPX_10Y")),
+    Stage("render", "scripts.render_summary_v3", deps=("emit", "conflict"),
+          argv=["--metrics", "out/metrics.json"],
+          inputs=("out/metrics.json", "data/macro/trade_conflict.json", "data/macro/trade_heat.npz",
+                  "report_out/report_assets/architecture.*"),
+          outputs=("report_out/ai_chips_weekly_{today}_final.html",)),
+]
+
+def _expand(patterns):
+    today = time.strftime("%Y-%m-%d")
+    out = []
+    for p in patterns:
+        p = p.format(today=today)
+        hits = sorted(glob.glob(p)) if any(ch in p for ch in "*?[") else [p]
+        out.extend(hits or [p])
+    return out
+
+class Hasher:
+    """文件内容哈希；(size, mtime_ns) 没变时复用上次的结果，大文件不重复读。"""
+    def __init__(self, cache):
+        self.cache = cache
+        self._lock = threading.Lock()
+
+    def file(self, path):
+        try: st = os.stat(path)
+        except FileNotFoundError: return "-"
+        stamp = f"{st.st_size}:{st.st_mtime_ns}"
+        with self._lock:
+            hit = self.cache.get(path)
+        if hit and hit[0] == stamp: return hit[1]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""): h.update(block)
+        with self._lock:
+            self.cache[path] = [stamp, h.hexdigest()]
+        return h.hexdigest()
+
+def stage_key(stage, hasher):
+    h = hashlib.sha256()
+    h.update(json.dumps([stage.name, stage.module, stage.func, stage.argv]).encode())
+    h.update(hasher.file(str(stage.source())).encode())
+    for p in _expand(stage.inputs):
+        h.update(f"{p}={hasher.file(p)}".encode())
+    for k in stage.env:
+        h.update(f"{k}={os.getenv(k, '')}".encode())
+    return h.hexdigest()
+
+def run_stage(stage):
+    mod = importlib.import_module(stage.module)
+    fn = getattr(mod, stage.func)
+    return fn() if stage.argv is None else fn(list(stage.argv))
+
+def _exec(s):
+    with instrument.span(f"stage.{s.name}"), instrument.profiled(s.name):
+        try:
+            run_stage(s)
+        except SystemExit as e:  # 入口脚本对坏输入 sys.exit(msg)；exit(0) 视为正常结束
+            if e.code not in (None, 0): raise
+
+def _exec_until(s, t_end):
+    """在 daemon 线程里跑阶段，最多等到 t_end；超时返回 False（线程不等，同 fetch_all 的做法）。"""
+    box = {}
+    def work():
+        try: _exec(s)
+        except BaseException as e: box["err"] = e
+    t = threading.Thread(target=work, name=f"fetch-{s.name}", daemon=True)
+    t.start(); t.join(max(0.0, t_end - time.monotonic()))
+    if t.is_alive(): return False
+    if "err" in box: raise box["err"]
+    return True
+
+def load_state(state_path=STATE):
+    try: return json.loads(Path(state_path).read_text(encoding="utf-8"))
+    except Exception: return {}
+
+def run(stages, force=(), workers=4, state_path=STATE, hold=(), deadline=None, state=None):
+    """
+    state: 常驻进程传入上一轮的状态 dict（原地更新），省去每轮重读状态文件；照常落盘。
+    hold: 本轮不跑的抓取阶段（输出已存在时沿用上次结果，下游照常按输入哈希判断）。
+    deadline: 抓取（volatile）阶段从本轮开始算起的总秒数；超时的阶段状态为 timeout，
+    上次的输出还在时下游照常运行，否则按失败处理。None / <=0 不限时。
+    """
+    by_name = {s.name: s for s in stages}
+    missing = {d for s in stages for d in s.deps if d not in by_name}
+    if missing: raise ValueError(f"unknown deps: {sorted(missing)}")
+    try: tuple(TopologicalSorter({s.name: s.deps for s in stages}).static_order())
+    except CycleError as e:  # 有环时下面的调度循环永远等不到依赖完成
+        raise ValueError(f"dependency cycle: {' -> '.join(e.args[1])}") from None
+    if state is None: state = load_state(state_path)
+    keys, hasher = state.setdefault("keys", {}), Hasher(state.setdefault("hashes", {}))
+    force = set(by_name) if "all" in force else set(force)
+    status, timing = {}, {}
+    pending = dict(by_name)
+    running = {}
+    t_end = time.monotonic() + deadline if deadline and deadline > 0 else None
+
+    def launch(s):
+        key = stage_key(s, hasher)
+        fresh = (not s.volatile and s.name not in force and keys.get(s.name) == key
+                 and all(os.path.exists(p) for p in _expand(s.outputs)))
+        held = s.name in hold and all(os.path.exists(p) for p in _expand(s.outputs))
+        if fresh or held:
+            return "skip", 0.0, key
+        t0 = time.perf_counter()
+        if s.volatile and t_end is not None:
+            if not _exec_until(s, t_end):
+                if not all(os.path.exists(p) for p in _expand(s.outputs)):
+                    raise TimeoutError(f"no result within {deadline}s and no previous output")
+                return "timeout", time.perf_counter() - t0, None
+        else:
+            _exec(s)
+        return "ok", time.perf_counter() - t0, None
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage") as ex:
+            while pending or running:
+                for name, s in list(pending.items()):
+                    if any(d not in status for d in s.deps): continue
+                    del pending[name]
+                    if any(status[d] in ("failed", "blocked") for d in s.deps):
+                        status[name], timing[name] = "blocked", 0.0; continue
+                    running[ex.submit(launch, s)] = s
+                if not running: continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for f in done:
+                    s = running.pop(f)
+                    try:
+                        st, sec, _ = f.result()
+                        status[s.name], timing[s.name] = st, sec
+                        if st == "timeout":
+                            print(f"[pipeline] {s.name} hit the {deadline:g}s fetch deadline; keeping its last output",
+                                  file=sys.stderr)
+                            continue
+                        # 成功后按运行后的输入重新记 key（阶段可能改写了自己的输入，如增量状态）
+                        keys[s.name] = stage_key(s, hasher)
+                    except (Exception, SystemExit) as e:  # 一个阶段失败只拦下它的下游，不中断整轮
+                        status[s.name], timing[s.name] = "failed", 0.0
+                        keys.pop(s.name, None)
+                        print(f"[pipeline] {s.name} failed: {e!r}", file=sys.stderr)
+    finally:
+        # 已完成阶段的 key 总要落盘，即使被 Ctrl-C 打断
+        write_json(state_path, state, indent=1)
+    # 各阶段往 out/artifacts 存的版本只保留最近 ARTIFACT_KEEP 个
+    try: ARTIFACTS.prune_all()
+    except OSError as e: print(f"[pipeline] artifact prune failed: {e!r}", file=sys.stderr)
+    return status, timing
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="run the weekly pipeline as a DAG with cached stages")
+    ap.add_argument("--force", action="append", default=[], metavar="STAGE",
+                    help="re-run STAGE even if its inputs are unchanged (repeatable; 'all' for every stage)")
+    ap.add_argument("--workers", type=int, default=4, help="max stages running at once")
+    ap.add_argument("--deadline", type=float, default=DEADLINE,
+                    help="wall-clock budget (s) for the network stages; late ones keep their last output (0 = none)")
+    ap.add_argument("--list", action="store_true", help="print stages and exit")
+    ap.add_argument("--profile", action="append", default=[], metavar="STAGE",
+                    help="write a cProfile dump for STAGE to out/profile/ (repeatable; 'all' for every stage)")
+    ap.add_argument("--report", default="out/run_report.json", help="run report (spans, counters, memory)")
+    ap.add_argument("--prom", default=os.getenv("RUN_REPORT_PROM"), metavar="PATH",
+                    help="also write the run report as a Prometheus textfile")
+    args = ap.parse_args(argv)
+
+    os.chdir(ROOT)
+    sys.path.insert(0, str(ROOT))
+    names = {s.name for s in STAGES}
+    unknown = [f for f in args.force + args.profile if f not in names and f != "all"]
+    if unknown:
+        raise SystemExit(f"[pipeline] unknown stage(s): {unknown}; known: {sorted(names)}")
+    if args.list:
+        for s in STAGES:
+            print(f"{s.name:<11} deps={','.join(s.deps) or '-':<22} {'volatile' if s.volatile else ''}")
+        return 0
+
+    # 与 run_weekly_min.sh 相同的环境兜底；降息概率来自 polymarket 阶段（它自己有兜底），
+    # 只有显式设置 RATE_CUT_ODDS 时才覆盖
+    os.environ.setdefault("STANCE", "Cautious")
+    Path("out").mkdir(exist_ok=True); Path("report_out/report_assets").mkdir(parents=True, exist_ok=True)
+
+    if args.profile:
+        instrument.PROFILE = ",".join(filter(None, [instrument.PROFILE, *args.profile]))
+    t0 = time.perf_counter()
+    status, timing = run(STAGES, force=args.force, workers=args.workers, deadline=args.deadline)
+    print("\n[pipeline] stage        status    seconds")
+    for s in STAGES:
+        print(f"[pipeline] {s.name:<12} {status.get(s.name, '-'):<9} {timing.get(s.name, 0.0):7.2f}")
+    print(f"[pipeline] total {time.perf_counter() - t0:.2f}s")
+    from macro.http_cache import CACHE
+    instrument.write_report(args.report, args.prom, extra={"stages": status, "http_cache": CACHE.stats})
+    print(f"[pipeline] run report -> {args.report}" + (f" (+ {args.prom})" if args.prom else ""))
+    return 1 if any(v in ("failed", "blocked") for v in status.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
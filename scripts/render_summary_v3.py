@@ -1,6 +1,16 @@
 #!/usr/bin/env python3
-import json, os, argparse, datetime
+import json, os, sys, html, argparse, datetime, hashlib
 from pathlib import Path
+from string import Template
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from macro.instrument import span
+from macro.artifacts import atomic_write
+
+DEFAULT_TITLE = "LumiereX Weekly — AI Chips / Macro Snapshot"
+DEFAULT_SLUG = "ai_chips_weekly"
+REQUIRED = ["rate_cut_odds","vix_pctile","corr_spx_dxy","corr_spx_10y","stance"]
 
 def jload(p: Path):
     with open(p, "r", encoding="utf-8") as f:
@@ -11,6 +21,30 @@ def safe_num(x):
     try: return float(x)
     except Exception: return None
 
+def _sha1(p: Path):
+    h = hashlib.sha1()
+    with open(p, "rb") as f:
+        for b in iter(lambda: f.read(1 << 20), b""): h.update(b)
+    return h.hexdigest()
+
+def sync_asset(src: Path, dst: Path) -> bool:
+    """把 src 同步到 dst：内容相同（大小+哈希）不动；否则优先硬链接，跨设备等失败时再复制。返回是否写了文件。"""
+    if src == dst: return False
+    try:
+        if dst.exists() and (os.path.samefile(src, dst) or
+                             (dst.stat().st_size == src.stat().st_size and _sha1(dst) == _sha1(src))):
+            return False
+    except OSError:
+        pass
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".tmp")
+    try: tmp.unlink()
+    except FileNotFoundError: pass
+    try: os.link(src, tmp)
+    except OSError: tmp.write_bytes(src.read_bytes())
+    os.replace(tmp, dst)
+    return True
+
 def resolve_arch_asset(root: Path, outdir: Path) -> str | None:
     """
     返回报告里应该使用的架构图相对路径（优先 SVG，再 PNG/JPG）。
@@ -33,105 +67,234 @@ def resolve_arch_asset(root: Path, outdir: Path) -> str | None:
     ]
     for p in candidates:
         if p.exists():
-            # 确保最终都放到 report_out/report_assets 下，便于相对引用
-            target = outdir/"report_assets"/p.name
-            target.parent.mkdir(parents=True, exist_ok=True)
-            if p != target:
-                try: target.write_bytes(p.read_bytes())
-                except Exception: pass
+            # 确保最终都放到 report_out/report_assets 下，便于相对引用；内容没变就不重复拷贝
+            try: sync_asset(p, outdir/"report_assets"/p.name)
+            except Exception: pass
             return f"report_assets/{p.name}"
     return None
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--metrics", default="out/metrics.json")
-    ap.add_argument("--events",  default="data/macro/trade_conflict.json")
-    ap.add_argument("--outdir",  default="report_out")
-    ap.add_argument("--title",   default="LumiereX Weekly — AI Chips / Macro Snapshot")
-    ap.add_argument("--allow-na", action="store_true")
-    args = ap.parse_args()
-
-    ROOT   = Path(os.getcwd())
-    OUTDIR = ROOT / args.outdir
-    OUTDIR.mkdir(parents=True, exist_ok=True)
-
-    m = jload(ROOT/args.metrics)
-    req = ["rate_cut_odds","vix_pctile","corr_spx_dxy","corr_spx_10y","stance"]
-    miss = [k for k in req if k not in m]
-    if miss and not args.allow_na:
-        raise SystemExit(f"[render] missing keys in metrics: {miss}")
-
-    ratecut = safe_num(m.get("rate_cut_odds"))
-    vixpct  = safe_num(m.get("vix_pctile"))
-    corr_dx = safe_num(m.get("corr_spx_dxy"))
-    corr_10 = safe_num(m.get("corr_spx_10y"))
-    stance  = m.get("stance","N/A")
-
-    ev = {}
-    ev_path = ROOT/args.events
-    if ev_path.exists():
-        try: ev = jload(ev_path)
-        except: ev = {}
-    l7, p7, dp = ev.get("last7","N/A"), ev.get("prev7","N/A"), ev.get("delta_pct","N/A")
-
-    def fmt_pct(x):   return "N/A" if x is None else f"{x*100:.1f}%"
-    def fmt_num(x,n=3): return "N/A" if x is None else f"{x:.{n}f}"
-
-    # ——— 新：解析架构图
-    arch_src = resolve_arch_asset(ROOT, OUTDIR)
-
-    as_of = datetime.date.today().isoformat()
-    head = f"""<!doctype html><html><head>
+def _read_heat(p: Path):
+    if not p.exists(): return None
+    try:
+        from macro.core import cached
+        from macro.columnar import read_frame
+        df = cached(p, read_frame)  # 同一进程里按 mtime 复用
+    except Exception:
+        return None
+    cols = [c for c in df.columns if c.startswith("heat_")]
+    return df[cols] if cols else None
+
+def _heat_window(df, days: int = 90, as_of: str | None = None):
+    if df is None: return None
+    if as_of: df = df.loc[:as_of]
+    return None if df.empty else df.tail(days)
+
+def load_heat(p: Path, days: int = 90, as_of: str | None = None):
+    """读日度热度序列（compute_conflict_score 写的 trade_heat.npz），取 as_of（含）之前最近 days 天；缺文件/依赖返回 None。"""
+    return _heat_window(_read_heat(p), days, as_of)
+
+def heat_svg(heat, width=860, height=160, pad=28):
+    """各窗口滚动热度的折线图（内联 SVG，无需绘图库）。"""
+    colors = ["#d9480f", "#1c7ed6", "#2b8a3e", "#862e9c"]
+    vals = [v for c in heat.columns for v in heat[c].tolist() if v == v]
+    top = max(vals) if vals else 1.0
+    top = top or 1.0
+    n = max(len(heat) - 1, 1)
+    def xy(i, v): return pad + i * (width - 2 * pad) / n, height - pad - v / top * (height - 2 * pad)
+    parts = [f'<svg viewBox="0 0 {width} {height}" width="100%" role="img" aria-label="trade heat trend">',
+             f'<line x1="{pad}" y1="{height-pad}" x2="{width-pad}" y2="{height-pad}" stroke="#ccc"/>',
+             f'<text x="{pad}" y="{pad-10}" font-size="11" fill="#888">max {top:.0f}</text>']
+    for k, c in enumerate(heat.columns):
+        pts = " ".join("%.1f,%.1f" % xy(i, v) for i, v in enumerate(heat[c].tolist()) if v == v)
+        color = colors[k % len(colors)]
+        parts.append(f'<polyline fill="none" stroke="{color}" stroke-width="1.6" points="{pts}"/>')
+        parts.append(f'<text x="{width-pad-70}" y="{pad+14*k}" font-size="11" fill="{color}">{c.replace("heat_","")}d heat</text>')
+    d0, d1 = heat.index[0], heat.index[-1]
+    parts.append(f'<text x="{pad}" y="{height-8}" font-size="11" fill="#888">{str(d0)[:10]}</text>')
+    parts.append(f'<text x="{width-pad-64}" y="{height-8}" font-size="11" fill="#888">{str(d1)[:10]}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+# ——— 模板：导入时编译一次，每份报告只做替换
+HEAD = Template("""<!doctype html><html><head>
 <meta charset="utf-8"/>
-<title>{args.title}</title>
+<title>$title</title>
 <meta name="viewport" content="width=device-width, initial-scale=1"/>
 <style>
- body{{font-family:ui-sans-serif,system-ui;max-width:900px;margin:32px auto;line-height:1.6}}
- h1{{margin:0 0 6px}} .tag{{padding:6px 12px;border-radius:999px;background:#eee;margin-right:8px;display:inline-block}}
- .card{{border:1px solid #eee;border-radius:12px;padding:16px;margin-top:16px}}
- .arch{{background:#fafafa}}
- .arch img{{width:100%;height:auto;display:block;max-height:70vh;object-fit:contain;cursor:zoom-in;transition:transform .15s ease;image-rendering:-webkit-optimize-contrast;}}
- .arch img.zoom{{transform:scale(1.8);cursor:zoom-out;transform-origin:center center;}}
- .hint{{font-size:12px;opacity:.65;margin-top:6px}}
+ body{font-family:ui-sans-serif,system-ui;max-width:900px;margin:32px auto;line-height:1.6}
+ h1{margin:0 0 6px} .tag{padding:6px 12px;border-radius:999px;background:#eee;margin-right:8px;display:inline-block}
+ .card{border:1px solid #eee;border-radius:12px;padding:16px;margin-top:16px}
+ .arch{background:#fafafa}
+ .arch img{width:100%;height:auto;display:block;max-height:70vh;object-fit:contain;cursor:zoom-in;transition:transform .15s ease;image-rendering:-webkit-optimize-contrast;}
+ .arch img.zoom{transform:scale(1.8);cursor:zoom-out;transform-origin:center center;}
+ .hint{font-size:12px;opacity:.65;margin-top:6px}
 </style></head><body>
-<h1>{args.title}</h1>
-<div class="tag">{as_of}</div><div class="tag">Bias: {stance}</div>
-"""
+<h1>$title</h1>
+<div class="tag">$as_of</div><div class="tag">Bias: $stance</div>
+""")
 
-    executive = f"""
+EXECUTIVE = Template("""
 <div class="card">
   <h3>Executive Summary</h3>
   <ul>
-    <li><b>Rate-cut odds:</b> {fmt_pct(ratecut)}</li>
-    <li><b>VIX percentile:</b> {fmt_num(vixpct,2)}</li>
-    <li><b>Corr(SPX, DXY):</b> {fmt_num(corr_dx)}</li>
-    <li><b>Corr(SPX, 10Y):</b> {fmt_num(corr_10)}</li>
-    <li><b>Trade events last7/prev7/Δ%:</b> {l7}/{p7}/{dp}</li>
-    <li><b>Overall stance:</b> {stance}</li>
+    <li><b>Rate-cut odds:</b> $ratecut</li>
+    <li><b>VIX percentile:</b> $vixpct</li>
+    <li><b>Corr(SPX, DXY):</b> $corr_dx</li>
+    <li><b>Corr(SPX, 10Y):</b> $corr_10</li>
+    <li><b>Trade events last7/prev7/Δ%:</b> $l7/$p7/$dp</li>
+    <li><b>Overall stance:</b> $stance</li>
   </ul>
   <p style="color:#a52828"><i>* Educational demo — not investment advice.</i></p>
 </div>
-"""
+""")
+
+WATCH = Template("""
+<div class="card">
+  <h3>Watchlist</h3>
+  <table style="width:100%;border-collapse:collapse">
+    <tr><th align="left">Ticker</th><th align="right">20D return</th><th align="right">Corr vs SPX</th></tr>
+$rows
+  </table>
+</div>
+""")
+WATCH_ROW = Template("""    <tr><td>$ticker</td><td align="right">$ret</td><td align="right">$corr</td></tr>""")
 
-    # ——— 新：Architecture 区块（有图才渲染）
-    if arch_src:
-        arch = f"""
+TREND = Template("""
+<div class="card">
+  <h3>Trade Heat Trend</h3>
+  $svg
+</div>
+""")
+
+ARCH = Template("""
 <div class="card arch">
   <h3>Architecture</h3>
-  <img id="archImg" src="{arch_src}" alt="architecture" loading="lazy">
+  <img id="archImg" src="$src" alt="architecture" loading="lazy">
   <div class="hint">点击图片放大/还原</div>
 </div>
 <script>
-  (function(){{ const img=document.getElementById('archImg'); if(img) img.addEventListener('click',()=>img.classList.toggle('zoom')); }})();
+  (function(){ const img=document.getElementById('archImg'); if(img) img.addEventListener('click',()=>img.classList.toggle('zoom')); })();
 </script>
-"""
-    else:
-        arch = ""
+""")
+
+def fmt_pct(x):   return "N/A" if x is None else f"{x*100:.1f}%"
+def fmt_num(x,n=3): return "N/A" if x is None else f"{x:.{n}f}"
+
+def report_name(as_of: str, slug: str = DEFAULT_SLUG) -> str:
+    return f"{slug}_{as_of}_final.html"
+
+class Renderer:
+    """
+    批量渲染：架构图只解析/同步一次，热度序列只读一次（各 as_of 的 SVG 片段按日期缓存），
+    每份报告只做模板替换；render_many 把各日期分给进程池（每个 worker 收到一份 Renderer 副本）。
+    """
+    def __init__(self, root=None, outdir="report_out", heat="data/macro/trade_heat.npz", allow_na=False):
+        self.root = Path(root or os.getcwd())
+        self.outdir = self.root / outdir
+        self.outdir.mkdir(parents=True, exist_ok=True)
+        self.allow_na = allow_na
+        src = resolve_arch_asset(self.root, self.outdir)
+        self.arch = ARCH.substitute(src=src) if src else ""
+        self._heat = _read_heat(self.root / heat) if heat else None
+        self._trend = {}
+
+    def _load(self, x, default=None):
+        """dict 原样返回；路径则相对 root 读 JSON（事件文件缺失/损坏时返回 default）。"""
+        if x is None or isinstance(x, dict): return x if x is not None else default
+        p = self.root / x
+        if default is None: return jload(p)
+        try: return jload(p) if p.exists() else default
+        except Exception: return default
+
+    def trend(self, as_of):
+        if as_of not in self._trend:
+            heat = _heat_window(self._heat, as_of=as_of)
+            self._trend[as_of] = TREND.substitute(svg=heat_svg(heat)) if heat is not None else ""
+        return self._trend[as_of]
+
+    def render(self, metrics, events=None, as_of=None, title=DEFAULT_TITLE) -> str:
+        m = self._load(metrics)
+        miss = [k for k in REQUIRED if k not in m]
+        if miss and not self.allow_na:
+            raise ValueError(f"missing keys in metrics: {miss}")
+        ev = self._load(events, default={})
+        stance = m.get("stance","N/A")
+        as_of = as_of or datetime.date.today().isoformat()
+        return (HEAD.substitute(title=title, as_of=as_of, stance=stance)
+                + EXECUTIVE.substitute(ratecut=fmt_pct(safe_num(m.get("rate_cut_odds"))),
+                                       vixpct=fmt_num(safe_num(m.get("vix_pctile")),2),
+                                       corr_dx=fmt_num(safe_num(m.get("corr_spx_dxy"))),
+                                       corr_10=fmt_num(safe_num(m.get("corr_spx_10y"))),
+                                       l7=ev.get("last7","N/A"), p7=ev.get("prev7","N/A"),
+                                       dp=ev.get("delta_pct","N/A"), stance=stance)
+                + self.watch(m.get("watchlist")) + self.trend(as_of) + self.arch + "\n</body></html>")
+
+    def watch(self, rows):
+        """metrics 里带 watchlist（[{ticker, ret_20d, corr_spx}]）时加一张成分表；默认报告没有这一节。"""
+        if not rows: return ""
+        return WATCH.substitute(rows="\n".join(
+            WATCH_ROW.substitute(ticker=html.escape(str(r.get("ticker", ""))), ret=fmt_pct(safe_num(r.get("ret_20d"))),
+                                 corr=fmt_num(safe_num(r.get("corr_spx")))) for r in rows))
+
+    def write(self, metrics, events=None, as_of=None, title=DEFAULT_TITLE, slug=DEFAULT_SLUG) -> Path:
+        as_of = as_of or datetime.date.today().isoformat()
+        fout = self.outdir / report_name(as_of, slug)
+        with span("render.report", as_of=as_of):
+            atomic_write(fout, self.render(metrics, events, as_of, title))
+        return fout
+
+    def render_many(self, snapshots, workers=8) -> list:
+        """snapshots: 可迭代的 dict（metrics / events / as_of / title / slug，同 write 的参数）；workers<=1 时在本进程顺序写。"""
+        snapshots = list(snapshots)
+        workers = max(1, min(workers, len(snapshots)))
+        with span("render.batch", workers=workers) as sp:
+            if workers == 1:
+                out = [self.write(**s) for s in snapshots]
+            else:
+                # 模板替换 + 转义是纯 Python，线程受 GIL 限制；按日期分给进程池
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as ex:
+                    out = list(ex.map(_write_one, snapshots, chunksize=max(1, len(snapshots) // (workers * 4))))
+            sp["reports"] = len(out)
+            return out
+
+_WORKER = {}
+
+def _init_worker(renderer):
+    _WORKER["r"] = renderer
+
+def _write_one(snapshot):
+    return _WORKER["r"].write(**snapshot)
+
+def load_snapshots(path: Path):
+    """--batch 文件：JSON 数组或每行一个 JSON 对象。"""
+    text = path.read_text(encoding="utf-8").strip()
+    if text.startswith("["): return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--metrics", default="out/metrics.json")
+    ap.add_argument("--events",  default="data/macro/trade_conflict.json")
+    ap.add_argument("--heat",    default="data/macro/trade_heat.npz", help="daily trade heat series (optional)")
+    ap.add_argument("--outdir",  default="report_out")
+    ap.add_argument("--title",   default=DEFAULT_TITLE)
+    ap.add_argument("--allow-na", action="store_true")
+    ap.add_argument("--as-of",   help="report date YYYY-MM-DD (default: today)")
+    ap.add_argument("--batch",   help="JSON/JSONL list of snapshots {metrics, events, as_of, title, slug}; "
+                                      "metrics/events may be inline objects or paths")
+    ap.add_argument("--workers", type=int, default=8, help="parallel writers for --batch")
+    args = ap.parse_args(argv)
 
-    html = head + executive + arch + "\n</body></html>"
-    fout = OUTDIR / f"ai_chips_weekly_{as_of}_final.html"
-    fout.write_text(html, encoding="utf-8")
-    print(f"[render_v3] OK -> {fout}")
+    r = Renderer(os.getcwd(), args.outdir, args.heat, args.allow_na)
+    try:
+        if args.batch:
+            outs = r.render_many(load_snapshots(Path(args.batch)), args.workers)
+            print(f"[render_v3] OK -> {len(outs)} reports in {r.outdir}")
+        else:
+            fout = r.write(args.metrics, args.events, args.as_of, args.title)
+            print(f"[render_v3] OK -> {fout}")
+    except ValueError as e:
+        raise SystemExit(f"[render] {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# scripts/scheduler.py
+"""
+常驻调度模式：替代 cron 每次冷启动跑 run_weekly_min.sh。进程常驻，模块 / 配置 / 价格库 / HTTP 连接池都是热的，
+各数据源按自己的节奏刷新，每轮只把到期的抓取阶段交给 pipeline.run，其余抓取阶段沿用上次输出；
+下游（conflict / emit / render）照旧按输入哈希判断是否重算，conflict 本身按水位增量解析 events.csv。
+各源的增量状态留在内存里跨轮复用：vix 的分位窗口检查点（fetch_vix_pctile.HISTORY，每个新 bar O(log W)）、
+相关矩阵历史的索引（rolling_corr，只续算新行）、流水线的 key / 文件哈希（不每轮重读状态文件）。
+某一轮出错（含阶段 sys.exit）只记为失败，进程继续按节奏跑下一轮。
+out/metrics.json 由 emit 原子改写，每轮的 span / 计数写到 out/run_report.json。
+
+  python3 scripts/scheduler.py                      # 常驻，Ctrl-C / SIGTERM 退出
+  python3 scripts/scheduler.py --once               # 跑一轮到期任务就退出
+  python3 scripts/scheduler.py --simulate 24        # 本地演练：桩数据源 + 假时钟跑 24 个模拟小时（临时目录，不碰真实数据）
+节奏（秒）：SCHED_VIX（900） / SCHED_POLYMARKET（300） / SCHED_CORR（3600）；
+events.csv 变化按 SCHED_EVENTS_POLL（10）轮询 (mtime, size)（标准库没有 inotify，轮询足够便宜）。
+"""
+import os, sys, time, shutil, signal, argparse, tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from scripts import pipeline
+from macro import instrument
+
+EVENTS = "data/warehouse/events.csv"
+SOURCES = {"vix": ("stooq", "yfinance"), "corr": ("yfinance",), "polymarket": ("polymarket",)}  # 阶段 -> http_cache 来源
+
+@dataclass
+class Job:
+    name: str                   # pipeline 阶段名
+    every: float = None         # 刷新间隔（秒）；None 表示只由 watch 触发
+    watch: str = None           # 文件变化时触发
+    next_at: float = 0.0
+    stamp: tuple = None
+
+def _env_secs(key, default):
+    try: return float(os.getenv(key, default))
+    except ValueError: return float(default)
+
+def default_jobs():
+    return [Job("vix", every=_env_secs("SCHED_VIX", 900)),
+            Job("polymarket", every=_env_secs("SCHED_POLYMARKET", 300)),
+            Job("corr", every=_env_secs("SCHED_CORR", 3600)),
+            Job("conflict", every=_env_secs("SCHED_EVENTS_POLL", 10), watch=EVENTS)]
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+class FakeClock:
+    """假时钟：sleep 直接把时间往前拨，模拟一天只需几秒。"""
+    def __init__(self, start=0.0):
+        self.t = float(start)
+    def __call__(self):
+        return self.t
+    def sleep(self, sec):
+        self.t += max(0.0, sec)
+
+class Scheduler:
+    def __init__(self, jobs=None, stages=None, clock=time.monotonic, sleep=time.sleep, workers=4,
+                 report=None, on_tick=None):
+        self.jobs = jobs if jobs is not None else default_jobs()
+        self.stages = stages or pipeline.STAGES
+        self.clock, self.sleep, self.workers = clock, sleep, workers
+        self.report, self.on_tick = report, on_tick
+        self.history = []       # [(时刻, 到期任务, {阶段: 状态})]
+        self.state = None       # 流水线状态，首轮从磁盘读，之后留在内存
+        self.stopped = False
+        for j in self.jobs:
+            if j.watch: j.stamp = _stamp(j.watch)  # 启动时第一轮照常跑，之后只看变化
+
+    def due(self, now):
+        """到期的任务名；watch 任务到期只代表该检查了，文件没变就不算。"""
+        names = []
+        for j in self.jobs:
+            if now < j.next_at: continue
+            j.next_at = now + (j.every or 0)
+            if j.watch and self.history:
+                stamp = _stamp(j.watch)
+                if stamp == j.stamp: continue
+                j.stamp = stamp
+            names.append(j.name)
+        return names
+
+    def tick(self):
+        now = self.clock()
+        names = self.due(now)
+        if not names: return None
+        volatile = {s.name for s in self.stages if s.volatile}
+        if self.state is None: self.state = pipeline.load_state()
+        try:
+            with instrument.span("scheduler.tick", jobs=",".join(names)):
+                status, _ = pipeline.run(self.stages, workers=self.workers, hold=volatile - set(names),
+                                         deadline=pipeline.DEADLINE, state=self.state)
+        except (Exception, SystemExit) as e:  # 一轮出错不能让常驻进程退出；状态下轮从磁盘重读
+            print(f"[scheduler] t={now:.0f} tick failed: {e!r}", file=sys.stderr, flush=True)
+            status, self.state = {n: "failed" for n in names}, None
+        self.history.append((now, names, status))
+        ran = [n for n, st in status.items() if st not in ("skip",)]
+        print(f"[scheduler] t={now:.0f} due={','.join(names)} ran={','.join(ran) or '-'}", flush=True)
+        if self.report:
+            try: instrument.write_report(self.report, extra={"due": names, "stages": status})
+            except OSError as e: print(f"[scheduler] report failed: {e!r}", file=sys.stderr, flush=True)
+            instrument.reset()  # 常驻进程：每轮报告后清空，span 不无限累积
+        if self.on_tick: self.on_tick(now, names, status)
+        return status
+
+    def serve(self, until=None):
+        while not self.stopped and (until is None or self.clock() < until):
+            self.tick()
+            wake = min(j.next_at for j in self.jobs)
+            if until is not None: wake = min(wake, until)
+            self.sleep(max(0.0, wake - self.clock()))
+
+    def stop(self, *_):
+        self.stopped = True
+
+def simulate(hours, workers=4):
+    """桩数据源 + 假时钟，在临时目录里跑 hours 个模拟小时；中途追加 events.csv 验证文件触发。"""
+    from scripts import stub_sources
+    work = Path(tempfile.mkdtemp(prefix="macro-sched-"))
+    shutil.copytree(ROOT / "config", work / "config")
+    os.chdir(work)
+    srv, base = stub_sources.start()
+    os.environ.update(stub_sources.env_for(base))
+    os.environ.update({"STANCE": os.getenv("STANCE", "Cautious"),
+                       **{f"HTTP_CACHE_TTL_{src.upper()}": "0" for v in SOURCES.values() for src in v}})
+    Path("out").mkdir(); Path("report_out/report_assets").mkdir(parents=True)
+    ev = Path(EVENTS); ev.parent.mkdir(parents=True)
+    ev.write_text("publish_time,title,summary,source\n", encoding="utf-8")
+
+    clock = FakeClock()
+    bad = []
+    def check(now, names, status):
+        import json
+        json.loads(Path("out/metrics.json").read_text(encoding="utf-8"))  # 每轮都必须是完整 JSON
+        bad.extend(f"t={now:.0f} {n}={s}" for n, s in status.items() if s in ("failed", "blocked"))
+        if 3 * 3600 <= now < 3 * 3600 + 10:  # 模拟第 3 小时有新事件写入
+            with ev.open("a", encoding="utf-8") as f:
+                f.write("2025-10-09T10:00:00Z,Tariff escalation hits chip exports,export controls,wire\n")
+    sched = Scheduler(clock=clock, sleep=clock.sleep, workers=workers, report="out/run_report.json", on_tick=check)
+    t0 = time.perf_counter()
+    try:
+        sched.serve(until=hours * 3600)
+    finally:
+        srv.shutdown()
+    runs = {}
+    for _, _, status in sched.history:
+        for n, s in status.items():
+            if s == "ok": runs[n] = runs.get(n, 0) + 1
+    print(f"[scheduler] simulated {hours}h in {time.perf_counter() - t0:.1f}s: {len(sched.history)} ticks, "
+          f"stage runs {runs}, stub hits {srv.hits} (workdir {work})")
+    if bad:
+        print("[scheduler] failures:", *bad, sep="\n  - ")
+        return 1
+    return 0
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="resident scheduler: refresh sources on their own cadence")
+    ap.add_argument("--once", action="store_true", help="run one round of due jobs and exit")
+    ap.add_argument("--simulate", type=float, metavar="HOURS", help="offline dry run with stub sources and a fake clock")
+    ap.add_argument("--workers", type=int, default=4, help="max stages running at once")
+    ap.add_argument("--report", default="out/run_report.json", help="per-tick run report")
+    args = ap.parse_args(argv)
+    if args.simulate:
+        return simulate(args.simulate, args.workers)
+
+    os.chdir(ROOT)
+    os.environ.setdefault("STANCE", "Cautious")
+    Path("out").mkdir(exist_ok=True); Path("report_out/report_assets").mkdir(parents=True, exist_ok=True)
+    jobs = default_jobs()
+    # 响应缓存 TTL 不能比刷新间隔长，否则到期的刷新只会读到缓存
+    ttl = {}
+    for j in jobs:
+        for src in SOURCES.get(j.name, ()):
+            ttl[src] = min(ttl.get(src, j.every), j.every)
+    for src, sec in ttl.items():
+        os.environ.setdefault(f"HTTP_CACHE_TTL_{src.upper()}", str(max(sec - 1, 0)))
+    sched = Scheduler(jobs, workers=args.workers, report=args.report)
+    signal.signal(signal.SIGTERM, sched.stop)
+    if args.once:
+        sched.tick(); return 0
+    try:
+        sched.serve()
+    except KeyboardInterrupt:
+        pass
+    print("[scheduler] stopped")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# scripts/stub_sources.py
+"""
+本地桩服务：返回固定的 stooq VIX 日线 CSV 和 Polymarket markets JSON，离线跑抓取阶段用。
+  python3 scripts/stub_sources.py --port 8765     # 打印要 export 的环境变量后常驻
+路径：
+  /q/d/l/?s=%5Evix&i=d[&d1=YYYYMMDD]   stooq 日线 CSV
+  /markets?limit=N[&offset=K]           Polymarket JSON {"markets": [...]}，共 server.n_markets 个（可分页）；
+                                        server.max_limit 不为空时每页最多返回这么多条（模拟服务端截短页）
+任意路径加 delay=秒 / fail=1 可模拟慢源、坏源（测对冲）；响应带 ETag，支持 If-None-Match -> 304。
+"""
+import json, math, time, hashlib, argparse, threading, datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+def stooq_csv(days=400, end=datetime.date(2025, 10, 10), start=None):
+    rows, d, out = [], end, []
+    while len(rows) < days:
+        if d.weekday() < 5: rows.append(d)
+        d -= datetime.timedelta(days=1)
+    for i, d in enumerate(reversed(rows)):
+        if start and d < start: continue
+        c = round(18 + 6 * math.sin(i / 17.0) + 2 * math.sin(i / 3.1), 2)
+        out.append(f"{d:%Y-%m-%d},{c+0.4},{c+1.1},{c-0.9},{c},0")
+    return "Date,Open,High,Low,Close,Volume\n" + "\n".join(out) + "\n"
+
+def markets(n=50, offset=0, total=None):
+    qs = ["Fed rate cut at next meeting?", "Will the FOMC lower rates in December?",
+          "Fed decision in October: decrease 25 bps?", "Will BTC close above 100k?",
+          "Will it rain in London tomorrow?"]
+    end = offset + n if total is None else min(offset + n, total)
+    return [{"id": str(1000 + i), "question": qs[i % len(qs)],
+             "outcomes": [{"name": "Yes", "price": round(0.2 + 0.01 * (i % 30), 3)}]}
+            for i in range(offset, end)]
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *a):
+        pass
+
+    def _send(self, code, body: bytes, ctype):
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if code == 200 and self.headers.get("If-None-Match") == etag:
+            code, body = 304, b""  # 条件请求命中
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        if code in (200, 304): self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        u = urlparse(self.path); q = {k: v[-1] for k, v in parse_qs(u.query).items()}
+        self.server.hits[u.path] = self.server.hits.get(u.path, 0) + 1
+        if "delay" in q: time.sleep(float(q["delay"]))
+        if q.get("fail"): return self._send(503, b"unavailable", "text/plain")
+        if u.path.startswith("/q/d/l"):
+            start = datetime.datetime.strptime(q["d1"], "%Y%m%d").date() if "d1" in q else None
+            return self._send(200, stooq_csv(start=start).encode(), "text/csv")
+        if u.path.endswith("/markets"):
+            n = int(q.get("limit", 50))
+            if self.server.max_limit: n = min(n, self.server.max_limit)
+            items = markets(n, int(q.get("offset", 0)), self.server.n_markets)
+            body = json.dumps({"markets": items}).encode()
+            return self._send(200, body, "application/json")
+        self._send(404, b"not found", "text/plain")
+
+def start(port=0, host="127.0.0.1", n_markets=500, max_limit=None):
+    """后台线程启动，返回 (server, base_url)；用完 server.shutdown()。"""
+    srv = ThreadingHTTPServer((host, port), Handler)
+    srv.hits, srv.n_markets, srv.max_limit = {}, n_markets, max_limit
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://{host}:{srv.server_address[1]}"
+
+def env_for(base):
+    """让各抓取脚本指向桩服务的环境变量。"""
+    return {
+        "STOOQ_URL": f"{base}/q/d/l/?s=%5Evix&i=d",
+        "POLYMARKET_PRIMARY": f"{base}/delta/markets?limit=50",
+        "POLYMARKET_FALLBACK": f"{base}/api/markets?limit=50",
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="stub stooq / Polymarket server")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--markets", type=int, default=500, help="total markets served across pages")
+    ap.add_argument("--max-limit", type=int, default=None, help="cap the page size regardless of ?limit=")
+    args = ap.parse_args()
+    srv, base = start(args.port, n_markets=args.markets, max_limit=args.max_limit)
+    for k, v in env_for(base).items():
+        print(f"export {k}='{v}'")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# scripts/watchlists.py
+"""
+多板块模式：config/macro.yaml 的 watchlists 定义 N 个板块（slug / title / tickers / keywords），
+共享输入只取一次——宏观指标读 out/metrics.json，所有板块的 ticker 去重后同步一次价格库，
+events.csv 用全部关键词的并集扫描一遍（逐行记下各关键词命中的行号，--as-of 之后的事件不计）；
+之后各板块的打分、热度和渲染在进程池里并行，每个板块只做 bincount 和模板替换。
+  python3 scripts/watchlists.py [--only ai_chips,memory] [--workers 8] [--no-fetch] [--as-of YYYY-MM-DD]
+输出：out/watchlists/<slug>/{metrics.json, trade_conflict.json, trade_heat.npz}
+      report_out/watchlists/<slug>/<slug>_<as_of>_final.html
+keywords 缺省用 trade_keywords，title 缺省由 slug 生成。
+"""
+import os, re, sys, json, argparse, datetime
+from pathlib import Path
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from macro.core import config
+from macro.instrument import span
+from macro.artifacts import write_json
+
+OUT_DIR = Path("out/watchlists")
+REPORT_DIR = "report_out/watchlists"
+RET_DAYS = 20
+
+def load_watchlists(cfg_path="./config/macro.yaml"):
+    """[{slug, title, tickers, keywords}]；slug 只保留字母数字和 _-，重复的 slug 报错。"""
+    cfg = config(cfg_path)
+    default_kw = cfg.get("trade_keywords") or []
+    out, seen = [], set()
+    for i, w in enumerate(cfg.get("watchlists") or []):
+        slug = re.sub(r"[^0-9A-Za-z_-]+", "_", str(w.get("slug") or w.get("name") or f"watchlist_{i}")).strip("_")
+        if slug in seen: raise ValueError(f"duplicate watchlist slug: {slug}")
+        seen.add(slug)
+        out.append({"slug": slug,
+                    "title": w.get("title") or f"LumiereX Weekly — {slug.replace('_', ' ').title()} / Macro Snapshot",
+                    "tickers": [str(t) for t in (w.get("tickers") or [])],
+                    "keywords": [str(k) for k in (w.get("keywords") or default_kw)]})
+    return out
+
+# ---- 共享输入（主进程里只做一次）
+def scan_events(events_csv, keywords, as_of=None):
+    """
+    用全部板块关键词的并集扫描 events.csv 一遍（as_of 之后的事件丢弃，与报告日期对齐）。返回 dict：
+      codes（每行的日期编号）/ days / kw_rows（关键词 -> 行号）/ src（每行来源，无该列为 None）/
+      note（一行都没有时的说明，否则 None）；文件缺失返回 None。
+    """
+    import numpy as np, pandas as pd
+    from macro.keyword_match import KeywordMatcher
+    from macro import compute_conflict_score as ccs
+    if not os.path.exists(events_csv): return None
+    matcher = KeywordMatcher(keywords)
+    header, head_len = ccs._read_header(events_csv)
+    size = os.path.getsize(events_csv)
+    end = ccs._complete_end(events_csv, size)
+    cut = None if as_of is None else np.datetime64(str(as_of)[:10])
+    day, src, rows, base, seen = [], [], {k: [] for k in matcher.keywords}, 0, 0
+    with span("parse.events_shared", keywords=len(matcher.keywords)) as sp:
+        chunks = ccs.iter_event_chunks(events_csv, head_len, end, header) if end > head_len else iter(())
+        if size > max(end, head_len):  # 末尾没有换行的最后一行也算（同 compute_conflict_score）
+            chunks = chain(chunks, [ccs.tail_frame(events_csv, max(end, head_len), size, header)])
+        for chunk in chunks:
+            d, _, kw_rows, s = ccs.scan_chunk(chunk, matcher)
+            seen += len(d)
+            if cut is not None:
+                keep = d <= cut
+                if not keep.all():
+                    pos = np.cumsum(keep) - 1  # 过滤后的行号
+                    kw_rows = {k: pos[r[keep[r]]] for k, r in kw_rows.items()}
+                    d, s = d[keep], (None if s is None else s[keep])
+            day.append(d); src.append(s)
+            for k, r in kw_rows.items():
+                if len(r): rows[k].append(r + base)
+            base += len(d)
+        sp["rows"] = base
+    if not base:
+        # 文件在但没有行（或全在 as_of 之后）：空结果，不是“文件缺失”
+        return {"codes": np.empty(0, dtype=np.int64), "days": pd.DatetimeIndex([], name="date"),
+                "kw_rows": {}, "src": None,
+                "note": f"no events on or before {as_of}" if seen else "empty events.csv"}
+    codes, days = pd.factorize(np.concatenate(day), sort=True)
+    return {"codes": codes, "days": pd.DatetimeIndex(days, name="date"),
+            "kw_rows": {k: np.concatenate(r) if r else np.empty(0, dtype=np.int64) for k, r in rows.items()},
+            "src": None if src[0] is None else np.concatenate(src), "note": None}
+
+def sync_prices(tickers, workers=8):
+    """所有板块的 ticker 去重后并发同步进价格库（同 calc_corr_from_prices.sync_ticker）。"""
+    from macro.calc_corr_from_prices import sync_ticker
+    with span("fetch.watchlist_prices", tickers=len(tickers)), \
+         ThreadPoolExecutor(max_workers=max(1, min(workers, len(tickers) or 1))) as ex:
+        list(ex.map(sync_ticker, tickers))
+
+def load_prices(tickers, spx):
+    """(价格宽表, 对数收益宽表)：按 macro.returns 的对齐策略以 SPX 为基准对齐，收益只算一次供所有板块共用。"""
+    from macro.price_store import PriceStore
+    from macro.returns import align_prices, log_returns
+    store = PriceStore()
+    px = align_prices({t: store.read(t) for t in tickers}, base=spx)
+    return px, log_returns(px)
+
+# ---- 单个板块（进程池 worker 里执行）
+_SHARED = {}
+
+def _init(shared):
+    _SHARED.update(shared)
+
+def ticker_rows(px, rets, tickers, spx, as_of, win):
+    """各成分的 20 日收益与近 win 日对数收益对 SPX 的相关；价格缺失的给 None。"""
+    rows = []
+    if px is None or px.empty: px = rets = None
+    else: px, rets = px.loc[:as_of], rets.loc[:as_of]
+    for t in tickers:
+        ret = corr = None
+        if px is not None and t in px.columns:
+            s = px[t].dropna()
+            if len(s) > RET_DAYS: ret = float(s.iloc[-1] / s.iloc[-RET_DAYS - 1] - 1)
+            if spx in rets.columns and t != spx:
+                r = rets[[t, spx]].dropna().tail(win)
+                if len(r) >= win: corr = round(float(r[t].corr(r[spx])), 4)
+        rows.append({"ticker": t, "ret_20d": ret, "corr_spx": corr})
+    return rows
+
+def score_watchlist(ev, keywords, windows):
+    """共享扫描结果 -> 该板块的 (trade_conflict 结果, 热度表)；与单板块 compute_conflict_score 的口径一致。"""
+    import numpy as np
+    from macro.keyword_match import KeywordMatcher
+    from macro import compute_conflict_score as ccs
+    if ev is None:
+        return {"last7": 0, "prev7": 0, "delta_pct": None, "note": "events.csv not found"}, None
+    if ev["note"]:
+        return {"last7": 0, "prev7": 0, "delta_pct": None, "note": ev["note"]}, None
+    kws = KeywordMatcher(keywords).keywords
+    hit = np.zeros(len(ev["codes"]), dtype=bool)
+    kw_rows = {k: ev["kw_rows"].get(k, np.empty(0, dtype=np.int64)) for k in kws}
+    for r in kw_rows.values(): hit[r] = True
+    daily = ccs.daily_counts(ev["codes"], ev["days"], hit, kw_rows, ev["src"])
+    res = ccs.score_daily(daily)
+    heat = ccs.heat_series(daily, windows)
+    res["heat"] = ccs.heat_summary(heat, windows)
+    return res, heat
+
+def run_watchlist(wl):
+    from macro.columnar import write_frame
+    from scripts.render_summary_v3 import Renderer
+    sh = _SHARED
+    with span("compute.watchlist", slug=wl["slug"]):
+        res, heat = score_watchlist(sh["events"], wl["keywords"], sh["windows"])
+        metrics = dict(sh["metrics"], watchlist=ticker_rows(sh["prices"], sh["returns"], wl["tickers"], sh["spx"], sh["as_of"], sh["win"]))
+        d = Path(sh["root"]) / OUT_DIR / wl["slug"]
+        write_json(d / "metrics.json", metrics)
+        write_json(d / "trade_conflict.json", res)
+        if heat is not None: write_frame(heat, d / "trade_heat.npz")
+    with span("render.watchlist", slug=wl["slug"]):
+        r = Renderer(sh["root"], f"{REPORT_DIR}/{wl['slug']}",
+                     heat=(d / "trade_heat.npz") if heat is not None else None, allow_na=True)
+        out = r.write(metrics, res, sh["as_of"], wl["title"], f"{wl['slug']}_weekly")
+    return wl["slug"], str(out), res.get("last7"), res.get("delta_pct")
+
+def run_all(watchlists, shared, workers):
+    """workers<=1 时在本进程里顺序跑（便于调试 / profile）。"""
+    if workers <= 1 or len(watchlists) <= 1:
+        _init(shared)
+        return [run_watchlist(w) for w in watchlists]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=(shared,)) as ex:
+        return list(ex.map(run_watchlist, watchlists, chunksize=max(1, len(watchlists) // (workers * 4))))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="score and render every watchlist in config/macro.yaml")
+    ap.add_argument("--config", default="./config/macro.yaml")
+    ap.add_argument("--only", help="comma separated watchlist slugs")
+    ap.add_argument("--events", default="./data/warehouse/events.csv")
+    ap.add_argument("--metrics", default="out/metrics.json", help="shared macro metrics (emit_metrics_adapter output)")
+    ap.add_argument("--as-of", help="report date YYYY-MM-DD (default: today)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="process pool size")
+    ap.add_argument("--no-fetch", action="store_true", help="use prices already in the store")
+    args = ap.parse_args(argv)
+
+    wls = load_watchlists(args.config)
+    if args.only:
+        want = [s.strip() for s in args.only.split(",") if s.strip()]
+        unknown = sorted(set(want) - {w["slug"] for w in wls})
+        if unknown: raise SystemExit(f"[watchlists] unknown watchlist(s): {unknown}")
+        wls = [w for w in wls if w["slug"] in want]
+    if not wls:
+        raise SystemExit(f"[watchlists] no watchlists defined in {args.config}")
+
+    as_of = args.as_of or datetime.date.today().isoformat()
+    try: datetime.date.fromisoformat(as_of)
+    except ValueError: raise SystemExit(f"[watchlists] --as-of must be YYYY-MM-DD, got {as_of!r}")
+
+    from macro import compute_conflict_score as ccs
+    from macro.calc_corr_from_prices import load_tickers, WIN
+    spx = load_tickers(args.config).get("SPX", "^GSPC")
+    tickers = sorted({t for w in wls for t in w["tickers"]} | {spx})
+    if not args.no_fetch: sync_prices(tickers)
+    try: metrics = json.loads(Path(args.metrics).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError): metrics = {}
+    px, rets = load_prices(tickers, spx)
+    shared = {"root": os.getcwd(), "as_of": as_of,
+              "metrics": metrics, "spx": spx, "win": WIN, "windows": ccs.load_heat_windows(args.config),
+              "prices": px, "returns": rets,
+              "events": scan_events(args.events, [k for w in wls for k in w["keywords"]], as_of)}
+    with span("render.watchlists", n=len(wls)):
+        results = run_all(wls, shared, args.workers)
+    for slug, out, l7, dp in results:
+        print(f"[watchlists] {slug:<20} last7={l7} Δ%={dp} -> {out}")
+    print(f"[watchlists] {len(results)} reports -> {REPORT_DIR}/")
+
+if __name__ == "__main__":
+    main()
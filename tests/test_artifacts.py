@@ -0,0 +1,24 @@
+# tests/test_artifacts.py
+from macro.artifacts import ArtifactStore
+
+def _files(store, name):
+    return sorted(p.name for p in (store.root / name).glob("*.json"))
+
+def test_prune_keeps_distinct_versions_and_compacts_log(tmp_path):
+    store = ArtifactStore(tmp_path)
+    # A B A B A C：日志 6 条，只有 3 个不同版本
+    vs = [store.put_json("m", {"v": v}) for v in "ABABAC"]
+    a, b, c = (f"{v}.json" for v in (vs[0], vs[1], vs[5]))
+    assert len(store.versions("m")) == 6
+    (store.root / "m" / ".x.json.1.2.tmp").write_text("{}", encoding="utf-8")  # 正在写的临时文件
+    assert store.prune("m", keep=2) == 1
+    assert _files(store, "m") == sorted([a, c])  # 最近两个不同版本是 A 和 C，不是 A A
+    assert [r["version"] for r in store.versions("m")] == [a, c]
+    assert (store.root / "m" / ".x.json.1.2.tmp").exists()
+    assert store.prune("m", keep=2) == 0 and len(store.versions("m")) == 2
+
+    store.put_json("m", {"v": "B"})  # 已删的版本重新出现：重写文件，日志接着追加
+    assert store.read_json("m") == {"v": "B"}
+    assert [r["version"] for r in store.versions("m")] == [a, c, b]
+    assert store.prune_all(keep=0) == 2  # keep=0 也保留 LATEST
+    assert _files(store, "m") == [b] and [r["version"] for r in store.versions("m")] == [b]
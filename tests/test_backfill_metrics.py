@@ -0,0 +1,59 @@
+# tests/test_backfill_metrics.py
+import os
+
+import pandas as pd
+
+from scripts.backfill_metrics import trade_history, build_history
+
+def _daily(path, days, hits):
+    pd.DataFrame({"date": days, "n": [h + 3 for h in hits], "hits": hits}).to_csv(path, index=False)
+
+def test_trade_history_quiet_tail_decays(tmp_path):
+    daily = tmp_path / "trade_daily.csv"
+    _daily(daily, ["2025-09-10", "2025-09-15", "2025-09-20"], [5, 4, 3])
+    th = trade_history(daily, "2025-09-01", "2025-10-10")
+    assert th.loc["2025-09-20", "trade_last7"] == 7       # 09-15 + 09-20
+    assert th.loc["2025-09-26", "trade_last7"] == 3       # 只剩 09-20
+    assert th.loc["2025-09-27", "trade_last7"] == 0
+    assert th.loc["2025-10-10", "trade_last7"] == 0
+    assert th.loc["2025-10-10", "trade_prev7"] == 0
+    assert th.index.max() == pd.Timestamp("2025-10-10")
+
+def test_build_history_does_not_freeze_after_last_event(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("scripts.backfill_metrics.corr_history", lambda window: {})
+    monkeypatch.setattr("scripts.backfill_metrics.vix_history", lambda window: None)
+    daily = tmp_path / "trade_daily.csv"
+    _daily(daily, pd.date_range("2025-09-01", "2025-09-20").strftime("%Y-%m-%d"), [8] * 20)
+    hist = build_history("2025-09-15", "2025-10-10", 90, 252, daily, tmp_path / "missing.csv")
+    tail = hist.loc["2025-09-22":, "trade_last7"]
+    assert tail.is_monotonic_decreasing
+    assert tail.iloc[-1] == 0
+    assert hist.loc["2025-09-19", "trade_last7"] == 56
+
+def _no_prices(monkeypatch):
+    monkeypatch.setattr("scripts.backfill_metrics.corr_history", lambda window: {})
+    monkeypatch.setattr("scripts.backfill_metrics.vix_history", lambda window: None)
+
+def test_rate_cut_without_timestamps_is_not_copied_into_the_past(tmp_path, monkeypatch):
+    _no_prices(monkeypatch)
+    monkeypatch.delenv("RATE_CUT_ODDS", raising=False)
+    pm = tmp_path / "polymarket_live.csv"
+    pm.write_text("prob\n0.4\n0.62\n", encoding="utf-8")
+    seen = pd.Timestamp("2025-10-08 15:00").timestamp()
+    os.utime(pm, (seen, seen))  # 只有最新值：观测日取文件修改日
+    hist = build_history("2025-10-01", "2025-10-10", 90, 252, tmp_path / "none.csv", pm)
+    assert hist.loc[:"2025-10-07", "rate_cut_odds"].isna().all()
+    assert (hist.loc["2025-10-08":, "rate_cut_odds"] == 0.62).all()
+
+def test_rate_cut_env_override_applies_to_series_too(tmp_path, monkeypatch):
+    _no_prices(monkeypatch)
+    pm = tmp_path / "polymarket_live.csv"
+    pm.write_text("ts,prob\n2025-10-02T12:00:00Z,0.3\n2025-10-06T12:00:00Z,0.5\n", encoding="utf-8")
+    monkeypatch.delenv("RATE_CUT_ODDS", raising=False)
+    hist = build_history("2025-10-01", "2025-10-10", 90, 252, tmp_path / "none.csv", pm)
+    assert pd.isna(hist.loc["2025-10-01", "rate_cut_odds"])
+    assert hist.loc["2025-10-03", "rate_cut_odds"] == 0.3 and hist.loc["2025-10-06", "rate_cut_odds"] == 0.5
+    monkeypatch.setenv("RATE_CUT_ODDS", "0.9")
+    hist = build_history("2025-10-01", "2025-10-10", 90, 252, tmp_path / "none.csv", pm)
+    assert (hist["rate_cut_odds"] == 0.9).all()
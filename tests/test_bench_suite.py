@@ -0,0 +1,56 @@
+# tests/test_bench_suite.py
+import json
+
+import pytest
+
+from bench import suite
+
+@pytest.fixture
+def bench(tmp_path, monkeypatch):
+    """不起子进程：run_case 返回给定的结果，commit 可切换，结果写到临时目录。"""
+    state = {"commit": "aaaa", "results": {}}
+    monkeypatch.setattr(suite, "RESULTS", tmp_path / "results.jsonl")
+    monkeypatch.setattr(suite, "_git", lambda *a: state["commit"] if a[0] == "rev-parse" else "")
+    monkeypatch.setattr(suite, "run_case", lambda name, size, params, repeat, mem: dict(state["results"][name]))
+    def run(commit, results, *argv):
+        state.update(commit=commit, results=results)
+        return suite.main(["-k", ",".join(results), *argv])
+    return run
+
+def _r(median, peak=10.0):
+    return {"median": median, "min": median, "setup": 0.0, "peak_mb": peak, "rss_mb": 50.0}
+
+def test_regression_is_flagged_against_another_commit(bench, capsys):
+    assert bench("aaaa", {"vix.pctile": _r(1.0), "keyword.scan": _r(1.0)}) == 0
+    # 同一 commit 重跑不和自己比
+    assert bench("aaaa", {"vix.pctile": _r(5.0)}, "--fail-on-regression") == 0
+    capsys.readouterr()
+    rc = bench("bbbb", {"vix.pctile": _r(1.1), "keyword.scan": _r(1.0, peak=20.0)}, "--fail-on-regression")
+    out = capsys.readouterr().out
+    assert rc == 1
+    lines = {l.split()[0]: l for l in out.splitlines() if l.startswith(("vix.", "keyword."))}
+    assert "-78% time vs aaaa" in lines["vix.pctile"]  # 基线是 aaaa 最近一次（5.0）
+    assert "REGRESSION" not in lines["vix.pctile"]
+    assert "+100% mem" in lines["keyword.scan"] and "REGRESSION" in lines["keyword.scan"]
+    assert "1 case(s) regressed or failed: keyword.scan" in out
+
+def test_explicit_baseline_and_params(bench, capsys):
+    bench("aaaa", {"vix.pctile": _r(1.0)})
+    bench("bbbb", {"vix.pctile": _r(2.0)})
+    capsys.readouterr()
+    assert bench("cccc", {"vix.pctile": _r(2.1)}, "--baseline", "aaaa", "--threshold", "0.5", "--no-save") == 0
+    assert "+110% time vs aaaa" in capsys.readouterr().out  # 不加 --fail-on-regression 只提示
+    bench("cccc", {"vix.pctile": _r(2.1)}, "--days", "300")  # 换了规模参数：没有可比的基线
+    assert capsys.readouterr().out.rstrip().endswith("-")
+    recs = [json.loads(l) for l in suite.RESULTS.read_text(encoding="utf-8").splitlines()]
+    assert [r["commit"] for r in recs] == ["aaaa", "bbbb", "cccc"]
+    assert recs[-1]["params"]["days"] == 300
+
+def test_failed_case_counts_as_regression(bench, capsys):
+    assert bench("aaaa", {"vix.pctile": {"error": "boom"}}, "--fail-on-regression") == 1
+    assert "FAILED: boom" in capsys.readouterr().out
+
+def test_compare():
+    assert suite.compare(_r(1.0), None, 0.2) == ("-", False)
+    note, bad = suite.compare(_r(1.0, peak=None), dict(_r(0.5), commit="0123456789"), 0.2)
+    assert bad and note.startswith("+100% time vs 01234567") and "mem" not in note
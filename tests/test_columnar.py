@@ -0,0 +1,44 @@
+# tests/test_columnar.py
+import io
+
+import numpy as np
+import pandas as pd
+
+from macro import compute_conflict_score as ccs
+from macro.columnar import write_frame, read_frame, encode_frame, frame_digest
+
+def _frame():
+    idx = pd.date_range("2025-01-01", periods=6, freq="D", name="date")
+    return pd.DataFrame({"n": np.arange(6, dtype="int64"), "heat_7": [np.nan, 1.5, 2.0, np.nan, 3.25, 4.0],
+                         "flag": [True, False, True, True, False, False],
+                         "seen": pd.date_range("2025-01-01 09:30", periods=6, freq="h", tz="America/New_York"),
+                         "kw:关税": [0, 1, 0, 2, 0, 1]}, index=idx)
+
+def test_round_trip_matches_csv(tmp_path):
+    df = _frame()
+    p = tmp_path / "heat.npz"
+    write_frame(df, p)
+    got = read_frame(p)
+    buf = io.StringIO(); df.to_csv(buf)
+    csv = pd.read_csv(io.StringIO(buf.getvalue()), index_col="date", parse_dates=["date"])
+    csv["seen"] = pd.to_datetime(csv["seen"], utc=True).dt.tz_convert(None).astype("M8[ns]")  # npz 存 UTC 无时区
+    csv.index = csv.index.astype("M8[ns]")
+    pd.testing.assert_frame_equal(got, csv, check_freq=False)
+    assert got.index.name == "date" and got["n"].dtype == "int64" and got["flag"].dtype == bool
+    assert list(read_frame(p, ["heat_7", "missing", "n"]).columns) == ["heat_7", "n"]
+    assert frame_digest(df) == frame_digest(df.copy())
+    assert encode_frame(df) and frame_digest(df) != frame_digest(df.assign(n=df["n"] + 1))
+
+def test_heat_store_matches_daily_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cfg = tmp_path / "macro.yaml"
+    cfg.write_text("trade_keywords:\n  - tariff\ntrade_heat_windows: [3, 7]\n", encoding="utf-8")
+    ev = tmp_path / "events.csv"
+    rows = [f"2025-09-{1 + (i * 7) % 20:02d}T10:00:00Z,{'Tariff news' if i % 3 else 'Other'} {i},s,src{i % 2}\n"
+            for i in range(200)]
+    ev.write_text("publish_time,title,summary,source\n" + "".join(rows), encoding="utf-8")
+    ccs.score_from_events(str(ev), str(cfg), rebuild=True)
+    heat = read_frame(ccs.HEAT_OUT)
+    daily = pd.read_csv(ccs.DAILY_CSV, index_col="date", parse_dates=["date"])
+    daily.index = daily.index.astype("M8[ns]")
+    pd.testing.assert_frame_equal(heat, ccs.heat_series(daily, [3, 7]), check_freq=False)
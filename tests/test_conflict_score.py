@@ -0,0 +1,69 @@
+# tests/test_conflict_score.py
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from macro import compute_conflict_score as ccs
+from macro.columnar import read_frame
+
+HEADER = "publish_time,title,summary,source\n"
+
+def _rows(start, n):
+    out = []
+    for i in range(start, start + n):
+        title = "Tariff hike on chips" if i % 3 == 0 else ("Export control update" if i % 5 == 0 else "Quiet market")
+        out.append(f"2025-09-{1 + i % 28:02d}T{i % 24:02d}:00:00Z,{title} {i},summary {i},src{i % 4}\n")
+    return out
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cfg = tmp_path / "macro.yaml"
+    cfg.write_text("trade_keywords:\n  - tariff\n  - export control\ntrade_heat_windows: [7, 14]\n", encoding="utf-8")
+    ev = tmp_path / "events.csv"
+    def score(rebuild=False):
+        ccs.score_from_events(str(ev), str(cfg), rebuild=rebuild)
+        res = json.loads((tmp_path / ccs.OUT_JSON).read_text(encoding="utf-8"))
+        return res, read_frame(tmp_path / ccs.HEAT_OUT)
+    return ev, score
+
+def _same(a, b):
+    assert a[0] == b[0]
+    assert a[1].equals(b[1])
+
+def test_incremental_matches_rebuild_without_trailing_newline(env):
+    ev, score = env
+    rows = _rows(0, 300)
+    ev.write_text(HEADER + "".join(rows[:100]), encoding="utf-8")
+    score()
+    # 追加一批，最后一行没有换行
+    with ev.open("a", encoding="utf-8") as f: f.write("".join(rows[100:200]).rstrip("\n"))
+    inc = score()
+    full = score(rebuild=True)
+    _same(inc, full)
+    assert json.loads(open(ccs.STATE_JSON, encoding="utf-8").read())["rows"] == 199  # 未结束的行不进水位
+    assert full[1]["n"].sum() == 200
+
+    # 写入方补完上一行并继续追加（含一行写到一半）
+    half = rows[250]
+    with ev.open("a", encoding="utf-8") as f: f.write("\n" + "".join(rows[200:250]) + half[:20])
+    score()
+    with ev.open("a", encoding="utf-8") as f: f.write(half[20:] + "".join(rows[251:]))
+    inc = score()
+    _same(inc, score(rebuild=True))
+    assert inc[1]["n"].sum() == 300
+
+def test_heat_series_fills_gaps_and_rolls_windows():
+    days = pd.DatetimeIndex(["2025-09-01", "2025-09-02", "2025-09-05"], name="date")
+    daily = pd.DataFrame({"n": [4, 2, 3], "hits": [2, 1, 3], "kw:tariff": [2, 0, 3], "src:a": [1, 1, 3]}, index=days)
+    heat = ccs.heat_series(daily, [2, 4])
+    assert list(heat.columns) == ["n", "hits", "heat_2", "heat_4", "kw:tariff", "src:a"]
+    assert list(heat.index.strftime("%d")) == ["01", "02", "03", "04", "05"]  # 无事件的日子补 0
+    assert heat["hits"].tolist() == [2, 1, 0, 0, 3]
+    assert heat["kw:tariff"].tolist() == [2, 0, 0, 0, 3]
+    np.testing.assert_array_equal(heat["heat_2"], [np.nan, 3, 1, 0, 3])  # 窗口未满为 NaN
+    np.testing.assert_array_equal(heat["heat_4"], [np.nan, np.nan, np.nan, 3, 4])
+    assert ccs.heat_summary(heat, [2, 4]) == {"2": 3, "4": 4}
+    assert ccs.heat_summary(heat.iloc[:2], [2, 4]) == {"2": 3, "4": None}
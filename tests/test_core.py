@@ -0,0 +1,62 @@
+# tests/test_core.py
+import os
+import sys
+
+import pytest
+
+from macro import core
+
+@pytest.fixture
+def stubmod(tmp_path, monkeypatch):
+    (tmp_path / "lazy_stub_mod.py").write_text("LOADS = [1]\ndef twice(x):\n    return 2 * x\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    sys.modules.pop("lazy_stub_mod", None)
+    yield "lazy_stub_mod"
+    sys.modules.pop("lazy_stub_mod", None)
+
+def test_lazy_imports_on_first_attribute(stubmod):
+    m = core.lazy(stubmod)
+    assert stubmod not in sys.modules  # 建代理不导入
+    with pytest.raises(AttributeError):
+        m.__wrapped__  # 内省类 dunder 不触发导入
+    assert stubmod not in sys.modules
+    assert m.twice(21) == 42
+    real = sys.modules[stubmod]
+    assert m.LOADS is real.LOADS and "twice" in vars(m)  # 之后直接命中，不再走 __getattr__
+    assert core.lazy(stubmod) is real  # 已导入完成时直接返回模块
+    with pytest.raises(AttributeError):
+        m.missing
+
+def test_lazy_missing_module_fails_on_use():
+    m = core.lazy("no_such_module_for_lazy_test")
+    with pytest.raises(ModuleNotFoundError):
+        m.anything
+
+def test_config_is_cached_until_the_file_changes(tmp_path, monkeypatch):
+    calls = []
+    parse = core._parse_yaml
+    monkeypatch.setattr(core, "_parse_yaml", lambda p: calls.append(p) or parse(p))
+    cfg = tmp_path / "macro.yaml"
+    cfg.write_text("a: 1\n", encoding="utf-8")
+    assert core.config(str(cfg)) == {"a": 1}
+    assert core.config(str(cfg)) is core.config(str(cfg))
+    assert len(calls) == 1
+    st = os.stat(cfg)
+    cfg.write_text("a: 2\n", encoding="utf-8")  # 同样大小：靠 mtime 失效
+    os.utime(cfg, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert core.config(str(cfg)) == {"a": 2}
+    assert len(calls) == 2
+    cfg.write_text("", encoding="utf-8")
+    assert core.config(str(cfg)) == {}
+    assert core.config(str(tmp_path / "missing.yaml")) == {}
+
+def test_cached_is_keyed_by_path_and_parser(tmp_path):
+    p = tmp_path / "x.txt"
+    p.write_text("abc", encoding="utf-8")
+    upper = lambda path: open(path, encoding="utf-8").read().upper()
+    size = lambda path: os.path.getsize(path)
+    assert core.cached(p, upper) == "ABC" and core.cached(str(p), size) == 3
+    p.write_text("abcd", encoding="utf-8")  # 大小变了
+    assert core.cached(p, upper) == "ABCD"
+    with pytest.raises(FileNotFoundError):
+        core.cached(tmp_path / "missing", upper)
@@ -0,0 +1,42 @@
+# tests/test_emit_metrics.py
+import statistics
+
+import pandas as pd
+import pytest
+
+from scripts import emit_metrics_adapter as em
+
+ROWS = [("2024-01-01", "0.1", "live"), ("2024-01-02", "", "live"), ("2024-01-03", "0.3", "live"),
+        ("2024-01-04", "0.9", "fallback:default"), ("2024-01-05", "n/a", "live"), ("2024-01-06", "0.6", "live")]
+
+@pytest.fixture
+def csv_path(tmp_path):
+    p = tmp_path / "odds.csv"
+    p.write_text("date,prob,source\n" + "".join(",".join(r) + "\n" for r in ROWS), encoding="utf-8")
+    return p
+
+def test_tail_rows_reads_from_end(csv_path):
+    assert em.tail_rows(csv_path, "prob", 2) == ["n/a", "0.6"]
+    assert em.tail_rows(csv_path, "prob", 2, as_of="2024-01-04") == ["0.3", "0.9"]
+    assert em.tail_rows(csv_path, "prob", 3, observed_only=True) == ["0.3", "n/a", "0.6"]
+    assert em.tail_rows(csv_path, "prob", 3, observed_only=True, numeric=True) == ["0.1", "0.3", "0.6"]
+    assert em.tail_rows(csv_path, "missing", 3) == []
+    # 最后一行没有换行符、以及跨多个读块的情况
+    p = csv_path.with_name("big.csv")
+    p.write_text("date,v\n" + "\n".join(f"d{i},{i}" for i in range(5000)), encoding="utf-8")
+    assert em.tail_rows(p, "v", 3) == ["4997", "4998", "4999"]
+
+def test_last_n_skips_empties_before_taking_the_tail(csv_path):
+    # 最后 2 个非空观测是 0.3 和 0.6：空串、n/a 和兜底行都不占名额
+    assert em.load_from_csv(csv_path, "prob", "lastN", n=2) == pytest.approx(0.45)
+    assert em.load_from_csv(csv_path, "prob", "lastN", n=10) == pytest.approx(1.0 / 3)
+    assert em.load_from_csv(csv_path, "prob", "last") == "0.6"
+
+def test_stream_agg_matches_pandas(csv_path):
+    obs = [0.1, 0.3, 0.6]
+    assert em.stream_agg(csv_path, "prob", "mean") == pytest.approx(statistics.mean(obs))
+    assert em.stream_agg(csv_path, "prob", "median") == pytest.approx(0.3)
+    ref = pd.Series(obs).ewm(span=5, adjust=False).mean().iloc[-1]
+    assert em.stream_agg(csv_path, "prob", "ewm", span=5) == pytest.approx(ref)
+    assert em.stream_agg(csv_path, "prob", "mean", as_of="2024-01-02") == pytest.approx(0.1)
+    assert em.stream_agg(csv_path, "missing", "mean") is None
@@ -0,0 +1,57 @@
+# tests/test_http_cache.py
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from macro import http_cache
+from macro.http_cache import HttpCache, cached_frame
+
+def _frame(tz, days):
+    d = pd.DatetimeIndex(pd.to_datetime(days)).tz_localize(tz)
+    return pd.DataFrame({"date": d, "close": [100.0 + i for i in range(len(d))]})
+
+@pytest.mark.parametrize("tz, days", [
+    ("Asia/Seoul", ["2025-10-09", "2025-10-10"]),
+    ("America/New_York", ["2025-03-07", "2025-03-10", "2025-11-03"]),  # 夏令时前后偏移不同
+    (None, ["2025-10-09", "2025-10-10"]),
+])
+def test_cached_frame_keeps_exchange_local_dates(tmp_path, monkeypatch, tz, days):
+    monkeypatch.setattr(http_cache, "CACHE", HttpCache(tmp_path, enabled=True))
+    calls = []
+    def pull():
+        calls.append(1)
+        return _frame(tz, days)
+    for _ in range(2):  # 未命中（写缓存）与命中（读缓存）结果一致
+        df = cached_frame(f"yf:test:{tz}", "yfinance", pull, ttl=3600)
+        assert list(df["date"].dt.strftime("%Y-%m-%d")) == days
+        assert df["date"].dt.tz is None
+    assert len(calls) == 1
+
+def test_concurrent_stores_of_one_key_do_not_collide(tmp_path):
+    cache = HttpCache(tmp_path, enabled=True)
+    bodies = [bytes([i]) * (1000 + i) for i in range(16)]
+    def put(i):
+        for _ in range(20):
+            cache._store("k", bodies[i], {"url": "k", "source": "t", "fetched_at": 0, "last_access": 0,
+                                          "size": len(bodies[i])})
+    with ThreadPoolExecutor(8) as ex:
+        list(ex.map(put, range(16)))  # 共用一个临时文件名时 os.replace 会 FileNotFoundError
+    assert cache._paths("k")[0].read_bytes() in bodies
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(p.name for p in cache._paths("k"))
+
+def test_eviction_keeps_a_running_total(tmp_path, monkeypatch):
+    cache = HttpCache(tmp_path, max_bytes=10_000, enabled=True)
+    scans = []
+    evict = cache._evict
+    monkeypatch.setattr(cache, "_evict", lambda: scans.append(1) or evict())
+    def put(key, size, at):
+        cache._store(key, b"x" * size, {"url": key, "source": "t", "fetched_at": at, "last_access": at, "size": size})
+    for i in range(9):
+        put(f"k{i}", 1000, i)
+    put("k0", 1500, 9)  # 覆盖同一 key 只算差额
+    assert len(scans) == 1 and cache._total == 9500  # 只有第一次扫目录
+    put("k9", 1000, 10)  # 超过上限：扫一次，按 last_access 淘汰最旧的
+    assert len(scans) == 2 and cache._total <= 10_000
+    assert cache._load("k1") is None and cache._load("k0") is not None
+    assert cache._total == sum(p.stat().st_size for p in tmp_path.glob("*.body"))
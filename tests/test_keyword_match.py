@@ -0,0 +1,58 @@
+# tests/test_keyword_match.py
+import random
+
+import numpy as np
+import pandas as pd
+
+from macro.keyword_match import KeywordMatcher
+
+KWS = ["Tariff", "关税", "关税上调", "section 301", "301 tariff", "export control", "制裁"]
+
+def _old_rows(kws, texts):
+    """旧实现：逐行 lower 后对每个关键词做 in。"""
+    low = [("" if t is None or t != t else str(t)).lower() for t in texts]
+    return {k: [i for i, s in enumerate(low) if k in s] for k in kws}
+
+def _titles(n, seed=0):
+    rng = random.Random(seed)
+    words = ["Section 301 tariff", "关税上调", "关税", "export", "control", "EXPORT CONTROL", "制裁名单",
+             "İstanbul", "ǅ", "ß", "fed", "rate", "tar", "iff", "301", "", " "]
+    return [None if rng.random() < 0.02 else " ".join(rng.choice(words) for _ in range(rng.randint(0, 6)))
+            for _ in range(n)]
+
+def test_parity_with_per_keyword_scan():
+    texts = _titles(5000)
+    hit, rows = KeywordMatcher(KWS).scan(texts)
+    old = _old_rows([k.lower() for k in KWS], texts)
+    assert {k: r.tolist() for k, r in rows.items()} == old
+    assert hit.tolist() == [any(i in r for r in old.values()) for i in range(len(texts))]
+
+def test_lower_that_changes_length_keeps_rows_aligned():
+    # "İ".lower() 变成两个字符：整体 lower 后偏移会错位，需要逐行重拼
+    texts = ["İİİİ", "no", "new tariff", "İ", "tariff"]
+    _, rows = KeywordMatcher(["tariff"]).scan(texts)
+    assert rows["tariff"].tolist() == [2, 4]
+
+def test_overlapping_keywords_are_counted_separately():
+    texts = pd.Series(["关税上调 25%", "加征关税", "Section 301 tariff review", "tariffs", "无关"], index=list("abcde"))
+    hit, counts = KeywordMatcher(KWS + ["关税", " tariff "]).match(texts)
+    assert hit.tolist() == [True, True, True, True, False]
+    assert list(hit.index) == list("abcde")
+    assert counts["关税"] == 2 and counts["关税上调"] == 1  # 包含关系各自计数
+    assert counts["section 301"] == counts["301 tariff"] == 1  # 首尾重叠
+    assert counts["tariff"] == 2
+    assert list(counts.index) == [k.lower() for k in KWS]  # 去重 + strip，顺序不变
+
+def test_plain_substring_no_word_boundaries():
+    texts = ["tariffs rise", "anti-tariff", "Tariff", "tar\niff", "tar", "iff"]
+    _, rows = KeywordMatcher(["tariff"]).scan(texts)
+    assert rows["tariff"].tolist() == [0, 1, 2]  # 不要求词边界，但不会跨行拼出命中
+    hit, rows = KeywordMatcher(["tar", "iff"]).scan(["tar", "iff", ""])
+    assert rows["tar"].tolist() == [0] and rows["iff"].tolist() == [1]
+    assert hit.dtype == np.bool_
+
+def test_empty_inputs():
+    hit, rows = KeywordMatcher([]).scan(["tariff"])
+    assert hit.tolist() == [False] and rows == {}
+    hit, rows = KeywordMatcher(["tariff"]).scan([])
+    assert len(hit) == 0 and len(rows["tariff"]) == 0
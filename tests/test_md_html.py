@@ -0,0 +1,41 @@
+# tests/test_md_html.py
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "report"))
+from generate_weekly_md_html import convert, md_to_html
+
+GOLDEN = ROOT / "tests" / "golden" / "md_html"
+CASES = sorted(p.stem for p in GOLDEN.glob("*.md"))
+
+def _read(name, ext):
+    return (GOLDEN / f"{name}.{ext}").read_text(encoding="utf-8")
+
+@pytest.mark.parametrize("name", CASES)
+def test_golden(name):
+    assert md_to_html(_read(name, "md")) == _read(name, "html")
+
+def test_inline_markup_stays_inside_its_cell():
+    html = md_to_html("| *x | y* |\n|--|--|\n| *a | b* |\n")
+    assert "<em>" not in html
+    assert "<th>*x</th><th>y*</th>" in html and "<td>*a</td><td>b*</td>" in html
+
+def test_double_underscore_inside_words_is_literal():
+    assert md_to_html("my__var__name and __bold__") == "<p>my__var__name and <strong>bold</strong></p>\n"
+
+def test_loose_list_is_one_list():
+    html = md_to_html("- a\n\n- b\n\n- c\n\nafter\n")
+    assert html.count("<ul>") == 1 and html.count("<li>") == 3
+    assert html.endswith("</li></ul>\n<p>after</p>\n")
+
+def test_streaming_matches_golden_across_flushes():
+    # 每 4096 行交一次 write：块（表格 / 列表 / 段落）跨批次时输出不变
+    docs = [_read(n, "md") for n in CASES]
+    reps = 4096 * 3 // sum(d.count("\n") + 1 for d in docs) + 1
+    chunks = []
+    convert(("\n".join(docs) + "\n").splitlines() * reps, chunks.append)
+    assert len(chunks) > 1
+    assert "".join(chunks) == "".join(_read(n, "html") for n in CASES) * reps
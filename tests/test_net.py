@@ -0,0 +1,91 @@
+# tests/test_net.py
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from macro import net, instrument
+from macro.http_cache import HttpCache
+from scripts import stub_sources
+
+@pytest.fixture
+def stub():
+    srv, base = stub_sources.start(n_markets=120)
+    yield srv, base
+    for t in threading.enumerate():  # 等落后的对冲请求跑完，免得计入下一个测试的计数器
+        if t.name.startswith("t-"): t.join(5)
+    srv.shutdown()
+
+def _counter(name, **labels):
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    return instrument._counters.get(key, 0)
+
+def _markets(url):
+    return lambda: net.get(url).json()["markets"]
+
+def test_hedged_uses_fallback_when_primary_is_slow(stub):
+    srv, base = stub
+    instrument.reset()
+    t0 = time.perf_counter()
+    res = net.hedged([_markets(f"{base}/delta/markets?limit=1&delay=2"), _markets(f"{base}/api/markets?limit=3")],
+                     delay=0.2, label="t")
+    assert len(res) == 3  # 备源先回
+    assert time.perf_counter() - t0 < 1.5  # 不等慢的主源
+    assert _counter("http_hedges", label="t") == 1
+    assert srv.hits["/delta/markets"] == srv.hits["/api/markets"] == 1
+
+def test_hedged_fails_over_and_times_out(stub):
+    srv, base = stub
+    instrument.reset()
+    res = net.hedged([_markets(f"{base}/delta/markets?fail=1"), _markets(f"{base}/api/markets?limit=2")],
+                     delay=5, label="t")
+    assert len(res) == 2  # 主源 503 立即切备源，不等 delay
+    assert _counter("http_failures", label="t") == 1
+    with pytest.raises(TimeoutError):
+        net.hedged([_markets(f"{base}/delta/markets?delay=2")], deadline=0.3, label="t")
+    with pytest.raises(requests.HTTPError):
+        net.hedged([_markets(f"{base}/delta/markets?fail=1"), _markets(f"{base}/api/markets?fail=1")], label="t")
+
+def test_sources_share_one_session(stub, tmp_path, monkeypatch):
+    srv, base = stub
+    monkeypatch.chdir(tmp_path)  # 各源在相对路径 data/ 下写输出
+    from macro import fetch_all, fetch_vix_pctile as vix, fetch_polymarket_to_csv as pm
+    env = stub_sources.env_for(base)
+    monkeypatch.setattr(vix, "STOOQ_URL", env["STOOQ_URL"])
+    monkeypatch.setattr(pm, "PRIMARY", env["POLYMARKET_PRIMARY"])
+    monkeypatch.setattr(pm, "FALLBACK", env["POLYMARKET_FALLBACK"])
+    for mod in (vix, pm): monkeypatch.setattr(mod, "CACHE", HttpCache(tmp_path / "http", enabled=False))
+    monkeypatch.setattr(vix, "fetch_yahoo", lambda start=None: None)
+    monkeypatch.setattr(pm, "WORKERS", 3)
+
+    made = []
+    class Session(requests.Session):
+        def __init__(self):
+            super().__init__(); made.append(self)
+    monkeypatch.setattr(requests, "Session", Session)
+    monkeypatch.setattr(net, "_session", None)
+
+    res = fetch_all.run(["vix", "polymarket"], deadline=30)
+    assert {n: s for n, (s, _) in res.items()} == {"vix": "ok", "polymarket": "ok"}
+    assert srv.hits.get("/q/d/l/") and srv.hits.get("/delta/markets", 0) > 1  # 两个源、多个并发翻页线程
+    assert len(made) == 1 and net.get_session() is made[0]
+
+def test_http_requests_counter_per_status(stub, monkeypatch):
+    srv, base = stub
+    monkeypatch.setattr(net, "RETRIES", 1)
+    monkeypatch.setattr(net, "_session", None)
+    instrument.reset()
+    with ThreadPoolExecutor(4) as ex:  # 多线程共用一个 Session，计数不丢
+        list(ex.map(lambda i: net.get(f"{base}/markets?limit=1&offset={i}"), range(20)))
+    with pytest.raises(requests.HTTPError):
+        net.get(f"{base}/nope")
+    with pytest.raises(requests.HTTPError):
+        net.get(f"{base}/markets?fail=1")  # 503：连接池重试一次后仍失败
+    assert _counter("http_requests", status=200) == 20
+    assert _counter("http_requests", status=404) == 1
+    assert _counter("http_requests", status=503) == 1  # 每个拿到最终响应的请求只计一次
+    assert _counter("http_retries") == 1 and srv.hits["/markets"] == 22
+    prom = instrument.prometheus(instrument.report())
+    assert 'macro_http_requests{status="200"} 20' in prom
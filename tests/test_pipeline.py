@@ -0,0 +1,67 @@
+# tests/test_pipeline.py
+import json, sys
+
+import pytest
+
+from scripts.pipeline import Stage, run
+
+def _module(tmp_path, name, body):
+    (tmp_path / f"{name}.py").write_text(body, encoding="utf-8")
+
+def test_stage_exit_is_a_stage_failure_and_state_is_saved(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    _module(tmp_path, "pl_bad", "import sys\ndef main(argv=None):\n    sys.exit('bad input')\n")
+    _module(tmp_path, "pl_good", "from pathlib import Path\ndef main(argv=None):\n    Path('good.txt').write_text('x')\n")
+    _module(tmp_path, "pl_quiet", "import sys\ndef main(argv=None):\n    sys.exit(0)\n")
+    stages = [Stage("bad", "pl_bad", argv=[]),
+              Stage("good", "pl_good", argv=[], outputs=("good.txt",)),
+              Stage("quiet", "pl_quiet", argv=[]),
+              Stage("down", "pl_good", argv=[], deps=("bad",))]
+    state = tmp_path / "state.json"
+    status, _ = run(stages, workers=2, state_path=state)
+    assert status == {"bad": "failed", "good": "ok", "quiet": "ok", "down": "blocked"}
+    keys = json.loads(state.read_text(encoding="utf-8"))["keys"]
+    assert "good" in keys and "bad" not in keys
+
+    status, _ = run(stages, workers=2, state_path=state)
+    assert status["good"] == "skip"
+    for m in ("pl_bad", "pl_good", "pl_quiet"): sys.modules.pop(m, None)
+
+def test_deadline_bounds_network_stages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    _module(tmp_path, "pl_slow", "import time\ndef main(argv=None):\n    time.sleep(5)\n")
+    _module(tmp_path, "pl_use", "from pathlib import Path\ndef main(argv=None):\n    Path('used.txt').write_text(Path('old.txt').read_text())\n")
+    (tmp_path / "old.txt").write_text("last run", encoding="utf-8")
+    stages = [Stage("slow", "pl_slow", argv=[], outputs=("old.txt",), volatile=True),
+              Stage("fresh", "pl_slow", argv=[], outputs=("never.txt",), volatile=True),
+              Stage("use", "pl_use", argv=[], deps=("slow",)),
+              Stage("use2", "pl_use", argv=[], deps=("fresh",))]
+    status, timing = run(stages, workers=4, state_path=tmp_path / "state.json", deadline=0.3)
+    assert status == {"slow": "timeout", "fresh": "failed", "use": "ok", "use2": "blocked"}
+    assert (tmp_path / "used.txt").read_text(encoding="utf-8") == "last run"
+    assert timing["slow"] < 2
+    sys.modules.pop("pl_slow", None); sys.modules.pop("pl_use", None)
+
+def test_run_prunes_artifact_versions(tmp_path, monkeypatch):
+    from scripts import pipeline
+    from macro.artifacts import ArtifactStore
+    monkeypatch.chdir(tmp_path)
+    store = ArtifactStore(tmp_path / "artifacts")
+    monkeypatch.setattr(pipeline, "ARTIFACTS", store)
+    for i in range(5): store.put_json("m", {"i": i})
+    monkeypatch.setattr("macro.artifacts.KEEP", 2)
+    run([], state_path=tmp_path / "state.json")
+    assert sorted(p.name for p in (tmp_path / "artifacts" / "m").glob("*.json")) == \
+        sorted(v["version"] for v in store.versions("m")[-2:])
+    assert store.read_json("m") == {"i": 4}
+
+def test_dependency_cycle_is_rejected(tmp_path):
+    stages = [Stage("a", "pl_none", deps=("b",)), Stage("b", "pl_none", deps=("c",)),
+              Stage("c", "pl_none", deps=("a",)), Stage("d", "pl_none")]
+    with pytest.raises(ValueError, match="dependency cycle: ([abc]) -> .* -> \\1"):
+        run(stages, state_path=tmp_path / "state.json")
+    with pytest.raises(ValueError, match="dependency cycle: d -> d"):
+        run([Stage("d", "pl_none", deps=("d",))], state_path=tmp_path / "state.json")
+    assert not (tmp_path / "state.json").exists()
@@ -0,0 +1,67 @@
+# tests/test_polymarket.py
+from datetime import datetime, timezone
+
+import pytest
+
+from macro.http_cache import HttpCache
+from scripts import stub_sources
+
+@pytest.fixture
+def pm(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # 快照分区写在相对路径 data/macro/ 下
+    from macro import fetch_polymarket_to_csv as pm
+    monkeypatch.setattr(pm, "CACHE", HttpCache(tmp_path / "http", enabled=False))
+    return pm
+
+@pytest.fixture
+def stub():
+    servers = []
+    def start(**kw):
+        srv, base = stub_sources.start(**kw)
+        servers.append(srv)
+        return srv, f"{base}/markets"
+    yield start
+    for srv in servers: srv.shutdown()
+
+def _ingest(pm, url):
+    _, snap = pm.ingest(url, pm.fetch_page(url, 0), None, datetime.now(timezone.utc))
+    return snap
+
+@pytest.mark.parametrize("n_markets, max_limit", [
+    (1234, None),   # 最后一页不满
+    (300, None),    # 正好整页：靠空页结束
+    (1234, 40),     # 服务端把每页截到 40 条（请求的是 100）
+    (0, None),
+])
+def test_ingest_reads_every_market(pm, stub, n_markets, max_limit):
+    _, url = stub(n_markets=n_markets, max_limit=max_limit)
+    snap = _ingest(pm, url)
+    assert snap.markets == n_markets
+    ids = pm.read_snapshots()["market_id"]
+    assert ids.is_unique and len(ids) == n_markets
+
+def test_page_cap_fails_loudly(pm, stub):
+    _, url = stub(n_markets=500)
+    pages = pm.iter_pages(url, start=0, limit=50, max_pages=3)
+    assert [len(p) for p in (next(pages), next(pages), next(pages))] == [50, 50, 50]
+    with pytest.raises(RuntimeError, match="POLYMARKET_MAX_PAGES"):
+        next(pages)
+
+def test_fallback_values_are_marked_and_not_used_as_history(pm, stub, monkeypatch):
+    import csv
+    from scripts.backfill_metrics import rate_cut_history
+    monkeypatch.delenv("POLYMARKET_PROB", raising=False)
+    monkeypatch.setattr(pm, "load_filter", lambda: None)
+    dead = "http://127.0.0.1:9/markets"
+    monkeypatch.setattr(pm, "PRIMARY", dead); monkeypatch.setattr(pm, "FALLBACK", dead)
+    pm.main()                                   # 没有任何观测：0.33 兜底
+    _, url = stub(n_markets=300)
+    monkeypatch.setattr(pm, "PRIMARY", url)
+    pm.main()                                   # 真实观测
+    monkeypatch.setattr(pm, "PRIMARY", dead)
+    pm.main()                                   # 沿用上次观测
+    rows = list(csv.DictReader(pm.CSV.open(encoding="utf-8")))
+    assert [r["source"] for r in rows] == ["fallback:default", "live", "fallback:last"]
+    assert rows[2]["prob"] == rows[1]["prob"]
+    hist = rate_cut_history(pm.CSV)
+    assert hist.tolist() == [float(rows[1]["prob"])]
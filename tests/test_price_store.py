@@ -0,0 +1,14 @@
+# tests/test_price_store.py
+import pandas as pd
+
+from macro.price_store import PriceStore
+
+def test_append_keeps_last_row_per_date(tmp_path):
+    store = PriceStore(tmp_path)
+    df = pd.DataFrame({"date": ["2025-10-02", "2025-10-01", "2025-10-02", "2025-10-01"],
+                       "close": [30.0, 20.0, 10.0, 15.0]})
+    assert store.append("^VIX", df) == 2
+    assert store.read("^VIX")["close"].tolist() == [15.0, 10.0]
+    # 盘中价 -> 收盘价：同日期覆盖最后一条，哪怕新值更小
+    store.append("^VIX", pd.DataFrame({"date": ["2025-10-02"], "close": [5.0]}))
+    assert store.read("^VIX")["close"].tolist() == [15.0, 5.0]
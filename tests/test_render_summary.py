@@ -0,0 +1,15 @@
+# tests/test_render_summary.py
+from scripts.render_summary_v3 import Renderer
+
+def _snaps(n):
+    return [{"metrics": {"rate_cut_odds": 0.1 * i, "vix_pctile": 0.5, "corr_spx_dxy": -0.2,
+                         "corr_spx_10y": 0.1, "stance": "Neutral"},
+             "events": {"last7": i, "prev7": 1, "delta_pct": None},
+             "as_of": f"2025-09-{i + 1:02d}"} for i in range(n)]
+
+def test_render_many_in_processes_matches_sequential(tmp_path):
+    seq = Renderer(tmp_path, "seq", heat=None).render_many(_snaps(6), workers=1)
+    par = Renderer(tmp_path, "par", heat=None).render_many(_snaps(6), workers=3)
+    assert [p.name for p in par] == [p.name for p in seq]
+    for a, b in zip(seq, par):
+        assert a.read_text(encoding="utf-8") == b.read_text(encoding="utf-8")
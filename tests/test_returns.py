@@ -0,0 +1,73 @@
+# tests/test_returns.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from macro.returns import align_prices, log_returns, aligned_returns
+
+def _s(dates, vals):
+    return pd.Series(vals, index=pd.to_datetime(dates), dtype=float)
+
+# a 周一到周五每天有价；b 周三休市；c 只有周一、周五
+A = _s(["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"], [10, 11, 12, 13, 14])
+B = _s(["2024-01-01", "2024-01-02", "2024-01-04", "2024-01-05"], [20, 21, 23, 24])
+C = _s(["2024-01-01", "2024-01-05"], [30, 34])
+
+def test_inner_keeps_common_dates_only():
+    px = align_prices({"a": A, "b": B}, how="inner")
+    assert list(px.columns) == ["a", "b"]
+    assert list(px.index.strftime("%m-%d")) == ["01-01", "01-02", "01-04", "01-05"]
+    assert px.loc["2024-01-04"].tolist() == [13, 23]
+
+def test_ffill_carries_last_price_forward_only():
+    px = align_prices({"a": A, "b": B}, how="ffill", max_stale=3)
+    assert len(px) == 5
+    assert px.loc["2024-01-03", "b"] == 21  # 沿用前一天，不借用之后的 23
+    r = log_returns(px)
+    assert r.loc["2024-01-03", "b"] == 0
+    assert r.loc["2024-01-04", "b"] == pytest.approx(np.log(23 / 21))
+
+def test_ffill_staleness_limit():
+    px = align_prices({"a": A, "c": C}, how="ffill", max_stale=2)
+    assert px["c"].tolist()[:3] == [30, 30, 30]
+    assert np.isnan(px.loc["2024-01-04", "c"])  # 超过 2 个日期的旧价置空
+    assert px.loc["2024-01-05", "c"] == 34
+    r = log_returns(px)
+    assert np.isnan(r.loc["2024-01-05", "c"])  # 前一天缺价，收益也缺
+    unlimited = align_prices({"a": A, "c": C}, how="ffill", max_stale=-1)
+    assert unlimited.loc["2024-01-04", "c"] == 30
+
+def test_asof_uses_base_calendar_and_tolerance():
+    # base=b：日历没有 1/3，a 在 1/3 的价格不出现
+    px = align_prices({"a": A, "b": B}, how="asof", base="b")
+    assert list(px.index) == list(B.index)
+    assert px["a"].tolist() == [10, 11, 13, 14]
+    # base=a：c 取当日或之前最近的收盘价，超过 tolerance 个自然日置空
+    px = align_prices({"a": A, "c": C}, how="asof", base="a", tolerance=2)
+    assert px["c"].tolist()[:3] == [30, 30, 30]
+    assert np.isnan(px.loc["2024-01-04", "c"])
+    assert px.loc["2024-01-05", "c"] == 34
+
+def test_frames_and_unknown_policy():
+    df = pd.DataFrame({"date": pd.to_datetime(["2024-01-02 16:00", "2024-01-01 00:00", "2024-01-02 00:00"]), "close": [1, 2, 3]})
+    px = align_prices({"x": df, "empty": pd.Series(dtype=float)}, how="inner")
+    assert list(px.columns) == ["x"]
+    assert px["x"].tolist() == [2, 3]  # 排序 + 按日去重保留最后一条
+    with pytest.raises(ValueError):
+        align_prices({"a": A}, how="nearest")
+
+def test_latest_corr_matches_pandas(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # 模块导入时在相对路径 data/macro/ 下建目录
+    from macro.calc_corr_from_prices import latest_corr
+    rng = np.random.default_rng(3)
+    days = pd.bdate_range("2023-01-02", periods=200)
+    a = pd.Series(100 * np.exp(rng.standard_normal(200).cumsum() / 100), index=days)
+    b = pd.Series(50 * np.exp(rng.standard_normal(200).cumsum() / 100), index=days)
+    b = b.drop(days[[10, 50, 51, 120]])  # b 缺几天
+    for how in ("inner", "ffill", "asof"):
+        px = pd.concat({"a": a, "b": b}, axis=1)
+        px = {"inner": px.dropna(), "ffill": px.ffill(limit=3), "asof": px.ffill()}[how]
+        ref = np.log(px).diff().dropna().iloc[-60:].corr().iloc[0, 1]
+        assert latest_corr(a, b, 60, how) == pytest.approx(round(ref, 4), abs=1e-4)
+        assert aligned_returns({"a": a, "b": b}, how, base="a").dropna().shape[1] == 2
+    assert latest_corr(a, b, 1000) is None
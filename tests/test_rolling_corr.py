@@ -0,0 +1,69 @@
+# tests/test_rolling_corr.py
+import numpy as np
+import pandas as pd
+
+from macro.rolling_corr import append_history, write_history, load_history, rolling_corr
+
+WINDOWS = [20, 60]
+
+def _returns(T, N=4, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((T, N))
+    x[rng.random((T, N)) < 0.02] = np.nan  # 零星缺失走 pairwise 路径
+    return pd.DataFrame(x, index=pd.bdate_range("2020-01-01", periods=T), columns=list("ABCD")[:N])
+
+def _assert_same(inc, full):
+    for w in WINDOWS:
+        d1, t1, a = load_history(w, inc)
+        d2, t2, b = load_history(w, full)
+        assert (d1, t1) == (d2, t2)
+        np.testing.assert_allclose(a, b, rtol=0, atol=1e-5, equal_nan=True)
+
+def test_append_matches_full_rewrite(tmp_path):
+    ret = _returns(400)
+    inc, full = tmp_path / "inc", tmp_path / "full"
+    assert append_history(ret[:300], WINDOWS, inc) == 300
+    prev = 300
+    for end in (301, 320, 400):
+        assert append_history(ret[:end], WINDOWS, inc) == end - prev + 1
+        prev = end
+    write_history(ret, WINDOWS, full)
+    _assert_same(inc, full)
+
+def test_append_recomputes_only_tail(tmp_path):
+    ret = _returns(300, seed=1)
+    append_history(ret[:250], WINDOWS, tmp_path)
+    assert append_history(ret, WINDOWS, tmp_path) == 51
+    # 最后一个 bar 被修订：只重算这一行
+    ret.iloc[-1] += 0.5
+    assert append_history(ret, WINDOWS, tmp_path) == 1
+    write_history(ret, WINDOWS, tmp_path / "full")
+    _assert_same(tmp_path, tmp_path / "full")
+
+def test_changed_history_rewrites(tmp_path):
+    ret = _returns(200, seed=2)
+    append_history(ret[:150], WINDOWS, tmp_path)
+    ret.iloc[10, 0] += 1.0  # 已存的旧行变了（如价格重新导入）
+    assert append_history(ret, WINDOWS, tmp_path) == 200
+    assert append_history(ret[["A", "B"]], WINDOWS, tmp_path) == 200  # 代码集合变了
+    write_history(ret[["A", "B"]], WINDOWS, tmp_path / "full")
+    _assert_same(tmp_path, tmp_path / "full")
+
+def _pandas_corr(ret, w, t):
+    return ret.iloc[max(0, t - w + 1):t + 1].corr(min_periods=w).to_numpy()
+
+def test_flat_series_is_nan_and_diagonal_is_one():
+    ret = _returns(200, seed=3)
+    ret["B"] = ret["B"].fillna(0.0)
+    ret.iloc[50:120, 1] = 0.0          # 停牌沿用旧价：收益为 0
+    ret.iloc[130:190, 2] = 0.0123      # 收益恒为常数
+    ret.iloc[:, 3] = ret.iloc[:, 3].fillna(0.0)  # D 无缺失：部分块走无缺失快路径
+    for a in (ret, ret.fillna(0.0)):   # pairwise 与 dense 两条路径
+        out = rolling_corr(a.to_numpy(), [20])[20]
+        for t in (60, 100, 119, 150, 189):
+            c = out[t]
+            if 69 <= t < 120: assert np.isnan(c[1]).all() and np.isnan(c[:, 1]).all()
+            if 149 <= t < 190: assert np.isnan(c[2]).all() and np.isnan(c[:, 2]).all()
+            d = np.diag(c)
+            assert np.all(np.isnan(d) | (d == 1.0))
+            np.testing.assert_allclose(c, _pandas_corr(a, 20, t), atol=1e-5, equal_nan=True)
@@ -0,0 +1,29 @@
+# tests/test_scheduler.py
+import sys
+
+from scripts.pipeline import Stage
+from scripts.scheduler import Scheduler, Job, FakeClock
+
+def test_bad_ticks_do_not_stop_the_daemon(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    (tmp_path / "out").mkdir()
+    (tmp_path / "sc_exit.py").write_text("import sys\ndef main(argv=None):\n    sys.exit('bad input')\n",
+                                         encoding="utf-8")
+    (tmp_path / "sc_ok.py").write_text("from pathlib import Path\ndef main(argv=None):\n"
+                                       "    Path('ok.txt').write_text('x')\n", encoding="utf-8")
+    stages = [Stage("exit", "sc_exit", argv=[], volatile=True),
+              Stage("ok", "sc_ok", argv=[], outputs=("ok.txt",), volatile=True)]
+    clock = FakeClock()
+    sched = Scheduler([Job("exit", every=60), Job("ok", every=60)], stages, clock=clock, sleep=clock.sleep)
+    sched.serve(until=180)
+    assert [st for _, _, st in sched.history] == [{"exit": "failed", "ok": "ok"}] * 3
+    assert "ok" in sched.state["keys"]  # 状态跨轮留在内存里
+
+    # pipeline.run 本身抛错（如阶段依赖写错）：这一轮记失败，下一轮照常
+    sched.stages = stages + [Stage("orphan", "sc_ok", argv=[], deps=("missing",))]
+    assert sched.tick() == {"exit": "failed", "ok": "failed"}
+    sched.stages = stages
+    clock.sleep(60)
+    assert sched.tick() == {"exit": "failed", "ok": "ok"}
+    for m in ("sc_exit", "sc_ok"): sys.modules.pop(m, None)
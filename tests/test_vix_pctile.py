@@ -0,0 +1,76 @@
+# tests/test_vix_pctile.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from macro.price_store import PriceStore
+from macro.rolling_rank import percentile_history
+
+WINDOWS = [20, 5, 60]
+
+@pytest.fixture
+def vix(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # 模块导入时在相对路径 data/macro/ 下建目录
+    from macro import fetch_vix_pctile as vix
+    return vix
+
+def _bars(start, n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"date": pd.bdate_range(start, periods=n),
+                         "close": np.round(15 + rng.standard_normal(n).cumsum(), 2)})
+
+def _expected(store):
+    df = store.read("^VIX")
+    close = df["close"].astype(float).tolist()
+    hist = percentile_history(close, WINDOWS)
+    rows = []
+    for i, d in enumerate(df["date"]):
+        rows.append([d.strftime("%Y-%m-%d"), repr(close[i])] +
+                    ["" if hist[w][i] is None else str(round(hist[w][i], 4)) for w in WINDOWS])
+    return "\n".join(",".join(r) for r in rows) + "\n"
+
+def _body(path):
+    return path.read_text(encoding="utf-8").split("\n", 1)[1]
+
+def test_incremental_matches_full_recompute(vix, tmp_path):
+    store = PriceStore(tmp_path / "store")
+    h = vix.PctileHistory(tmp_path / "vix.csv", tmp_path / "vix.state.json", WINDOWS)
+    bars = _bars("2020-01-01", 300)
+    store.append("^VIX", bars[:200])
+    assert h.update(store)[1] == 200
+    for i in range(200, 300, 7):
+        store.append("^VIX", bars[i:i + 7])
+        _, k = h.update(store)
+        assert k == len(bars[i:i + 7]) + 1  # 上次的最后一行连同新 bar 一起重算
+        assert _body(tmp_path / "vix.csv") == _expected(store)
+    # 盘中价 -> 收盘价：最后一个 bar 原地覆盖
+    store.append("^VIX", pd.DataFrame({"date": [bars["date"].iloc[-1]], "close": [99.0]}))
+    last, k = h.update(store)
+    assert k == 1 and last["close"] == "99.0"
+    assert _body(tmp_path / "vix.csv") == _expected(store)
+
+def test_resumes_from_state_file(vix, tmp_path):
+    store = PriceStore(tmp_path / "store")
+    bars = _bars("2020-01-01", 120, seed=1)
+    store.append("^VIX", bars[:100])
+    args = (tmp_path / "vix.csv", tmp_path / "vix.state.json", WINDOWS)
+    vix.PctileHistory(*args).update(store)
+    store.append("^VIX", bars[100:])
+    assert vix.PctileHistory(*args).update(store)[1] == 21  # 新进程：从状态文件续算
+    assert _body(tmp_path / "vix.csv") == _expected(store)
+
+@pytest.mark.parametrize("tamper", ["csv", "windows"])
+def test_rebuilds_when_checkpoint_is_stale(vix, tmp_path, tamper):
+    store = PriceStore(tmp_path / "store")
+    store.append("^VIX", _bars("2020-01-01", 80, seed=2))
+    csv, state = tmp_path / "vix.csv", tmp_path / "vix.state.json"
+    vix.PctileHistory(csv, state, WINDOWS).update(store)
+    windows = WINDOWS
+    if tamper == "csv":
+        csv.write_text("date,close,pctile\n2020-01-01,,0.3\n", encoding="utf-8")
+    else:
+        windows = WINDOWS[:2]
+    last, k = vix.PctileHistory(csv, state, windows).update(store)
+    assert k == 80
+    if tamper == "csv":
+        assert _body(csv) == _expected(store)
@@ -0,0 +1,38 @@
+# tests/test_watchlists.py
+from scripts.watchlists import scan_events, score_watchlist
+
+HEADER = "publish_time,title,summary,source\n"
+ROWS = ["2025-10-01T09:00:00Z,Tariff on chips,export controls,wire",
+        "2025-10-03T09:00:00Z,Quiet day,nothing,blog",
+        "2025-10-06T09:00:00Z,New tariff round,chips,wire",
+        "2025-10-09T09:00:00Z,Tariff escalation,export controls,wire"]
+
+def _events(tmp_path, rows):
+    p = tmp_path / "events.csv"
+    p.write_text(HEADER + "".join(r + "\n" for r in rows), encoding="utf-8")
+    return str(p)
+
+def test_as_of_drops_later_events(tmp_path):
+    ev = scan_events(_events(tmp_path, ROWS), ["tariff", "export"], as_of="2025-10-06")
+    assert len(ev["codes"]) == 3 and str(ev["days"].max().date()) == "2025-10-06"
+    res, heat = score_watchlist(ev, ["tariff"], [7])
+    assert res["last7"] == 2 and str(heat.index.max().date()) == "2025-10-06"
+    assert res["by_keyword"] == {"tariff": 2}
+    # 与只含前三行的文件结果一致
+    same = scan_events(_events(tmp_path, ROWS[:3]), ["tariff", "export"])
+    assert score_watchlist(same, ["tariff"], [7])[0] == res
+
+def test_empty_file_is_not_missing(tmp_path):
+    ev = scan_events(_events(tmp_path, []), ["tariff"])
+    assert ev is not None
+    assert score_watchlist(ev, ["tariff"], [7]) == (
+        {"last7": 0, "prev7": 0, "delta_pct": None, "note": "empty events.csv"}, None)
+    early = scan_events(_events(tmp_path, ROWS), ["tariff"], as_of="2025-09-30")
+    assert score_watchlist(early, ["tariff"], [7])[0]["note"] == "no events on or before 2025-09-30"
+    assert score_watchlist(scan_events(str(tmp_path / "nope.csv"), ["tariff"]), ["tariff"], [7])[0]["note"] \
+        == "events.csv not found"
+
+def test_last_row_without_newline_counts(tmp_path):
+    p = tmp_path / "events.csv"
+    p.write_text(HEADER + "\n".join(ROWS), encoding="utf-8")
+    assert len(scan_events(str(p), ["tariff"])["codes"]) == 4